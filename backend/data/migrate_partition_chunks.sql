@@ -0,0 +1,112 @@
+-- Migrate an existing single-table policy_chunks to the hash-partitioned layout in schema.sql.
+-- Run order (Supabase SQL Editor or psql):
+--   1. schema.sql — brings the rest of the schema up to date (new columns, vector_settings,
+--      RPCs); on a single-table policy_chunks it skips the partitions with a NOTICE.
+--   2. this file, once.
+-- Runs in one transaction: on any error nothing changes. Row ids and every stored column
+-- (spans, content hashes) are preserved; orphan chunks with no uploaded_policy_id are dropped
+-- (they were unreachable by every search RPC). The RPCs resolve policy_chunks by name at call
+-- time, so they need no changes.
+
+BEGIN;
+
+-- Block concurrent uploads/seeding while rows are copied
+LOCK TABLE policy_chunks IN ACCESS EXCLUSIVE MODE;
+
+-- Installs older than chunk spans: give the old table the columns copied below
+ALTER TABLE policy_chunks ADD COLUMN IF NOT EXISTS char_start INTEGER;
+ALTER TABLE policy_chunks ADD COLUMN IF NOT EXISTS char_end INTEGER;
+ALTER TABLE policy_chunks ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+ALTER TABLE policy_chunks RENAME TO policy_chunks_unpartitioned;
+ALTER TABLE policy_chunks_unpartitioned RENAME CONSTRAINT policy_chunks_pkey TO policy_chunks_unpartitioned_pkey;
+DROP INDEX IF EXISTS policy_chunks_embedding_idx;
+DROP INDEX IF EXISTS policy_chunks_embedding_hnsw_idx;
+DROP INDEX IF EXISTS policy_chunks_embedding_half_idx;
+DROP INDEX IF EXISTS policy_chunks_embedding_bit_idx;
+DROP INDEX IF EXISTS policy_chunks_embedding_ivfflat_idx;
+DROP INDEX IF EXISTS policy_chunks_tsv_idx;
+DROP INDEX IF EXISTS policy_chunks_policy_section_idx;
+
+CREATE TABLE policy_chunks (
+  id UUID NOT NULL DEFAULT gen_random_uuid(),
+  uploaded_policy_id UUID NOT NULL REFERENCES uploaded_policies(id) ON DELETE CASCADE,
+  content TEXT NOT NULL,
+  embedding VECTOR(1536),
+  page_number INTEGER,
+  chunk_index INTEGER,
+  section_type TEXT DEFAULT 'general'
+    CHECK (section_type IN ('definitions','exclusions','coverage','conditions','waiting_periods','limits','claims','general')),
+  char_start INTEGER,
+  char_end INTEGER,
+  content_hash TEXT,
+  content_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
+  PRIMARY KEY (uploaded_policy_id, id)
+) PARTITION BY HASH (uploaded_policy_id);
+
+DO $$
+BEGIN
+  FOR i IN 0..15 LOOP
+    EXECUTE format(
+      'CREATE TABLE policy_chunks_p%s PARTITION OF policy_chunks '
+      'FOR VALUES WITH (MODULUS 16, REMAINDER %s)', i, i
+    );
+  END LOOP;
+END $$;
+
+-- Copy before indexing: one bulk index build per partition is far cheaper than row-by-row inserts
+INSERT INTO policy_chunks (
+  id, uploaded_policy_id, content, embedding, page_number, chunk_index, section_type,
+  char_start, char_end, content_hash
+)
+SELECT
+  id, uploaded_policy_id, content, embedding, page_number, chunk_index, section_type,
+  char_start, char_end, content_hash
+FROM policy_chunks_unpartitioned
+WHERE uploaded_policy_id IS NOT NULL;
+
+SET LOCAL maintenance_work_mem = '512MB';
+
+-- Same compact ANN index as schema.sql (halfvec unless vector_settings says otherwise);
+-- the float32 policy_chunks_embedding_hnsw_idx dropped above is not rebuilt
+DO $$
+DECLARE
+  mode TEXT := COALESCE((SELECT value FROM vector_settings WHERE key = 'ann_storage'), 'halfvec');
+BEGIN
+  IF mode = 'binary' THEN
+    CREATE INDEX policy_chunks_embedding_bit_idx
+      ON policy_chunks USING hnsw ((binary_quantize(embedding)::BIT(1536)) bit_hamming_ops)
+      WITH (m = 16, ef_construction = 64);
+  ELSIF mode = 'halfvec' THEN
+    CREATE INDEX policy_chunks_embedding_half_idx
+      ON policy_chunks USING hnsw ((embedding::HALFVEC(1536)) halfvec_cosine_ops)
+      WITH (m = 16, ef_construction = 64);
+  ELSE
+    CREATE INDEX policy_chunks_embedding_hnsw_idx
+      ON policy_chunks USING hnsw (embedding vector_cosine_ops)
+      WITH (m = 16, ef_construction = 64);
+  END IF;
+END $$;
+CREATE INDEX policy_chunks_tsv_idx
+  ON policy_chunks USING GIN(content_tsv);
+CREATE INDEX policy_chunks_policy_section_idx
+  ON policy_chunks (uploaded_policy_id, section_type);
+
+-- Sanity check: abort (and roll everything back) if any routable row went missing
+DO $$
+DECLARE
+  copied BIGINT;
+  expected BIGINT;
+BEGIN
+  SELECT COUNT(*) INTO copied FROM policy_chunks;
+  SELECT COUNT(*) INTO expected FROM policy_chunks_unpartitioned WHERE uploaded_policy_id IS NOT NULL;
+  IF copied <> expected THEN
+    RAISE EXCEPTION 'policy_chunks migration copied % of % rows', copied, expected;
+  END IF;
+END $$;
+
+DROP TABLE policy_chunks_unpartitioned;
+
+COMMIT;
+
+ANALYZE policy_chunks;
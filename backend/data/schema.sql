@@ -42,85 +42,360 @@ CREATE TABLE IF NOT EXISTS uploaded_policies (
   filename TEXT NOT NULL,
   insurer TEXT DEFAULT '',
   chunk_count INTEGER DEFAULT 0,
+  -- sha256 of the PDF bytes: identical files are never re-ingested, whatever their name
+  content_hash TEXT,
+  -- Bumped by apply_policy_revision each time a revised wording is switched in
+  version INTEGER DEFAULT 1,
+  -- Set on the hidden staging row that holds a revision's new chunks until the switch
+  revision_of UUID REFERENCES uploaded_policies(id) ON DELETE CASCADE,
   uploaded_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Installs created before content hashing / revisions existed
+ALTER TABLE uploaded_policies ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE uploaded_policies ADD COLUMN IF NOT EXISTS version INTEGER DEFAULT 1;
+ALTER TABLE uploaded_policies ADD COLUMN IF NOT EXISTS revision_of UUID
+  REFERENCES uploaded_policies(id) ON DELETE CASCADE;
+CREATE INDEX IF NOT EXISTS uploaded_policies_filename_idx ON uploaded_policies (filename);
+CREATE INDEX IF NOT EXISTS uploaded_policies_content_hash_idx ON uploaded_policies (content_hash);
+
 -- ── Policy text chunks with dual search support ───────────────────────────
+-- Hash-partitioned by uploaded policy: every search filters on uploaded_policy_id = $1,
+-- so the planner prunes to one partition and only that partition's vector / GIN indexes
+-- are scanned. The partition key must be part of the primary key.
+-- Existing single-table installs: run this file, then data/migrate_partition_chunks.sql once.
 CREATE TABLE IF NOT EXISTS policy_chunks (
-  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-  uploaded_policy_id UUID REFERENCES uploaded_policies(id) ON DELETE CASCADE,
+  id UUID NOT NULL DEFAULT gen_random_uuid(),
+  uploaded_policy_id UUID NOT NULL REFERENCES uploaded_policies(id) ON DELETE CASCADE,
   content TEXT NOT NULL,
   embedding VECTOR(1536),
   page_number INTEGER,
   chunk_index INTEGER,
   section_type TEXT DEFAULT 'general'
     CHECK (section_type IN ('definitions','exclusions','coverage','conditions','waiting_periods','limits','claims','general')),
+  -- content = document text[char_start:char_end] (pages concatenated); lets overlapping
+  -- neighbours be stitched without repeating the overlap. NULL for chunks stored before spans.
+  char_start INTEGER,
+  char_end INTEGER,
+  -- sha256 of content: a revised wording re-embeds only chunks whose hash is new
+  content_hash TEXT,
   -- Auto-generated tsvector for keyword search (BM25-style)
-  content_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', content)) STORED
-);
+  content_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
+  PRIMARY KEY (uploaded_policy_id, id)
+) PARTITION BY HASH (uploaded_policy_id);
+
+-- Installs created before chunk spans existed
+ALTER TABLE policy_chunks ADD COLUMN IF NOT EXISTS char_start INTEGER;
+ALTER TABLE policy_chunks ADD COLUMN IF NOT EXISTS char_end INTEGER;
+ALTER TABLE policy_chunks ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- 16 partitions; indexes created on policy_chunks below cascade to each one.
+-- CREATE TABLE IF NOT EXISTS above leaves a single-table install as it is, so partitions are
+-- only created when policy_chunks really is partitioned (relkind 'p').
+DO $$
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = 'policy_chunks'::regclass) <> 'p' THEN
+    RAISE NOTICE 'policy_chunks is not partitioned; run data/migrate_partition_chunks.sql to partition it';
+    RETURN;
+  END IF;
+  FOR i IN 0..15 LOOP
+    EXECUTE format(
+      'CREATE TABLE IF NOT EXISTS policy_chunks_p%s PARTITION OF policy_chunks '
+      'FOR VALUES WITH (MODULUS 16, REMAINDER %s)', i, i
+    );
+  END LOOP;
+END $$;
 
 -- ── Indexes ───────────────────────────────────────────────────────────────
--- IVFFlat index for pgvector cosine similarity (fast ANN search)
-CREATE INDEX IF NOT EXISTS policy_chunks_embedding_idx
-  ON policy_chunks USING ivfflat (embedding vector_cosine_ops)
-  WITH (lists = 100);
+-- HNSW index for pgvector cosine similarity (fast ANN search).
+-- Unlike IVFFlat it needs no training data, so it is valid when created on an empty table.
+-- Tune m / ef_construction here and hnsw.ef_search per query (see below); rebuild after
+-- bulk seeding with: python scripts/maintain_index.py reindex
+DROP INDEX IF EXISTS policy_chunks_embedding_idx;  -- legacy IVFFlat (lists=100, trained on an empty table)
+
+-- Compact ANN storage. The float32 embedding column stays the source of truth; the HNSW
+-- index is built over a compact copy and only serves the first pass. ann_candidates()
+-- fetches match_count × rescore_factor candidates from it, and the RPCs rescore those
+-- exactly against the float32 vectors.
+--   ann_storage = 'vector'   float32 HNSW            (6 KB/vector, baseline)
+--                 'halfvec'  halfvec(1536) HNSW      (3 KB/vector, ~2× smaller index)
+--                 'binary'   bit(1536) Hamming HNSW  (192 B/vector, ~32× smaller index)
+-- Switch later with: python scripts/maintain_index.py storage --mode binary --rescore-factor 8
+CREATE TABLE IF NOT EXISTS vector_settings (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL
+);
+INSERT INTO vector_settings (key, value) VALUES
+  ('ann_storage', 'halfvec'),
+  ('rescore_factor', '4')
+ON CONFLICT (key) DO NOTHING;
+
+DO $$
+DECLARE
+  mode TEXT := (SELECT value FROM vector_settings WHERE key = 'ann_storage');
+BEGIN
+  IF mode = 'binary' THEN
+    CREATE INDEX IF NOT EXISTS policy_chunks_embedding_bit_idx
+      ON policy_chunks USING hnsw ((binary_quantize(embedding)::BIT(1536)) bit_hamming_ops)
+      WITH (m = 16, ef_construction = 64);
+  ELSIF mode = 'halfvec' THEN
+    CREATE INDEX IF NOT EXISTS policy_chunks_embedding_half_idx
+      ON policy_chunks USING hnsw ((embedding::HALFVEC(1536)) halfvec_cosine_ops)
+      WITH (m = 16, ef_construction = 64);
+  ELSE
+    CREATE INDEX IF NOT EXISTS policy_chunks_embedding_hnsw_idx
+      ON policy_chunks USING hnsw (embedding vector_cosine_ops)
+      WITH (m = 16, ef_construction = 64);
+  END IF;
+END $$;
 
 -- GIN index for full-text keyword search
 CREATE INDEX IF NOT EXISTS policy_chunks_tsv_idx
   ON policy_chunks USING GIN(content_tsv);
 
--- Composite index for section-filtered queries
+-- Composite index for section-filtered queries (many policies share a hash partition)
 CREATE INDEX IF NOT EXISTS policy_chunks_policy_section_idx
   ON policy_chunks (uploaded_policy_id, section_type);
 
+-- ── First-pass ANN candidates (compact index) ────────────────────────────
+-- Every semantic RPC goes through this. It pins the HNSW search settings (pgvector >= 0.8):
+--   hnsw.ef_search       candidate list size — higher = better recall, slower
+--   hnsw.iterative_scan  keep scanning when the per-policy filter discards candidates
+-- Retune without editing this file: python scripts/maintain_index.py tune --ef-search 200
+CREATE OR REPLACE FUNCTION ann_candidates(
+  query_embedding VECTOR(1536),
+  policy_id_filter UUID,
+  section_filter TEXT[],
+  match_count INT
+)
+RETURNS SETOF UUID
+LANGUAGE plpgsql STABLE
+SET hnsw.ef_search = 100
+SET hnsw.iterative_scan = relaxed_order
+AS $$
+DECLARE
+  mode TEXT := COALESCE((SELECT value FROM vector_settings WHERE key = 'ann_storage'), 'vector');
+  factor INT := COALESCE((SELECT value::INT FROM vector_settings WHERE key = 'rescore_factor'), 1);
+BEGIN
+  IF mode = 'binary' THEN
+    RETURN QUERY
+      SELECT c.id FROM policy_chunks c
+      WHERE c.uploaded_policy_id = policy_id_filter
+        AND (section_filter IS NULL OR c.section_type = ANY(section_filter))
+      ORDER BY binary_quantize(c.embedding)::BIT(1536) <~> binary_quantize(query_embedding)
+      LIMIT match_count * factor;
+  ELSIF mode = 'halfvec' THEN
+    RETURN QUERY
+      SELECT c.id FROM policy_chunks c
+      WHERE c.uploaded_policy_id = policy_id_filter
+        AND (section_filter IS NULL OR c.section_type = ANY(section_filter))
+      ORDER BY c.embedding::HALFVEC(1536) <=> query_embedding::HALFVEC(1536)
+      LIMIT match_count * factor;
+  ELSE
+    RETURN QUERY
+      SELECT c.id FROM policy_chunks c
+      WHERE c.uploaded_policy_id = policy_id_filter
+        AND (section_filter IS NULL OR c.section_type = ANY(section_filter))
+      ORDER BY c.embedding <=> query_embedding
+      LIMIT match_count;
+  END IF;
+END;
+$$;
+
 -- ── RPC: Direct semantic similarity search ───────────────────────────────
+-- Return columns changed (char spans): CREATE OR REPLACE cannot alter them in place
+DROP FUNCTION IF EXISTS match_chunks_direct(VECTOR(1536), UUID, INT);
 CREATE OR REPLACE FUNCTION match_chunks_direct(
   query_embedding VECTOR(1536),
   policy_id_filter UUID,
   match_count INT DEFAULT 8
 )
-RETURNS TABLE(id UUID, content TEXT, page_number INT, section_type TEXT, similarity FLOAT)
+RETURNS TABLE(
+  id UUID, content TEXT, page_number INT, section_type TEXT, char_start INT, char_end INT, similarity FLOAT
+)
 LANGUAGE SQL STABLE AS $$
-  SELECT id, content, page_number, section_type,
+  SELECT id, content, page_number, section_type, char_start, char_end,
     1 - (embedding <=> query_embedding) AS similarity
   FROM policy_chunks
   WHERE uploaded_policy_id = policy_id_filter
+    AND id IN (SELECT ann_candidates(query_embedding, policy_id_filter, NULL, match_count))
   ORDER BY embedding <=> query_embedding
   LIMIT match_count;
 $$;
 
 -- ── RPC: Section-filtered semantic search ────────────────────────────────
+DROP FUNCTION IF EXISTS match_chunks_by_section(VECTOR(1536), UUID, TEXT[], INT);
 CREATE OR REPLACE FUNCTION match_chunks_by_section(
   query_embedding VECTOR(1536),
   policy_id_filter UUID,
   section_filter TEXT[],
   match_count INT DEFAULT 3
 )
-RETURNS TABLE(id UUID, content TEXT, page_number INT, section_type TEXT, similarity FLOAT)
+RETURNS TABLE(
+  id UUID, content TEXT, page_number INT, section_type TEXT, char_start INT, char_end INT, similarity FLOAT
+)
 LANGUAGE SQL STABLE AS $$
-  SELECT id, content, page_number, section_type,
+  SELECT id, content, page_number, section_type, char_start, char_end,
     1 - (embedding <=> query_embedding) AS similarity
   FROM policy_chunks
   WHERE uploaded_policy_id = policy_id_filter
-    AND section_type = ANY(section_filter)
+    AND id IN (SELECT ann_candidates(query_embedding, policy_id_filter, section_filter, match_count))
   ORDER BY embedding <=> query_embedding
   LIMIT match_count;
 $$;
 
 -- ── RPC: Full-text keyword search ────────────────────────────────────────
+-- plainto_tsquery ANDs every term, so a full question ("is knee replacement covered under my
+-- policy") rarely matches one chunk. Keyword layers OR the terms instead and let ts_rank_cd
+-- order chunks matching more of them first — the same any-term recall as the in-process BM25.
+CREATE OR REPLACE FUNCTION any_term_tsquery(search_query TEXT)
+RETURNS TSQUERY
+LANGUAGE SQL IMMUTABLE AS $$
+  SELECT replace(plainto_tsquery('english', search_query)::TEXT, ' & ', ' | ')::TSQUERY;
+$$;
+
+DROP FUNCTION IF EXISTS keyword_search_chunks(TEXT, UUID, INT);
 CREATE OR REPLACE FUNCTION keyword_search_chunks(
   search_query TEXT,
   policy_id_filter UUID,
   match_count INT DEFAULT 8
 )
-RETURNS TABLE(id UUID, content TEXT, page_number INT, section_type TEXT, rank FLOAT)
+RETURNS TABLE(
+  id UUID, content TEXT, page_number INT, section_type TEXT, char_start INT, char_end INT, rank FLOAT
+)
 LANGUAGE SQL STABLE AS $$
-  SELECT id, content, page_number, section_type,
+  SELECT id, content, page_number, section_type, char_start, char_end,
     ts_rank_cd(content_tsv, query) AS rank
   FROM policy_chunks,
-    plainto_tsquery('english', search_query) query
+    any_term_tsquery(search_query) query
   WHERE uploaded_policy_id = policy_id_filter
     AND content_tsv @@ query
   ORDER BY rank DESC
   LIMIT match_count;
 $$;
+
+-- ── RPC: Hybrid search — every retrieval layer + RRF in one round trip ───
+-- layers: JSON array of
+--   {"name": "semantic", "kind": "semantic"|"keyword", "top_k": 8,
+--    "sections": ["exclusions", ...] | null, "fuse": true|false,
+--    "embedding": [..1536 floats..] | null  (overrides query_embedding for this layer),
+--    "query": "text" | null                 (overrides search_query for this layer)}
+-- Returns each layer's hits tagged with the layer name and 1-based rank. rrf_score is the
+-- Reciprocal Rank Fusion score of the chunk across all layers with fuse = true (NULL otherwise).
+DROP FUNCTION IF EXISTS hybrid_search(VECTOR(1536), TEXT, UUID, JSONB, INT);
+CREATE OR REPLACE FUNCTION hybrid_search(
+  query_embedding VECTOR(1536),
+  search_query TEXT,
+  policy_id_filter UUID,
+  layers JSONB,
+  rrf_k INT DEFAULT 60
+)
+RETURNS TABLE(
+  id UUID, content TEXT, page_number INT, section_type TEXT, char_start INT, char_end INT,
+  layer TEXT, layer_rank INT, score FLOAT, rrf_score FLOAT
+)
+LANGUAGE SQL STABLE AS $$
+  WITH spec AS (
+    SELECT s.name, s.kind, s.sections, s.top_k, COALESCE(s.fuse, FALSE) AS fuse,
+      COALESCE(s.embedding::TEXT::VECTOR(1536), query_embedding) AS emb,
+      any_term_tsquery(COALESCE(s.query, search_query)) AS tsq
+    FROM jsonb_to_recordset(layers)
+      AS s(name TEXT, kind TEXT, sections TEXT[], top_k INT, fuse BOOLEAN, embedding JSONB, query TEXT)
+  ),
+  hits AS (
+    SELECT s.name AS layer, s.fuse, h.*,
+      ROW_NUMBER() OVER (PARTITION BY s.name ORDER BY h.hit_score DESC)::INT AS hit_rank
+    FROM spec s
+    CROSS JOIN LATERAL (
+      (SELECT c.id AS chunk_id, c.content AS chunk_content, c.page_number AS chunk_page,
+          c.section_type AS chunk_section, c.char_start AS chunk_start, c.char_end AS chunk_end,
+          (1 - (c.embedding <=> s.emb))::FLOAT AS hit_score
+        FROM policy_chunks c
+        WHERE s.kind = 'semantic'
+          AND c.uploaded_policy_id = policy_id_filter
+          AND c.id IN (SELECT ann_candidates(s.emb, policy_id_filter, s.sections, s.top_k))
+        ORDER BY c.embedding <=> s.emb
+        LIMIT s.top_k)
+      UNION ALL
+      (SELECT c.id, c.content, c.page_number, c.section_type, c.char_start, c.char_end,
+          ts_rank_cd(c.content_tsv, s.tsq)::FLOAT
+        FROM policy_chunks c
+        WHERE s.kind = 'keyword'
+          AND c.uploaded_policy_id = policy_id_filter
+          AND c.content_tsv @@ s.tsq
+          AND (s.sections IS NULL OR c.section_type = ANY(s.sections))
+        ORDER BY 7 DESC
+        LIMIT s.top_k)
+    ) h
+  ),
+  fused AS (
+    SELECT chunk_id, SUM(1.0 / (rrf_k + hit_rank))::FLOAT AS total
+    FROM hits
+    WHERE fuse
+    GROUP BY chunk_id
+  )
+  SELECT h.chunk_id, h.chunk_content, h.chunk_page, h.chunk_section, h.chunk_start, h.chunk_end,
+    h.layer, h.hit_rank, h.hit_score, f.total
+  FROM hits h
+  LEFT JOIN fused f ON f.chunk_id = h.chunk_id
+  ORDER BY h.layer, h.hit_rank;
+$$;
+
+-- ── RPC: Switch a policy to a revised wording in one transaction ─────────
+-- The revision's new and changed chunks are first written under a hidden staging row
+-- (uploaded_policies.revision_of = target). This function then, atomically:
+--   deletes the target's chunks that are not in kept (vanished from the new wording),
+--   re-numbers / re-labels the kept ones (same text, possibly moved),
+--   moves the staged chunks onto the target and drops the staging row,
+--   and records the new file hash, chunk count and version.
+-- kept: JSON array of {"id", "chunk_index", "page_number", "section_type", "char_start", "char_end"}.
+-- Fails (and changes nothing) if the target moved past base_version meanwhile.
+CREATE OR REPLACE FUNCTION apply_policy_revision(
+  target UUID,
+  staging UUID,
+  kept JSONB,
+  base_version INT,
+  new_hash TEXT,
+  new_name TEXT,
+  new_chunk_count INT
+)
+RETURNS INT
+LANGUAGE plpgsql AS $$
+DECLARE
+  current_version INT;
+  updated INT;
+  removed INT;
+BEGIN
+  SELECT version INTO current_version FROM uploaded_policies WHERE id = target FOR UPDATE;
+  IF current_version IS DISTINCT FROM base_version THEN
+    RAISE EXCEPTION 'policy % is at version %, revision was diffed against %',
+      target, current_version, base_version;
+  END IF;
+
+  DELETE FROM policy_chunks
+  WHERE uploaded_policy_id = target
+    AND id NOT IN (SELECT (k->>'id')::UUID FROM jsonb_array_elements(kept) k);
+  GET DIAGNOSTICS removed = ROW_COUNT;
+
+  UPDATE policy_chunks c
+  SET chunk_index = k.chunk_index, page_number = k.page_number, section_type = k.section_type,
+      char_start = k.char_start, char_end = k.char_end
+  FROM jsonb_to_recordset(kept)
+    AS k(id UUID, chunk_index INT, page_number INT, section_type TEXT, char_start INT, char_end INT)
+  WHERE c.uploaded_policy_id = target AND c.id = k.id;
+  GET DIAGNOSTICS updated = ROW_COUNT;
+  IF updated <> jsonb_array_length(kept) THEN
+    RAISE EXCEPTION 'policy %: % of % kept chunks no longer exist', target, jsonb_array_length(kept) - updated,
+      jsonb_array_length(kept);
+  END IF;
+
+  UPDATE policy_chunks SET uploaded_policy_id = target WHERE uploaded_policy_id = staging;
+  DELETE FROM uploaded_policies WHERE id = staging;
+
+  UPDATE uploaded_policies
+  SET content_hash = new_hash, user_label = new_name, chunk_count = new_chunk_count,
+      version = version + 1, uploaded_at = NOW()
+  WHERE id = target;
+  RETURN removed;
+END;
+$$;
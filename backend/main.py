@@ -1,5 +1,7 @@
 """PolicyAI FastAPI Backend."""
 import os
+import asyncio
+import contextlib
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
@@ -7,20 +9,47 @@ load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from routers import discovery, qa, claim, chat
+from services import embedder, llm, pdf_parser, vector_store
+from services.semantic_cache import answer_cache
+from scripts import startup_seeder
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Startup: seed all PDFs from policies/ folder into Supabase pgvector."""
+async def _background_startup():
+    """
+    Warm constant query embeddings and the PDF parsing pool, then seed all PDFs from
+    policies/ folder into Supabase pgvector.
+    """
+    try:
+        await asyncio.to_thread(pdf_parser.warm_pool)
+        print(f"[Startup] Warmed {pdf_parser.PDF_PARSE_WORKERS} PDF parse worker(s)")
+    except Exception as e:
+        print(f"[Startup] PDF parse pool warm-up warning: {e}")
+    try:
+        await embedder.warm_constant_queries()
+        print(f"[Startup] Warmed {len(embedder.CONSTANT_QUERIES)} constant query embeddings")
+    except Exception as e:
+        print(f"[Startup] Constant query warm-up warning: {e}")
+
     print("[Startup] Checking policy embeddings...")
     try:
-        from scripts.startup_seeder import seed_all_policies
-        seed_all_policies()
+        await startup_seeder.seed_all_policies()
     except Exception as e:
         print(f"[Startup] Seeder warning: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup work runs in the background so the app serves traffic at once; see /api/ready."""
+    startup = asyncio.create_task(_background_startup())
     yield
+    startup.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await startup
+    await vector_store.close_pool()
+    pdf_parser.shutdown_pool()
     print("[Shutdown] PolicyAI backend stopping.")
 
 
@@ -50,12 +79,42 @@ async def health():
     return {"status": "ok", "service": "PolicyAI Backend"}
 
 
+@app.get("/api/ready")
+async def ready():
+    """
+    Startup seeding progress: 200 once every policy PDF has been checked and embedded, 503 while
+    seeding, 500 with the error if the run crashed. A failed run is not retried in-process;
+    restart the service (already embedded PDFs are skipped) or run scripts/startup_seeder.py.
+    """
+    seeding = startup_seeder.seed_status()
+    if seeding["state"] == "failed":
+        return JSONResponse(
+            {"ready": False, "seeding": seeding, "detail": f"Policy seeding failed: {seeding['error']}"},
+            status_code=500,
+        )
+    is_ready = seeding["state"] == "done"
+    return JSONResponse({"ready": is_ready, "seeding": seeding}, status_code=200 if is_ready else 503)
+
+
+@app.get("/api/stats")
+async def stats():
+    """In-process cache counters."""
+    return {
+        "query_embeddings": embedder.query_cache_stats(),
+        "llm_responses": llm.cache_stats(),
+        "semantic_answers": answer_cache.stats(),
+        "vector_index": vector_store.vector_index_stats(),
+    }
+
+
 @app.get("/")
 async def root():
     return {
         "service": "PolicyAI",
         "docs": "/docs",
         "health": "/api/health",
+        "ready": "/api/ready",
+        "stats": "/api/stats",
         "endpoints": [
             "POST /api/discover",
             "POST /api/discover/chat",
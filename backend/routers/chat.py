@@ -6,6 +6,7 @@ Endpoints:
   GET    /api/chat/sessions                      — list recent sessions
   GET    /api/chat/sessions/{session_id}         — get session + all messages
   POST   /api/chat/sessions/{session_id}/messages — send message + get AI response
+  POST   /api/chat/sessions/{session_id}/messages/stream — same, as server-sent events
   DELETE /api/chat/sessions/{session_id}         — delete session (cascades messages)
 
 AI response logic:
@@ -19,15 +20,16 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 from services import llm
-from services.vector_store import get_client
+from services.vector_store import get_async_client
+from services.sse import stream_events
 from services.skills import PolicyRanker, hard_filter
 from services.vector_store import list_catalog_policies
 from services.advisor_agent import (
     classify_intent,
     find_uploaded_for_insurer,
     get_rag_insights,
-    explain_term,
-    get_chat_reply,
+    stream_explain_term,
+    stream_chat_reply,
 )
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
@@ -40,6 +42,9 @@ Return ONLY the summary text, no JSON."""
 CHAT_INTRO_SYSTEM = """You are a warm health insurance advisor. Write a friendly 1-2 sentence response acknowledging what the user asked for, right before showing their policy recommendations. Be specific about what you understood. Do not say "Great!" or "Sure!" — be natural.
 Return ONLY valid JSON: {"message": "your response here"}"""
 
+# explain_term() field → key it is returned under in the explanation result
+_EXPLAIN_KEYS = {"explanation": "message"}
+
 NO_RESULTS_MESSAGE = (
     "No policies in our catalog match all your hard requirements. "
     "Try relaxing your budget, removing a specific coverage requirement, "
@@ -49,26 +54,29 @@ NO_RESULTS_MESSAGE = (
 
 # ── DB helpers ────────────────────────────────────────────────────────────────
 
-def _db():
-    return get_client()
+async def _db():
+    return await get_async_client()
 
 
-def _create_session(user_id: str = "anonymous", session_name: Optional[str] = None) -> dict:
+async def _create_session(user_id: str = "anonymous", session_name: Optional[str] = None) -> dict:
     data = {"user_id": user_id, "context": {}}
     if session_name:
         data["session_name"] = session_name
-    res = _db().table("chat_sessions").insert(data).execute()
+    db = await _db()
+    res = await db.table("chat_sessions").insert(data).execute()
     return res.data[0]
 
 
-def _get_session(session_id: str) -> dict | None:
-    res = _db().table("chat_sessions").select("*").eq("id", session_id).execute()
+async def _get_session(session_id: str) -> dict | None:
+    db = await _db()
+    res = await db.table("chat_sessions").select("*").eq("id", session_id).execute()
     return res.data[0] if res.data else None
 
 
-def _list_sessions(limit: int = 20) -> list[dict]:
-    res = (
-        _db().table("chat_sessions")
+async def _list_sessions(limit: int = 20) -> list[dict]:
+    db = await _db()
+    res = await (
+        db.table("chat_sessions")
         .select("id, user_id, session_name, context, created_at, updated_at")
         .order("updated_at", desc=True)
         .limit(limit)
@@ -77,9 +85,10 @@ def _list_sessions(limit: int = 20) -> list[dict]:
     return res.data or []
 
 
-def _get_messages(session_id: str, limit: int = 100) -> list[dict]:
-    res = (
-        _db().table("chat_messages")
+async def _get_messages(session_id: str, limit: int = 100) -> list[dict]:
+    db = await _db()
+    res = await (
+        db.table("chat_messages")
         .select("id, role, content, metadata, created_at")
         .eq("session_id", session_id)
         .order("created_at", desc=False)
@@ -89,27 +98,30 @@ def _get_messages(session_id: str, limit: int = 100) -> list[dict]:
     return res.data or []
 
 
-def _insert_message(session_id: str, role: str, content: str, metadata: dict | None = None) -> dict:
+async def _insert_message(session_id: str, role: str, content: str, metadata: dict | None = None) -> dict:
     row = {
         "session_id": session_id,
         "role": role,
         "content": content,
         "metadata": metadata or {},
     }
-    res = _db().table("chat_messages").insert(row).execute()
+    db = await _db()
+    res = await db.table("chat_messages").insert(row).execute()
     return res.data[0]
 
 
-def _update_session(session_id: str, context: dict):
+async def _update_session(session_id: str, context: dict):
     from datetime import datetime, timezone
-    _db().table("chat_sessions").update({
+    db = await _db()
+    await db.table("chat_sessions").update({
         "context": context,
         "updated_at": datetime.now(timezone.utc).isoformat(),
     }).eq("id", session_id).execute()
 
 
-def _delete_session(session_id: str):
-    _db().table("chat_sessions").delete().eq("id", session_id).execute()
+async def _delete_session(session_id: str):
+    db = await _db()
+    await db.table("chat_sessions").delete().eq("id", session_id).execute()
 
 
 # ── Context management ────────────────────────────────────────────────────────
@@ -120,29 +132,42 @@ def _build_context_string(messages: list[dict]) -> str:
     return "\n".join([f"{m['role'].upper()}: {m['content']}" for m in recent])
 
 
-def _maybe_summarize(full_context: str) -> str:
+async def _maybe_summarize(full_context: str) -> str:
     """If context is too long, summarize the older half to keep token count manageable."""
     if len(full_context) <= 6000:
         return full_context
     midpoint = len(full_context) // 2
     old_half = full_context[:midpoint]
     recent_half = full_context[midpoint:]
-    summary = llm.chat_text(CONTEXT_SUMMARY_SYSTEM, old_half, temperature=0.1)
+    summary = await llm.chat_text(CONTEXT_SUMMARY_SYSTEM, old_half, temperature=0.1)
     return f"[EARLIER CONVERSATION SUMMARY]\n{summary}\n\n[RECENT MESSAGES]\n{recent_half}"
 
 
-def _process_message(content: str, db_messages: list[dict], session_context: dict) -> dict:
+async def _process_message(content: str, db_messages: list[dict], session_context: dict) -> dict:
     """
     3-mode conversational advisor (mirrors discovery.py /discover/chat logic).
       GATHER  — asks smart follow-up questions until all 3 essential fields present
       EXPLAIN — explains insurance terms grounded in actual uploaded PDF text
       RECOMMEND — hard filter + weighted rank + RAG insights from PDF for top 3
     """
+    response: dict = {}
+    async for event, data in _process_message_events(content, db_messages, session_context):
+        if event == "result":
+            response = data
+    return response
+
+
+async def _process_message_events(content: str, db_messages: list[dict], session_context: dict):
+    """
+    _process_message as (event, data) pairs: `stage` progress, early `policies`, `token` /
+    `field` while the reply is generated, final `result`. Field events use result keys.
+    """
     context_str = _build_context_string(db_messages)
-    context_str = _maybe_summarize(context_str)
+    context_str = await _maybe_summarize(context_str)
 
     # Classify intent and extract requirements from full conversation
-    intent_result = classify_intent(context_str)
+    yield "stage", {"stage": "classifying"}
+    intent_result = await classify_intent(context_str)
     intent = intent_result.get("intent", "gather_info")
     extracted = intent_result.get("extracted") or {}
     extracted["needs"] = extracted.get("needs") or []
@@ -159,13 +184,21 @@ def _process_message(content: str, db_messages: list[dict], session_context: dic
             intent_result.get("next_question")
             or "Could you tell me your health coverage needs, annual budget, and family size?"
         )
-        return {"type": "question", "message": question}
+        yield "result", {"type": "question", "message": question}
+        return
 
     # MODE CHAT: conversational / educational reply
     if intent == "chat_reply":
         session_policy_ids = session_context.get("last_recommended_uploaded_ids", [])
-        reply = get_chat_reply(content, session_policy_ids)
-        return {"type": "chat", "message": reply["answer"]}
+        yield "stage", {"stage": "answering"}
+        async for event, data in stream_chat_reply(content, session_policy_ids):
+            if event == "field":
+                yield "field", {"message": data["answer"]}
+            elif event == "token":
+                yield event, data
+            else:
+                yield "result", {"type": "chat", "message": data["answer"]}
+        return
 
     # MODE EXPLAIN: user asked about an insurance term or specific policy
     if intent in ("explain_term", "explain_policy"):
@@ -173,8 +206,16 @@ def _process_message(content: str, db_messages: list[dict], session_context: dic
         if term:
             # Retrieve uploaded policy IDs stored in session context from last recommendation
             session_policy_ids = session_context.get("last_recommended_uploaded_ids", [])
-            result = explain_term(term, session_policy_ids)
-            return {
+            yield "stage", {"stage": "explaining", "term": term}
+            result: dict = {}
+            async for event, data in stream_explain_term(term, session_policy_ids):
+                if event == "field":
+                    yield "field", {_EXPLAIN_KEYS.get(k, k): v for k, v in data.items()}
+                elif event == "token":
+                    yield event, data
+                else:
+                    result = data
+            yield "result", {
                 "type": "explanation",
                 "message": result.get("explanation", ""),
                 "example": result.get("example"),
@@ -182,46 +223,59 @@ def _process_message(content: str, db_messages: list[dict], session_context: dic
                 "policy_name": result.get("policy_name"),
                 "found": result.get("found", False),
             }
+            return
 
     # MODE RECOMMEND: all 3 essential fields present
-    all_policies = list_catalog_policies()
+    yield "stage", {"stage": "ranking"}
+    all_policies = await list_catalog_policies()
     filtered = hard_filter(all_policies, extracted)
 
     if not filtered:
-        return {
+        yield "result", {
             "type": "no_results",
             "message": NO_RESULTS_MESSAGE,
             "extracted_requirements": extracted,
             "policies": [],
             "total_found": 0,
         }
+        return
 
     ranked = ranker.rank(extracted, filtered)
     top_policies = ranked[:6]
     user_needs = extracted["needs"] + extracted["preexisting_conditions"]
+    # Ranked list is final before enrichment — let streaming clients render it now
+    yield "policies", {"policies": top_policies, "total_found": len(ranked), "extracted_requirements": extracted}
 
     # RAG enrichment: top 3 policies → find matching uploaded PDF → surface hidden traps
     uploaded_ids: list[str] = []
     for policy in top_policies[:3]:
-        uploaded = find_uploaded_for_insurer(policy.get("insurer", ""))
+        uploaded = await find_uploaded_for_insurer(policy.get("insurer", ""))
         if uploaded:
-            insights = get_rag_insights(uploaded["id"], user_needs)
+            insights = await get_rag_insights(uploaded["id"], user_needs)
             policy["rag_insights"] = insights
             policy["uploaded_policy_id"] = uploaded["id"]
             uploaded_ids.append(uploaded["id"])
+            yield "insights", {"policy_id": policy.get("id"), "rag_insights": insights}
         else:
             policy["rag_insights"] = {"available": False}
 
     last_user = next(
         (m["content"] for m in reversed(db_messages) if m["role"] == "user"), content
     )
-    intro_result = llm.chat_json(
+    yield "stage", {"stage": "answering"}
+    intro_result: dict = {}
+    async for event, data in llm.stream_json_fields(
         CHAT_INTRO_SYSTEM,
         f"User asked: {last_user}\nExtracted needs: {extracted}",
-    )
+        ("message",),
+    ):
+        if event == "result":
+            intro_result = data
+        else:
+            yield event, data
     message = intro_result.get("message") or "Here are the best policies matching your needs:"
 
-    return {
+    yield "result", {
         "type": "results",
         "message": message,
         "extracted_requirements": extracted,
@@ -247,7 +301,7 @@ class SendMessageRequest(BaseModel):
 @router.post("/sessions")
 async def create_session(req: CreateSessionRequest):
     """Create a new chat session. Returns session_id for client to store."""
-    session = _create_session(req.user_id or "anonymous", req.session_name)
+    session = await _create_session(req.user_id or "anonymous", req.session_name)
     return {
         "session_id": session["id"],
         "created_at": session["created_at"],
@@ -257,17 +311,17 @@ async def create_session(req: CreateSessionRequest):
 @router.get("/sessions")
 async def list_sessions():
     """List the 20 most recent sessions ordered by last activity."""
-    sessions = _list_sessions(limit=20)
+    sessions = await _list_sessions(limit=20)
     return {"sessions": sessions}
 
 
 @router.get("/sessions/{session_id}")
 async def get_session(session_id: str):
     """Get session metadata + full message history."""
-    session = _get_session(session_id)
+    session = await _get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found.")
-    messages = _get_messages(session_id)
+    messages = await _get_messages(session_id)
     return {
         "session": session,
         "messages": messages,
@@ -285,26 +339,55 @@ async def send_message(session_id: str, req: SendMessageRequest):
     5. Update session context with extracted state
     6. Return AI response
     """
-    session = _get_session(session_id)
+    session = await _get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found.")
 
     # Persist user message
-    _insert_message(session_id, "user", req.content)
+    await _insert_message(session_id, "user", req.content)
 
     # Get all messages for context (last 10 used internally)
-    db_messages = _get_messages(session_id)
+    db_messages = await _get_messages(session_id)
 
     # Generate AI response
-    ai_response = _process_message(req.content, db_messages, session.get("context", {}))
+    ai_response = await _process_message(req.content, db_messages, session.get("context", {}))
+    return await _persist_response(session_id, session, ai_response)
+
+
+@router.post("/sessions/{session_id}/messages/stream")
+async def send_message_stream(session_id: str, req: SendMessageRequest):
+    """
+    Streaming variant of send_message over server-sent events.
+    Events: `stage` (pipeline progress), `policies` (ranked list before RAG enrichment),
+    `insights` (per-policy RAG insights), `token` (raw JSON deltas while the reply is
+    generated), `field` (a reply field such as `message` once its value is complete,
+    keyed as in the result), `result` (same body as send_message, sent after the
+    assistant message and session context are persisted).
+    """
+    session = await _get_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found.")
+
+    async def events():
+        await _insert_message(session_id, "user", req.content)
+        db_messages = await _get_messages(session_id)
+        async for event, data in _process_message_events(req.content, db_messages, session.get("context", {})):
+            if event == "result":
+                data = await _persist_response(session_id, session, data)
+            yield event, data
+
+    return stream_events(events())
+
 
+async def _persist_response(session_id: str, session: dict, ai_response: dict) -> dict:
+    """Persist the assistant message, fold extracted state into the session context, return the API body."""
     # Persist assistant message with metadata
     metadata = {
         "type": ai_response.get("type"),
         "policies": ai_response.get("policies", []),
         "extracted_requirements": ai_response.get("extracted_requirements", {}),
     }
-    persisted = _insert_message(session_id, "assistant", ai_response["message"], metadata)
+    persisted = await _insert_message(session_id, "assistant", ai_response["message"], metadata)
 
     # Update session context with extracted state + uploaded policy IDs for term lookups
     updated_context = {**session.get("context", {})}
@@ -320,7 +403,7 @@ async def send_message(session_id: str, req: SendMessageRequest):
     if ai_response.get("uploaded_policy_ids"):
         updated_context["last_recommended_uploaded_ids"] = ai_response["uploaded_policy_ids"]
     if updated_context != session.get("context", {}):
-        _update_session(session_id, updated_context)
+        await _update_session(session_id, updated_context)
 
     return {
         **ai_response,
@@ -332,8 +415,8 @@ async def send_message(session_id: str, req: SendMessageRequest):
 @router.delete("/sessions/{session_id}")
 async def delete_session(session_id: str):
     """Delete session and all its messages (cascade)."""
-    session = _get_session(session_id)
+    session = await _get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found.")
-    _delete_session(session_id)
+    await _delete_session(session_id)
     return {"deleted": True, "session_id": session_id}
@@ -4,6 +4,7 @@ Feature 4: Medical report → extract conditions → match against policies
 Feature 5: Existing policy + diagnosis → deterministic claim eligibility
 Feature 6: Coverage gap analysis for any catalog policy
 """
+import asyncio
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
@@ -12,7 +13,7 @@ from services import vector_store
 from services.claim_engine import run_claim_check
 from services.skills import HiddenConditionsDetector, CoverageGapScanner
 from services.medical_extractor import extract_from_text, extract_from_pdf_bytes, match_conditions_to_exclusions
-from services.advisor_agent import find_uploaded_for_insurer, get_rag_insights
+from services.advisor_agent import find_uploaded_for_insurer, get_rag_insights, GAP_NEEDS
 
 router = APIRouter(prefix="/api", tags=["claim"])
 gap_scanner = CoverageGapScanner()
@@ -43,12 +44,14 @@ async def claim_check(req: ClaimCheckRequest):
     Score is computed by rule-based function — not by LLM.
     """
     # Verify policy exists (uploaded or catalog)
-    policy = vector_store.get_policy_by_id(req.policy_id)
-    catalog = vector_store.get_catalog_policy(req.policy_id)
+    policy, catalog = await asyncio.gather(
+        vector_store.get_policy_by_id(req.policy_id),
+        vector_store.get_catalog_policy(req.policy_id),
+    )
     if not policy and not catalog:
         raise HTTPException(status_code=404, detail="Policy not found.")
 
-    result = run_claim_check(
+    result = await run_claim_check(
         policy_id=req.policy_id,
         condition=req.diagnosis,
         treatment_type=req.treatment_type or "hospitalization",
@@ -69,14 +72,14 @@ async def claim_check(req: ClaimCheckRequest):
 @router.post("/extract-conditions")
 async def extract_conditions_from_text_endpoint(req: ExtractConditionsRequest):
     """Extract medical conditions from free text input."""
-    return extract_from_text(req.text)
+    return await extract_from_text(req.text)
 
 
 @router.post("/extract-conditions-file")
 async def extract_conditions_from_file(file: UploadFile = File(...)):
     """Extract medical conditions from uploaded medical report PDF."""
     contents = await file.read()
-    return extract_from_pdf_bytes(contents)
+    return await extract_from_pdf_bytes(contents)
 
 
 @router.post("/match-conditions")
@@ -85,7 +88,7 @@ async def match_conditions(req: MatchConditionsRequest):
     Given extracted conditions, rank all catalog policies by suitability.
     Flags policies where conditions may be excluded.
     """
-    all_policies = vector_store.list_catalog_policies()
+    all_policies = await vector_store.list_catalog_policies()
     flagged = match_conditions_to_exclusions(req.conditions, all_policies)
 
     # Sort: fewer exclusion flags first
@@ -107,7 +110,7 @@ async def gap_analysis(policy_id: str):
     Catalog policies: rule-based metadata scan.
     Uploaded policies: RAG-based analysis from chunks.
     """
-    catalog_policy = vector_store.get_catalog_policy(policy_id)
+    catalog_policy = await vector_store.get_catalog_policy(policy_id)
     if catalog_policy:
         gaps = gap_scanner.scan(catalog_policy)
         severity_order = {"HIGH": 0, "MEDIUM": 1, "LOW": 2}
@@ -116,15 +119,10 @@ async def gap_analysis(policy_id: str):
         # RAG enrichment: find the uploaded PDF for this insurer → surface hidden conditions
         rag_hidden: list[dict] = []
         rag_available = False
-        uploaded = find_uploaded_for_insurer(catalog_policy.get("insurer", ""))
+        uploaded = await find_uploaded_for_insurer(catalog_policy.get("insurer", ""))
         if uploaded:
             rag_available = True
-            gap_needs = [
-                "room rent", "co-pay", "waiting period", "sub-limit",
-                "exclusion", "pre-authorization", "proportional deduction",
-                "co-payment", "deductible", "network hospital",
-            ]
-            insights = get_rag_insights(uploaded["id"], gap_needs)
+            insights = await get_rag_insights(uploaded["id"], GAP_NEEDS)
             if insights.get("available") and insights.get("hidden_traps"):
                 rag_hidden = insights["hidden_traps"]
 
@@ -139,7 +137,7 @@ async def gap_analysis(policy_id: str):
             "rag_available": rag_available,
         }
 
-    uploaded = vector_store.get_policy_by_id(policy_id)
+    uploaded = await vector_store.get_policy_by_id(policy_id)
     if not uploaded:
         raise HTTPException(status_code=404, detail="Policy not found.")
 
@@ -148,7 +146,7 @@ async def gap_analysis(policy_id: str):
         "Does it lack maternity, OPD, mental health, dental, restoration, or NCB benefits? "
         "Are there any high waiting periods, room rent caps, or co-pay requirements?"
     )
-    gap_result = detector.detect(gap_question, policy_id)
+    gap_result = await detector.detect(gap_question, policy_id)
 
     return {
         "policy_name": uploaded.get("user_label", "Unknown Policy"),
@@ -61,7 +61,7 @@ class DiscoverChatRequest(BaseModel):
     session_policy_ids: list[str] = []  # uploaded PDF IDs from last recommendation (for term lookup)
 
 
-def _apply_hard_filter_and_rank(requirements: dict) -> list[dict]:
+async def _apply_hard_filter_and_rank(requirements: dict) -> list[dict]:
     """
     Applies hard_filter first. If 0 survive, returns [].
     No silent fallback — caller decides how to handle empty.
@@ -69,7 +69,7 @@ def _apply_hard_filter_and_rank(requirements: dict) -> list[dict]:
     requirements["needs"] = requirements.get("needs") or []
     requirements["preexisting_conditions"] = requirements.get("preexisting_conditions") or []
 
-    all_policies = vector_store.list_catalog_policies()
+    all_policies = await vector_store.list_catalog_policies()
     filtered = hard_filter(all_policies, requirements)
 
     if not filtered:
@@ -81,8 +81,8 @@ def _apply_hard_filter_and_rank(requirements: dict) -> list[dict]:
 @router.post("/discover")
 async def discover_policies(req: DiscoverRequest):
     """Extract requirements from natural language, apply hard filter, return deterministic ranked list."""
-    requirements = llm.chat_json(EXTRACT_REQUIREMENTS_SYSTEM, req.query)
-    ranked = _apply_hard_filter_and_rank(requirements)
+    requirements = await llm.chat_json(EXTRACT_REQUIREMENTS_SYSTEM, req.query)
+    ranked = await _apply_hard_filter_and_rank(requirements)
 
     if not ranked:
         return {
@@ -117,7 +117,7 @@ async def discover_chat(req: DiscoverChatRequest):
     conversation = "\n".join([
         f"{m['role'].upper()}: {m['content']}" for m in req.messages
     ])
-    intent_result = classify_intent(conversation)
+    intent_result = await classify_intent(conversation)
 
     intent = intent_result.get("intent", "gather_info")
     extracted = intent_result.get("extracted") or {}
@@ -142,14 +142,14 @@ async def discover_chat(req: DiscoverChatRequest):
         last_user = next(
             (m["content"] for m in reversed(req.messages) if m["role"] == "user"), ""
         )
-        reply = get_chat_reply(last_user, req.session_policy_ids)
+        reply = await get_chat_reply(last_user, req.session_policy_ids)
         return {"type": "chat", "message": reply["answer"]}
 
     # ── MODE EXPLAIN: user asked about a term or specific policy ─────────────
     if intent in ("explain_term", "explain_policy"):
         term = intent_result.get("term_to_explain") or intent_result.get("policy_name_asked")
         if term:
-            result = explain_term(term, req.session_policy_ids)
+            result = await explain_term(term, req.session_policy_ids)
             return {
                 "type": "explanation",
                 "message": result.get("explanation", ""),
@@ -160,7 +160,7 @@ async def discover_chat(req: DiscoverChatRequest):
             }
 
     # ── MODE RECOMMEND: all 3 essential fields present ────────────────────────
-    ranked = _apply_hard_filter_and_rank(extracted)
+    ranked = await _apply_hard_filter_and_rank(extracted)
 
     if not ranked:
         return {
@@ -178,9 +178,9 @@ async def discover_chat(req: DiscoverChatRequest):
     uploaded_ids: list[str] = []
 
     for i, policy in enumerate(top_policies[:3]):
-        uploaded = find_uploaded_for_insurer(policy.get("insurer", ""))
+        uploaded = await find_uploaded_for_insurer(policy.get("insurer", ""))
         if uploaded:
-            insights = get_rag_insights(uploaded["id"], user_needs, policy.get("insurer", ""))
+            insights = await get_rag_insights(uploaded["id"], user_needs, policy.get("insurer", ""))
             policy["rag_insights"] = insights
             policy["uploaded_policy_id"] = uploaded["id"]
             uploaded_ids.append(uploaded["id"])
@@ -191,7 +191,7 @@ async def discover_chat(req: DiscoverChatRequest):
     last_user = next(
         (m["content"] for m in reversed(req.messages) if m["role"] == "user"), ""
     )
-    intro_result = llm.chat_json(
+    intro_result = await llm.chat_json(
         CHAT_INTRO_SYSTEM,
         f"User asked: {last_user}\nExtracted needs: {extracted}",
     )
@@ -217,7 +217,7 @@ async def compare_policies(req: CompareRequest):
 
     policies = [
         p for pid in req.policy_ids
-        if (p := vector_store.get_catalog_policy(pid)) is not None
+        if (p := await vector_store.get_catalog_policy(pid)) is not None
     ]
 
     if len(policies) < 2:
@@ -268,7 +268,9 @@ async def compare_policies(req: CompareRequest):
         for p in policies
     ])
 
-    ai_summary = llm.chat_json(COMPARISON_SYSTEM, f"Compare these policies:\n{policy_summary}")
+    ai_summary = await llm.chat_json(
+        COMPARISON_SYSTEM, f"Compare these policies:\n{policy_summary}", cache=True
+    )
 
     return {
         "policies": [{"id": p["id"], "name": p["name"], "insurer": p["insurer"]} for p in policies],
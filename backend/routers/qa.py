@@ -4,10 +4,11 @@ Feature 3: Upload policy PDF → ask coverage questions → structured verdict w
 """
 import os
 import tempfile
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from pydantic import BaseModel
-from services import pdf_parser, embedder, vector_store
+from services import ingest, vector_store
 from services.skills import HiddenConditionsDetector
+from services.sse import stream_events
 
 router = APIRouter(prefix="/api", tags=["qa"])
 detector = HiddenConditionsDetector()
@@ -21,24 +22,25 @@ class AskRequest(BaseModel):
 @router.get("/policies")
 async def list_policies():
     """List all uploaded (embedded) policy documents."""
-    policies = vector_store.list_uploaded_policies()
+    policies = await vector_store.list_uploaded_policies()
     return {"policies": policies}
 
 
 @router.post("/upload")
-async def upload_policy(file: UploadFile = File(...)):
-    """Upload a policy PDF, chunk it, embed it, and store in Supabase."""
+async def upload_policy(
+    file: UploadFile = File(...),
+    insurer: str = Form(""),
+    policy_id: str | None = Form(None),
+):
+    """
+    Upload a policy PDF, chunk it, embed it, and store in Supabase. Re-uploading the same file
+    (under any name) returns the stored policy. A new version updates a stored policy in place,
+    embedding only the chunks that changed, when policy_id names it or when a policy with the
+    same filename and insurer exists; otherwise it is stored as a new policy.
+    """
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
 
-    # Check if already embedded
-    if vector_store.policy_already_embedded(file.filename):
-        # Return existing policy_id
-        policies = vector_store.list_uploaded_policies()
-        existing = next((p for p in policies if p["filename"] == file.filename), None)
-        if existing:
-            return {"policy_id": existing["id"], "message": "Already embedded", "chunk_count": existing["chunk_count"]}
-
     # Save to temp file for PyMuPDF
     contents = await file.read()
     with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
@@ -46,42 +48,32 @@ async def upload_policy(file: UploadFile = File(...)):
         tmp_path = tmp.name
 
     try:
-        # Parse PDF into section-aware chunks
-        chunks = pdf_parser.parse_pdf(tmp_path)
-        if not chunks:
+        # Parse → embed → insert as one pipeline (parsing runs off the event loop)
+        try:
+            result = await ingest.ingest_pdf(tmp_path, file.filename, insurer, policy_id)
+        except LookupError:
+            raise HTTPException(status_code=404, detail="Policy not found.")
+        if result["policy_id"] is None:
             raise HTTPException(status_code=422, detail="No text could be extracted from this PDF.")
-
-        policy_name = pdf_parser.extract_policy_name(tmp_path)
-
-        # Register document
-        policy_id = vector_store.create_uploaded_policy(
-            name=policy_name,
-            filename=file.filename,
-        )
-
-        # Embed and store chunks
-        texts = [c.content for c in chunks]
-        embeddings = embedder.embed_batch(texts)
-
-        rows = [
-            {
-                "content": chunks[i].content,
-                "embedding": embeddings[i],
-                "page_number": chunks[i].page_number,
-                "chunk_index": chunks[i].chunk_index,
-                "section_type": chunks[i].section_type,
-            }
-            for i in range(len(chunks))
-        ]
-
-        vector_store.insert_chunks(policy_id, rows)
-        vector_store.update_chunk_count(policy_id, len(rows))
+        if result["action"] == "unchanged":
+            return {"policy_id": result["policy_id"], "message": "Already embedded", "chunk_count": result["chunk_count"]}
 
         return {
-            "policy_id": policy_id,
-            "policy_name": policy_name,
-            "chunk_count": len(chunks),
-            "message": f"Successfully embedded {len(chunks)} chunks.",
+            "policy_id": result["policy_id"],
+            "policy_name": result["policy_name"],
+            "action": result["action"],
+            "chunk_count": result["chunk_count"],
+            "reused": result["reused"],
+            "removed": result["removed"],
+            "embedded_tokens": result["embedded_tokens"],
+            "rows_per_sec": result["rows_per_sec"],
+            "stages": result["stages"],
+            "message": (
+                f"Updated: {result['chunk_count'] - result['reused']} chunks embedded, "
+                f"{result['reused']} unchanged, {result['removed']} removed."
+                if result["action"] == "revised"
+                else f"Successfully embedded {result['chunk_count']} chunks."
+            ),
         }
     finally:
         os.unlink(tmp_path)
@@ -94,14 +86,39 @@ async def ask_question(req: AskRequest):
     Uses 3-layer hybrid RAG + Hidden Conditions Detector.
     Returns structured verdict with explicit AND implicit conditions.
     """
-    policy = vector_store.get_policy_by_id(req.policy_id)
+    policy = await vector_store.get_policy_by_id(req.policy_id)
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found. Upload a PDF first.")
 
-    result = detector.detect(question=req.question, policy_id=req.policy_id)
+    result = await detector.detect(question=req.question, policy_id=req.policy_id)
 
     return {
         "policy_name": policy.get("user_label", "Unknown Policy"),
         "question": req.question,
         **result,
     }
+
+
+@router.post("/ask/stream")
+async def ask_question_stream(req: AskRequest):
+    """
+    Streaming /ask over server-sent events.
+    Events: `citations` (page/section of retrieved clauses), `field` (verdict fields
+    as soon as GPT completes them), `token` (raw JSON deltas), `result` (final verdict,
+    same shape as /ask).
+    """
+    policy = await vector_store.get_policy_by_id(req.policy_id)
+    if not policy:
+        raise HTTPException(status_code=404, detail="Policy not found. Upload a PDF first.")
+
+    async def events():
+        async for event, data in detector.stream(question=req.question, policy_id=req.policy_id):
+            if event == "result":
+                data = {
+                    "policy_name": policy.get("user_label", "Unknown Policy"),
+                    "question": req.question,
+                    **data,
+                }
+            yield event, data
+
+    return stream_events(events())
@@ -0,0 +1,102 @@
+"""
+Microbenchmark for section classification: the per-pattern search loop vs the single-pass
+_SectionHits classifier, over every page and chunk of the policy PDFs. Also checks that both
+assign the same section to every page and chunk.
+
+  python scripts/bench_sections.py [pdf-or-dir ...] [--repeat 5]
+"""
+import sys
+import os
+import re
+import glob
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import fitz
+from services import pdf_parser
+
+DEFAULT_DIR = os.path.join(os.path.dirname(__file__), "../../Policies")
+
+# The previous classifier: every pattern searched separately, first section in priority order wins
+_PER_PATTERN = {
+    section: [re.compile(p, re.IGNORECASE | re.MULTILINE) for p in patterns]
+    for section, patterns in pdf_parser.SECTION_PATTERNS.items()
+}
+
+
+def _per_pattern_section(text: str) -> str | None:
+    for section, patterns in _PER_PATTERN.items():
+        for pattern in patterns:
+            if pattern.search(text):
+                return section
+    return None
+
+
+def classify_per_pattern(pages: list[tuple[str, list[tuple[int, int]]]]) -> list:
+    out = []
+    for text, spans in pages:
+        out.append(_per_pattern_section(text))
+        out.extend(_per_pattern_section(text[s:e]) for s, e in spans)
+    return out
+
+
+def classify_single_pass(pages: list[tuple[str, list[tuple[int, int]]]]) -> list:
+    out = []
+    for text, spans in pages:
+        hits = pdf_parser._SectionHits(text)
+        out.append(hits.page_section())
+        out.extend(hits.span_section(s, e) for s, e in spans)
+    return out
+
+
+def _best_of(fn, pages, repeat: int) -> tuple[list, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(pages)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Section classifier microbenchmark")
+    parser.add_argument("paths", nargs="*", default=[DEFAULT_DIR])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**/*.pdf"), recursive=True)))
+        else:
+            files.append(path)
+    if not files:
+        print(f"[Bench] No PDFs found in {args.paths}")
+        return
+
+    # Text extraction is the same for both classifiers, so do it once up front
+    pages = []
+    for path in files:
+        doc = fitz.open(path)
+        for page in doc:
+            text = page.get_text()
+            if text.strip():
+                pages.append((text, pdf_parser._chunk_spans(text, pdf_parser.CHUNK_SIZE, pdf_parser.CHUNK_OVERLAP)))
+        doc.close()
+    texts = sum(1 + len(spans) for _, spans in pages)
+    print(f"[Bench] {len(files)} PDFs, {len(pages)} pages, {texts} texts classified per run (best of {args.repeat})")
+
+    before, t_before = _best_of(classify_per_pattern, pages, args.repeat)
+    after, t_after = _best_of(classify_single_pass, pages, args.repeat)
+    mismatches = sum(a != b for a, b in zip(before, after))
+
+    print(f"  per-pattern loop  {t_before * 1000:9.1f} ms")
+    print(f"  single pass       {t_after * 1000:9.1f} ms   ({t_before / t_after:.1f}x faster)")
+    print(f"  classification    {'identical' if not mismatches else f'{mismatches} MISMATCHES'}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
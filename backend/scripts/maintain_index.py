@@ -0,0 +1,349 @@
+"""
+Vector index maintenance for policy_chunks.embedding (needs DATABASE_URL — DDL cannot go through PostgREST).
+
+  python scripts/maintain_index.py reindex [--type hnsw|ivfflat] [--m 16] [--ef-construction 64] [--lists N]
+      Rebuild the ANN index after bulk seeding (HNSW over the configured ann_storage; IVFFlat lists
+      default to rows/1000, i.e. re-clustered on the data actually loaded), then ANALYZE.
+  python scripts/maintain_index.py storage --mode vector|halfvec|binary [--rescore-factor 4]
+      Switch the compact first-pass index (vector_settings in schema.sql) and rebuild it.
+  python scripts/maintain_index.py tune --ef-search 100
+      Re-pin hnsw.ef_search on ann_candidates().
+  python scripts/maintain_index.py benchmark --label before [--insurer tata] [--queries 100] [--k 8]
+      Exact vs two-stage index latency and recall@k on one insurer's chunks, per storage mode, plus
+      index sizes; appends a run to data/index_benchmark.json.
+  python scripts/maintain_index.py report
+      Side-by-side table of the recorded runs (e.g. "before" vs "after").
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), "../.env"))
+
+from services.vector_store import get_pool, close_pool
+
+RESULTS_FILE = os.path.join(os.path.dirname(__file__), "../data/index_benchmark.json")
+BUILD_MEM = os.getenv("INDEX_BUILD_MAINTENANCE_WORK_MEM", "512MB")
+
+# ann_storage mode → (index name, HNSW access method, first-pass ORDER BY) — must match schema.sql
+ANN_INDEXES = {
+    "vector": (
+        "policy_chunks_embedding_hnsw_idx",
+        "USING hnsw (embedding vector_cosine_ops)",
+        "embedding <=> $1",
+    ),
+    "halfvec": (
+        "policy_chunks_embedding_half_idx",
+        "USING hnsw ((embedding::HALFVEC(1536)) halfvec_cosine_ops)",
+        "embedding::HALFVEC(1536) <=> $1::HALFVEC(1536)",
+    ),
+    "binary": (
+        "policy_chunks_embedding_bit_idx",
+        "USING hnsw ((binary_quantize(embedding)::BIT(1536)) bit_hamming_ops)",
+        "binary_quantize(embedding)::BIT(1536) <~> binary_quantize($1)::BIT(1536)",
+    ),
+}
+IVFFLAT_INDEX = "policy_chunks_embedding_ivfflat_idx"
+LEGACY_INDEX_NAMES = ("policy_chunks_embedding_idx", IVFFLAT_INDEX)
+
+ANN_FUNCTION = "ann_candidates(VECTOR, UUID, TEXT[], INT)"
+
+_EXACT_SQL = (
+    "SELECT id FROM policy_chunks WHERE uploaded_policy_id = $2 "
+    "ORDER BY embedding <=> $1 LIMIT $3"
+)
+
+
+def _two_stage_sql(mode: str, factor: int) -> str:
+    """Same shape as ann_candidates() + the RPCs' exact rescoring, with the mode fixed."""
+    limit = "$3" if mode == "vector" else f"$3 * {int(factor)}"
+    return (
+        "SELECT id FROM policy_chunks WHERE uploaded_policy_id = $2 AND id IN ("
+        f"SELECT id FROM policy_chunks WHERE uploaded_policy_id = $2 "
+        f"ORDER BY {ANN_INDEXES[mode][2]} LIMIT {limit}"
+        ") ORDER BY embedding <=> $1 LIMIT $3"
+    )
+
+
+# ── reindex / storage / tune ─────────────────────────────────────────────────
+
+async def _partitions(conn) -> list[str]:
+    return [r["relname"] for r in await conn.fetch(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'policy_chunks'::regclass ORDER BY c.relname"
+    )]
+
+
+async def _ann_storage(conn) -> str:
+    mode = await conn.fetchval("SELECT value FROM vector_settings WHERE key = 'ann_storage'")
+    return mode if mode in ANN_INDEXES else "vector"
+
+
+async def reindex(args):
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetchval("SELECT COUNT(*) FROM policy_chunks WHERE embedding IS NOT NULL")
+        partitions = await _partitions(conn)
+        await conn.execute(f"SET maintenance_work_mem = '{BUILD_MEM}'")
+        if args.type == "hnsw":
+            mode = await _ann_storage(conn)
+            name, access, _ = ANN_INDEXES[mode]
+            method = f"{access} WITH (m = {args.m}, ef_construction = {args.ef_construction})"
+            label = f"hnsw/{mode}"
+        else:
+            # pgvector guidance: lists ≈ rows / 1000 (min 10) up to 1M rows — per partition when partitioned
+            lists = args.lists or max(10, rows // max(1, len(partitions)) // 1000)
+            name = IVFFLAT_INDEX
+            method = f"USING ivfflat (embedding vector_cosine_ops) WITH (lists = {lists})"
+            label = "ivfflat"
+
+        print(f"[Index] Building {label} index over {rows} embeddings ({len(partitions) or 'no'} partitions)...")
+        start = time.perf_counter()
+        if partitions:
+            # A partitioned parent cannot be indexed CONCURRENTLY: build each partition's index
+            # concurrently, then attach it to an index created ON ONLY the parent
+            await conn.execute(f"DROP INDEX IF EXISTS {name}_new")
+            await conn.execute(f"CREATE INDEX {name}_new ON ONLY policy_chunks {method}")
+            suffix = int(time.time())
+            for partition in partitions:
+                child = f"{partition}_emb_{suffix}"
+                await conn.execute(f"CREATE INDEX CONCURRENTLY {child} ON {partition} {method}")
+                await conn.execute(f"ALTER INDEX {name}_new ATTACH PARTITION {child}")
+                print(f"[Index]   {partition} done")
+            drop = "DROP INDEX IF EXISTS"
+        else:
+            await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}_new")
+            await conn.execute(f"CREATE INDEX CONCURRENTLY {name}_new ON policy_chunks {method}")
+            drop = "DROP INDEX CONCURRENTLY IF EXISTS"
+
+        # Swap in the new index, dropping whichever ANN index was there before
+        for old in (*(n for n, _, _ in ANN_INDEXES.values()), *LEGACY_INDEX_NAMES):
+            await conn.execute(f"{drop} {old}")
+        await conn.execute(f"ALTER INDEX {name}_new RENAME TO {name}")
+        await conn.execute("ANALYZE policy_chunks")
+        print(f"[Index] {name} ready in {time.perf_counter() - start:.1f}s")
+
+
+async def storage(args):
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await conn.execute(
+            "INSERT INTO vector_settings (key, value) VALUES ('ann_storage', $1), ('rescore_factor', $2) "
+            "ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value",
+            args.mode, str(args.rescore_factor),
+        )
+    print(f"[Index] ann_storage = {args.mode}, rescore_factor = {args.rescore_factor}")
+    args.type = "hnsw"
+    await reindex(args)
+
+
+async def tune(args):
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await conn.execute(f"ALTER FUNCTION {ANN_FUNCTION} SET hnsw.ef_search = {int(args.ef_search)}")
+    print(f"[Index] {ANN_FUNCTION}: hnsw.ef_search = {args.ef_search}")
+
+
+# ── benchmark / report ───────────────────────────────────────────────────────
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def _run_queries(conn, sql: str, queries, k: int, settings: list[str]) -> tuple[list[list[str]], list[float]]:
+    results, latencies = [], []
+    for policy_id, embedding in queries:
+        async with conn.transaction():
+            for setting in settings:
+                await conn.execute(setting)
+            start = time.perf_counter()
+            rows = await conn.fetch(sql, embedding, policy_id, k)
+            latencies.append((time.perf_counter() - start) * 1000)
+        results.append([str(r["id"]) for r in rows])
+    return results, latencies
+
+
+async def _uses_index(conn, sql: str, query, k: int, settings: list[str]) -> bool:
+    async with conn.transaction():
+        for setting in settings:
+            await conn.execute(setting)
+        plan = await conn.fetch("EXPLAIN " + sql, query[1], query[0], k)
+    # Partition indexes are named <partition>_emb_<ts> by reindex or <partition>_<expr>_idx by CREATE INDEX
+    return any(("_emb" in r[0] or "_expr" in r[0] or "embedding" in r[0]) and "Index Scan" in r[0] for r in plan)
+
+
+async def _index_mb(conn, name: str) -> float | None:
+    """Size of an index summed over its partitions, or None if it does not exist."""
+    if not await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", name):
+        return None
+    size = await conn.fetchval(
+        "SELECT COALESCE(SUM(pg_relation_size(relid)), 0) FROM pg_partition_tree($1::regclass)", name
+    )
+    return round(size / 1024 / 1024, 2)
+
+
+async def benchmark(args):
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        pattern = f"%{args.insurer}%"
+        policy_ids = [r["id"] for r in await conn.fetch(
+            "SELECT id FROM uploaded_policies WHERE insurer ILIKE $1 OR filename ILIKE $1 OR user_label ILIKE $1",
+            pattern,
+        )]
+        if not policy_ids:
+            print(f"[Index] No uploaded policies match '{args.insurer}'")
+            return
+        # Held-out style queries: real chunk embeddings sampled from the corpus
+        queries = [(r["uploaded_policy_id"], r["embedding"]) for r in await conn.fetch(
+            "SELECT uploaded_policy_id, embedding FROM policy_chunks "
+            "WHERE uploaded_policy_id = ANY($1::uuid[]) AND embedding IS NOT NULL "
+            "ORDER BY random() LIMIT $2",
+            policy_ids, args.queries,
+        )]
+        index_def = await conn.fetchval(
+            "SELECT string_agg(indexdef, '; ') FROM pg_indexes "
+            "WHERE tablename = 'policy_chunks' AND (indexdef ILIKE '%hnsw%' OR indexdef ILIKE '%ivfflat%')"
+        )
+        index_sizes = {mode: await _index_mb(conn, name) for mode, (name, _, _) in ANN_INDEXES.items()}
+        table_bytes = await conn.fetchval(
+            "SELECT COALESCE(SUM(pg_table_size(relid)), 0) FROM pg_partition_tree('policy_chunks'::regclass)"
+        )
+        print(f"[Index] {len(queries)} queries over {len(policy_ids)} '{args.insurer}' policies, k={args.k}")
+
+        exact_settings = ["SET LOCAL enable_indexscan = off", "SET LOCAL enable_bitmapscan = off"]
+        truth, exact_ms = await _run_queries(conn, _EXACT_SQL, queries, args.k, exact_settings)
+        runs = [{
+            "setting": "exact (no index)",
+            "p50_ms": round(_percentile(exact_ms, 50), 2),
+            "p95_ms": round(_percentile(exact_ms, 95), 2),
+            "recall": 1.0,
+            "uses_index": False,
+            "index_mb": None,
+        }]
+        for mode in args.modes:
+            # Without an index for this mode the first pass is a sequential scan — still a valid
+            # recall measurement, but latency only means something once `storage --mode` built it
+            sql = _two_stage_sql(mode, args.rescore_factor)
+            for ef in args.ef_search:
+                settings = [f"SET LOCAL hnsw.ef_search = {int(ef)}"]
+                if args.iterative_scan:
+                    settings.append("SET LOCAL hnsw.iterative_scan = relaxed_order")
+                found, ms = await _run_queries(conn, sql, queries, args.k, settings)
+                recall = sum(
+                    len(set(f) & set(t)) / max(1, len(t)) for f, t in zip(found, truth)
+                ) / len(truth)
+                runs.append({
+                    "setting": f"{mode} ef_search={ef}",
+                    "p50_ms": round(_percentile(ms, 50), 2),
+                    "p95_ms": round(_percentile(ms, 95), 2),
+                    "recall": round(recall, 4),
+                    "uses_index": await _uses_index(conn, sql, queries[0], args.k, settings),
+                    "index_mb": index_sizes[mode],
+                })
+
+    record = {
+        "label": args.label,
+        "at": datetime.now(timezone.utc).isoformat(),
+        "insurer": args.insurer,
+        "queries": len(queries),
+        "k": args.k,
+        "rescore_factor": args.rescore_factor,
+        "index": index_def,
+        "table_mb": round(table_bytes / 1024 / 1024, 2),
+        "runs": runs,
+    }
+    history = _load_results()
+    history.append(record)
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    with open(RESULTS_FILE, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=2)
+    _print_runs(record)
+    print(f"[Index] Recorded to {os.path.normpath(RESULTS_FILE)}")
+
+
+def _load_results() -> list[dict]:
+    if not os.path.exists(RESULTS_FILE):
+        return []
+    with open(RESULTS_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _print_runs(record: dict):
+    print(f"\n== {record['label']} ({record['at'][:19]}) — {record['index'] or 'no ANN index'}")
+    if "table_mb" in record:
+        print(f"   table {record['table_mb']} MB, rescore factor {record.get('rescore_factor')}")
+    print(
+        f"{'setting':<26} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(record['k']):>10} "
+        f"{'index':>6} {'idx MB':>8}"
+    )
+    for run in record["runs"]:
+        size = run.get("index_mb")
+        print(
+            f"{run['setting']:<26} {run['p50_ms']:>8.2f} {run['p95_ms']:>8.2f} "
+            f"{run['recall']:>10.4f} {'yes' if run['uses_index'] else 'no':>6} "
+            f"{size if size is not None else '-':>8}"
+        )
+
+
+def report(_args):
+    history = _load_results()
+    if not history:
+        print(f"[Index] No benchmark runs recorded in {os.path.normpath(RESULTS_FILE)}")
+    for record in history:
+        _print_runs(record)
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+async def main():
+    parser = argparse.ArgumentParser(description="policy_chunks vector index maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("reindex", help="rebuild the ANN index after bulk loads")
+    p.add_argument("--type", choices=["hnsw", "ivfflat"], default="hnsw")
+    p.add_argument("--m", type=int, default=16)
+    p.add_argument("--ef-construction", type=int, default=64)
+    p.add_argument("--lists", type=int, default=0, help="IVFFlat lists (default rows/1000)")
+
+    p = sub.add_parser("storage", help="switch the compact first-pass ANN index and rebuild it")
+    p.add_argument("--mode", choices=list(ANN_INDEXES), required=True)
+    p.add_argument("--rescore-factor", type=int, default=4)
+    p.add_argument("--m", type=int, default=16)
+    p.add_argument("--ef-construction", type=int, default=64)
+
+    p = sub.add_parser("tune", help="set hnsw.ef_search on ann_candidates()")
+    p.add_argument("--ef-search", type=int, required=True)
+
+    p = sub.add_parser("benchmark", help="record latency + recall@k against exact search")
+    p.add_argument("--label", default="run")
+    p.add_argument("--insurer", default="tata")
+    p.add_argument("--queries", type=int, default=100)
+    p.add_argument("--k", type=int, default=8)
+    p.add_argument("--modes", nargs="+", choices=list(ANN_INDEXES), default=list(ANN_INDEXES))
+    p.add_argument("--rescore-factor", type=int, default=4)
+    p.add_argument("--ef-search", type=int, nargs="+", default=[40, 100, 200])
+    p.add_argument("--no-iterative-scan", dest="iterative_scan", action="store_false")
+
+    sub.add_parser("report", help="print recorded benchmark runs")
+
+    args = parser.parse_args()
+    if args.command == "report":
+        report(args)
+        return
+    try:
+        await {"reindex": reindex, "storage": storage, "tune": tune, "benchmark": benchmark}[args.command](args)
+    finally:
+        await close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
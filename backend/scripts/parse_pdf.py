@@ -0,0 +1,76 @@
+"""
+Parse policy PDFs with the page-parallel parser (no embedding, no database).
+
+  python scripts/parse_pdf.py path/to/policy.pdf [more.pdf | dir/ ...] [--workers 8]
+      Chunk and token counts per section and parse time for each PDF.
+  python scripts/parse_pdf.py policy.pdf --compare
+      Serial vs parallel timing, and a check that both produce identical chunks.
+  python scripts/parse_pdf.py policy.pdf --dump chunks.jsonl
+      Write every chunk as one JSON line.
+"""
+import sys
+import os
+import glob
+import json
+import time
+import argparse
+from collections import Counter
+from dataclasses import asdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services import pdf_parser
+
+
+def _timed_parse(path: str, workers: int) -> tuple[list[pdf_parser.Chunk], float]:
+    start = time.perf_counter()
+    chunks = list(pdf_parser.parse_pdf(path, workers))
+    return chunks, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Section-aware PDF chunking")
+    parser.add_argument("paths", nargs="+", help="PDF files or directories (searched recursively)")
+    parser.add_argument("--workers", type=int, default=pdf_parser.PDF_PARSE_WORKERS)
+    parser.add_argument("--compare", action="store_true", help="also parse serially and compare")
+    parser.add_argument("--dump", help="write chunks as JSON lines to this file")
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths.extend(sorted(glob.glob(os.path.join(path, "**/*.pdf"), recursive=True)))
+        else:
+            paths.append(path)
+
+    dump = open(args.dump, "w", encoding="utf-8") if args.dump else None
+    try:
+        for path in paths:
+            with pdf_parser.PolicyPdf(path) as pdf:
+                pages = pdf.page_count
+            chunks, seconds = _timed_parse(path, args.workers)
+            sections = Counter(c.section_type for c in chunks)
+            print(
+                f"[Parse] {os.path.basename(path)}: {pages} pages → {len(chunks)} chunks "
+                f"({sum(c.token_count for c in chunks)} tokens) "
+                f"in {seconds:.2f}s ({args.workers} workers)"
+            )
+            print("        " + ", ".join(f"{s}={n}" for s, n in sections.most_common()))
+            if args.compare:
+                serial, serial_seconds = _timed_parse(path, 1)
+                same = "identical" if serial == chunks else "DIFFERENT"
+                print(
+                    f"        serial {serial_seconds:.2f}s → {serial_seconds / seconds:.1f}x speed-up, "
+                    f"output {same}"
+                )
+            if dump:
+                for chunk in chunks:
+                    dump.write(json.dumps({"file": os.path.basename(path), **asdict(chunk)}) + "\n")
+    finally:
+        if dump:
+            dump.close()
+        pdf_parser.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,89 +1,140 @@
 """
 Startup seeder — scans policies/ directory, embeds all PDFs into Supabase pgvector.
-Skips PDFs that are already embedded (checks by filename).
-Runs automatically on FastAPI startup via lifespan.
+Skips PDFs whose exact bytes are already embedded; a changed PDF under a stored
+filename is re-ingested incrementally (only changed chunks are embedded).
+Runs as a background task started by the FastAPI lifespan, so the app serves
+traffic while seeding; progress is exposed through seed_status() (GET /api/ready).
 """
 import sys
 import os
 import glob
+import time
+import asyncio
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from services import pdf_parser, embedder, vector_store
+from services import ingest, vector_store
 
 # Root policies folder (relative to project root)
 POLICIES_DIR = os.getenv(
     "POLICIES_DIR",
     os.path.join(os.path.dirname(__file__), "../../policies"),
 )
-
-
-def seed_all_policies():
-    pdf_paths = glob.glob(os.path.join(POLICIES_DIR, "**/*.pdf"), recursive=True)
-    if not pdf_paths:
-        print(f"[Seeder] No PDFs found in {POLICIES_DIR}")
-        return
-
-    print(f"[Seeder] Found {len(pdf_paths)} PDFs in {POLICIES_DIR}")
-    embedded = 0
-    skipped = 0
-
-    for pdf_path in pdf_paths:
-        filename = os.path.basename(pdf_path)
-        insurer = os.path.basename(os.path.dirname(pdf_path))  # folder name = insurer slug
-
-        if vector_store.policy_already_embedded(filename):
-            print(f"  [SKIP] {filename} (already embedded)")
-            skipped += 1
-            continue
-
-        print(f"  [EMBED] {filename} ({insurer})...")
+# PDFs ingested at the same time; each one already overlaps parsing, embedding and inserts
+SEED_CONCURRENCY = int(os.getenv("SEED_CONCURRENCY", "2"))
+
+# Progress of the current / last seeding run:
+#   state  "pending" → "seeding" → "done" ("failed" if the run itself crashed)
+_progress = {
+    "state": "pending",
+    "total": 0,
+    "skipped": 0,
+    "embedded": 0,
+    "revised": 0,
+    "empty": 0,
+    "failed": 0,
+    "in_progress": [],
+    "error": None,
+    "started_at": None,
+    "seconds": None,
+}
+
+
+def seed_status() -> dict:
+    done = sum(_progress[k] for k in ("skipped", "embedded", "revised", "empty", "failed"))
+    return {**_progress, "in_progress": list(_progress["in_progress"]), "processed": done}
+
+
+async def _fingerprints(pdf_paths: list[str]) -> dict[str, str]:
+    """path → sha256 of its bytes, hashed off the event loop."""
+    hashes = await asyncio.gather(*(asyncio.to_thread(ingest.file_hash, p) for p in pdf_paths))
+    return dict(zip(pdf_paths, hashes))
+
+
+async def _seed_one(pdf_path: str, gate: asyncio.Semaphore):
+    filename = os.path.basename(pdf_path)
+    insurer = os.path.basename(os.path.dirname(pdf_path))  # folder name = insurer slug
+    async with gate:
+        _progress["in_progress"].append(filename)
         try:
-            # Parse PDF into section-aware chunks
-            chunks = pdf_parser.parse_pdf(pdf_path)
-            if not chunks:
+            # Parse → embed → insert as one pipeline
+            result = await ingest.ingest_pdf(pdf_path, filename, insurer)
+            if result["action"] == "unchanged":
+                print(f"  [SKIP] {filename} (already embedded)")
+                _progress["skipped"] += 1
+            elif result["policy_id"] is None:
                 print(f"    [WARN] No text extracted from {filename}")
-                continue
-
-            # Get policy name from PDF content
-            policy_name = pdf_parser.extract_policy_name(pdf_path)
-
-            # Register in uploaded_policies table
-            policy_id = vector_store.create_uploaded_policy(
-                name=policy_name,
-                filename=filename,
-                insurer=insurer,
-            )
-
-            # Batch embed all chunks
-            texts = [c.content for c in chunks]
-            embeddings = embedder.embed_batch(texts)
-
-            # Prepare rows for insertion
-            rows = [
-                {
-                    "content": chunks[i].content,
-                    "embedding": embeddings[i],
-                    "page_number": chunks[i].page_number,
-                    "chunk_index": chunks[i].chunk_index,
-                    "section_type": chunks[i].section_type,
-                }
-                for i in range(len(chunks))
-            ]
-
-            vector_store.insert_chunks(policy_id, rows)
-            vector_store.update_chunk_count(policy_id, len(rows))
-
-            print(f"    Done — {len(chunks)} chunks embedded")
-            embedded += 1
-
+                _progress["empty"] += 1
+            elif result["action"] == "revised":
+                print(
+                    f"  [UPDATE] {filename} ({insurer}) — {result['chunk_count'] - result['reused']} chunks "
+                    f"embedded, {result['reused']} unchanged, {result['removed']} removed"
+                )
+                _progress["revised"] += 1
+            else:
+                print(
+                    f"  [EMBED] {filename} ({insurer}) — {result['chunk_count']} chunks embedded "
+                    f"({result['rows_per_sec']:.0f} rows/s)"
+                )
+                _progress["embedded"] += 1
         except Exception as e:
             print(f"    [ERROR] Failed to embed {filename}: {e}")
-
-    print(f"\n[Seeder] Complete — {embedded} embedded, {skipped} skipped")
+            _progress["failed"] += 1
+        finally:
+            _progress["in_progress"].remove(filename)
+
+
+async def seed_all_policies():
+    start = time.perf_counter()
+    _progress.update(
+        state="seeding", total=0, skipped=0, embedded=0, revised=0, empty=0, failed=0,
+        in_progress=[], error=None, started_at=time.time(), seconds=None,
+    )
+    try:
+        pdf_paths = glob.glob(os.path.join(POLICIES_DIR, "**/*.pdf"), recursive=True)
+        if not pdf_paths:
+            print(f"[Seeder] No PDFs found in {POLICIES_DIR}")
+            _progress["state"] = "done"
+            return
+
+        print(f"[Seeder] Found {len(pdf_paths)} PDFs in {POLICIES_DIR}")
+        _progress["total"] = len(pdf_paths)
+
+        # One bulk query instead of one per PDF: files whose bytes are stored are done already
+        hashes = await _fingerprints(pdf_paths)
+        stored = await vector_store.embedded_fingerprints(
+            [os.path.basename(p) for p in pdf_paths], list(hashes.values()),
+        )
+        stored_hashes = {row["content_hash"] for row in stored}
+        stored_names = {(row["filename"], row["insurer"]) for row in stored}
+        todo = [p for p in pdf_paths if hashes[p] not in stored_hashes]
+        updates = sum(
+            (os.path.basename(p), os.path.basename(os.path.dirname(p))) in stored_names for p in todo
+        )
+        _progress["skipped"] = len(pdf_paths) - len(todo)
+        print(
+            f"[Seeder] {_progress['skipped']} already embedded, {len(todo)} to ingest "
+            f"({updates} revised wordings, {SEED_CONCURRENCY} at a time)"
+        )
+
+        gate = asyncio.Semaphore(max(1, SEED_CONCURRENCY))
+        await asyncio.gather(*(_seed_one(p, gate) for p in todo))
+    except Exception as e:
+        _progress.update(state="failed", error=str(e))
+        raise
+    else:
+        _progress["state"] = "done"
+    finally:
+        _progress["seconds"] = round(time.perf_counter() - start, 3)
+
+    p = _progress
+    print(
+        f"\n[Seeder] Complete in {p['seconds']:.1f}s — {p['embedded']} embedded, {p['revised']} updated, "
+        f"{p['skipped']} skipped, {p['failed']} failed"
+    )
 
 
 if __name__ == "__main__":
     from dotenv import load_dotenv
     load_dotenv(os.path.join(os.path.dirname(__file__), "../.env"))
-    seed_all_policies()
+    asyncio.run(seed_all_policies())
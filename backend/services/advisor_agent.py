@@ -6,7 +6,10 @@ Intelligent Discovery Advisor Agent — 3 core capabilities:
 3. get_rag_insights()      — section-filtered RAG → hidden traps from actual PDF text
 4. explain_term()          — RAG lookup of insurance term in definitions/conditions sections
 """
+import re
+
 from services import llm, vector_store, embedder
+from services.stitch import stitch_chunks
 
 # ─── Prompts ─────────────────────────────────────────────────────────────────
 
@@ -106,7 +109,7 @@ Return ONLY valid JSON:
 def _build_context_block(chunks: list[dict]) -> str:
     """Build structured CONTEXT BLOCK string from chunks (same format as claim_engine)."""
     parts = []
-    for i, chunk in enumerate(chunks, 1):
+    for i, chunk in enumerate(stitch_chunks(chunks), 1):
         section = chunk.get("section_type", "general").upper()
         page = chunk.get("page_number", "?")
         parts.append(f"[CHUNK {i} | Section: {section} | Page: {page}]\n{chunk['content']}")
@@ -115,7 +118,7 @@ def _build_context_block(chunks: list[dict]) -> str:
 
 # ─── Intent Classifier ────────────────────────────────────────────────────────
 
-def classify_intent(conversation: str) -> dict:
+async def classify_intent(conversation: str) -> dict:
     """
     Classify user intent and extract requirements from full conversation text.
 
@@ -123,7 +126,7 @@ def classify_intent(conversation: str) -> dict:
       intent, has_budget, has_members, has_needs_or_conditions,
       next_question, term_to_explain, policy_name_asked, extracted
     """
-    result = llm.chat_json(ADVISOR_INTENT_SYSTEM, f"Conversation:\n{conversation}")
+    result = await llm.chat_json(ADVISOR_INTENT_SYSTEM, f"Conversation:\n{conversation}")
     # Normalize extracted sub-dict
     extracted = result.get("extracted") or {}
     extracted["needs"] = extracted.get("needs") or []
@@ -134,7 +137,7 @@ def classify_intent(conversation: str) -> dict:
 
 # ─── Insurer → Uploaded PDF Matcher ──────────────────────────────────────────
 
-def find_uploaded_for_insurer(insurer_name: str) -> dict | None:
+async def find_uploaded_for_insurer(insurer_name: str) -> dict | None:
     """
     Find an uploaded policy whose insurer fuzzy-matches the catalog insurer name.
     Uses first meaningful word of the insurer name (e.g. "Tata" from "Tata AIG General Insurance").
@@ -144,7 +147,7 @@ def find_uploaded_for_insurer(insurer_name: str) -> dict | None:
     if not insurer_name:
         return None
 
-    client = vector_store.get_client()
+    client = await vector_store.get_async_client()
     words = [w for w in insurer_name.split() if len(w) > 2]
     if not words:
         return None
@@ -153,7 +156,7 @@ def find_uploaded_for_insurer(insurer_name: str) -> dict | None:
     search_term = words[0]
 
     try:
-        result = (
+        result = await (
             client.table("uploaded_policies")
             .select("id, user_label, insurer, chunk_count")
             .ilike("insurer", f"%{search_term}%")
@@ -170,8 +173,26 @@ def find_uploaded_for_insurer(insurer_name: str) -> dict | None:
 
 INSIGHT_SECTIONS = ["exclusions", "conditions", "limits", "waiting_periods", "coverage"]
 
+DEFAULT_NEEDS = ["coverage", "hospitalization"]
+
+# Fixed needs vocabulary used by the coverage gap analyzer
+GAP_NEEDS = [
+    "room rent", "co-pay", "waiting period", "sub-limit",
+    "exclusion", "pre-authorization", "proportional deduction",
+    "co-payment", "deductible", "network hospital",
+]
+
+
+def insights_query(user_needs: list[str]) -> str:
+    return f"{' '.join(user_needs)} coverage exclusion waiting period room rent co-pay sub-limit"
+
+
+# Near-constant insight queries are embedded once at startup
+embedder.register_constant_query("insights_default", insights_query(DEFAULT_NEEDS))
+embedder.register_constant_query("insights_gap", insights_query(GAP_NEEDS))
+
 
-def get_rag_insights(uploaded_policy_id: str, user_needs: list[str], insurer: str = "") -> dict:
+async def get_rag_insights(uploaded_policy_id: str, user_needs: list[str], insurer: str = "") -> dict:
     """
     Run section-filtered RAG on an uploaded policy PDF to surface hidden conditions
     relevant to the user's stated needs.
@@ -181,24 +202,25 @@ def get_rag_insights(uploaded_policy_id: str, user_needs: list[str], insurer: st
       or {"available": False} on error/no chunks.
     """
     if not user_needs:
-        user_needs = ["coverage", "hospitalization"]
+        user_needs = DEFAULT_NEEDS
 
-    query = f"{' '.join(user_needs)} coverage exclusion waiting period room rent co-pay sub-limit"
+    query = insights_query(user_needs)
 
     # Embed query
     try:
-        query_emb = embedder.embed_text(query)
+        query_emb = await embedder.embed_text(query)
     except Exception:
         return {"available": False}
 
     # Section-filtered semantic search
-    sem = vector_store.section_search(
+    sem = await vector_store.section_search(
         query_emb, uploaded_policy_id, INSIGHT_SECTIONS, top_k=5
     )
 
-    # Keyword search → filter to relevant sections
-    kw_all = vector_store.keyword_search(query, uploaded_policy_id, top_k=8)
-    kw = [c for c in kw_all if c.get("section_type") in INSIGHT_SECTIONS]
+    # Keyword search restricted to the same sections
+    kw = await vector_store.run_layer("keyword", vector_store.keyword_search(
+        query, uploaded_policy_id, top_k=8, section_types=INSIGHT_SECTIONS
+    ))
 
     # RRF fusion
     fused = vector_store.rrf_fusion(sem, kw, top_k=6)
@@ -207,10 +229,11 @@ def get_rag_insights(uploaded_policy_id: str, user_needs: list[str], insurer: st
         return {"available": False}
 
     context = _build_context_block(fused)
-    result = llm.chat_json(
+    result = await llm.chat_json(
         RAG_INSIGHTS_SYSTEM,
         f"CONTEXT BLOCK:\n{context}\n\nUSER NEEDS: {user_needs}",
         temperature=0.0,
+        cache=True,
     )
 
     # Normalize
@@ -227,31 +250,52 @@ def get_rag_insights(uploaded_policy_id: str, user_needs: list[str], insurer: st
 EXPLAIN_SECTIONS = ["definitions", "conditions", "limits"]
 
 
-def explain_term(term: str, session_policy_ids: list[str]) -> dict:
+EXPLAIN_FIELDS = ("explanation", "example", "citation")
+_FOUND = re.compile(r'"found"\s*:\s*(true|false)')
+
+
+async def explain_term(term: str, session_policy_ids: list[str]) -> dict:
     """
     Look up an insurance term in definitions/conditions sections of the session's
     recommended policies (top 3). Returns first grounded explanation found.
 
     Returns dict with: found, explanation, example, citation, policy_name
     """
+    result: dict = {}
+    async for event, data in stream_explain_term(term, session_policy_ids):
+        if event == "result":
+            result = data
+    return result
+
+
+async def stream_explain_term(term: str, session_policy_ids: list[str]):
+    """
+    explain_term() as (event, data) pairs: `token` / `field` while GPT writes the
+    explanation, then the explain_term() dict as `result`. A policy whose answer
+    turns out found=false is tried silently — its output is held until `found`
+    arrives and dropped if it is false.
+    """
     if not term or not session_policy_ids:
-        return _not_found(term)
+        yield "result", _not_found(term)
+        return
 
-    for policy_id in session_policy_ids[:3]:
-        # Embed the term
-        try:
-            query_emb = embedder.embed_text(term)
-        except Exception:
-            continue
+    # Embed the term once — the same vector is searched against every policy
+    try:
+        query_emb = await embedder.embed_text(term)
+    except Exception:
+        yield "result", _not_found(term)
+        return
 
+    for policy_id in session_policy_ids[:3]:
         # Section-filtered semantic search for definitions
-        def_chunks = vector_store.section_search(
+        def_chunks = await vector_store.section_search(
             query_emb, policy_id, EXPLAIN_SECTIONS, top_k=4
         )
 
-        # Keyword search → filter to definition/condition sections
-        kw_all = vector_store.keyword_search(term, policy_id, top_k=6)
-        kw_filtered = [c for c in kw_all if c.get("section_type") in EXPLAIN_SECTIONS]
+        # Keyword search restricted to definition/condition sections
+        kw_filtered = await vector_store.run_layer("keyword", vector_store.keyword_search(
+            term, policy_id, top_k=6, section_types=EXPLAIN_SECTIONS
+        ))
 
         # RRF fusion
         fused = vector_store.rrf_fusion(def_chunks, kw_filtered, top_k=5)
@@ -262,21 +306,46 @@ def explain_term(term: str, session_policy_ids: list[str]) -> dict:
         context = _build_context_block(fused)
 
         # Get policy name for attribution
-        uploaded = vector_store.get_policy_by_id(policy_id)
+        uploaded = await vector_store.get_policy_by_id(policy_id)
         policy_name = uploaded.get("user_label", "Policy") if uploaded else "Policy"
 
-        result = llm.chat_json(
+        result: dict = {}
+        partial = ""
+        found: bool | None = None
+        held: list[tuple[str, object]] = []
+        async for event, data in llm.stream_json_fields(
             EXPLAIN_TERM_SYSTEM,
             f"TERM TO EXPLAIN: {term}\n\nCONTEXT BLOCK:\n{context}",
+            EXPLAIN_FIELDS,
             temperature=0.0,
-        )
+            cache=True,
+        ):
+            if event == "result":
+                result = data
+            elif found:
+                yield event, data
+            elif found is None:
+                held.append((event, data))
+                if event == "token":
+                    partial += data
+                    m = _FOUND.search(partial)
+                    if m:
+                        found = m.group(1) == "true"
+                        if found:
+                            for item in held:
+                                yield item
+                        held = []
 
         if result.get("found"):
+            if found is None:  # cache hit: no tokens, so the fields were held until now
+                for item in held:
+                    yield item
             result["policy_name"] = policy_name
-            return result
+            yield "result", result
+            return
 
     # No grounded explanation found in any recommended policy
-    return _not_found(term)
+    yield "result", _not_found(term)
 
 
 CHAT_REPLY_SYSTEM = """You are a knowledgeable, friendly health insurance advisor in India.
@@ -298,23 +367,31 @@ Return ONLY valid JSON:
 suggest_policies=true only if the user's question is best answered by showing them actual policy recommendations."""
 
 
-def get_chat_reply(question: str, session_policy_ids: list[str] = []) -> dict:
+async def get_chat_reply(question: str, session_policy_ids: list[str] = []) -> dict:
     """
     Answer a conversational/educational question in natural language.
     Searches available policy PDFs for relevant context first.
     """
-    context_parts: list[str] = []
+    reply: dict = {}
+    async for event, data in stream_chat_reply(question, session_policy_ids):
+        if event == "result":
+            reply = data
+    return reply
 
+
+async def stream_chat_reply(question: str, session_policy_ids: list[str] = []):
+    """get_chat_reply() as (event, data) pairs: `token` / `field` ("answer") while GPT writes, then `result`."""
+    context_parts: list[str] = []
     for policy_id in session_policy_ids[:2]:
         try:
-            query_emb = embedder.embed_text(question)
-            chunks = vector_store.section_search(
+            query_emb = await embedder.embed_text(question)
+            chunks = await vector_store.section_search(
                 query_emb, policy_id,
                 ["coverage", "conditions", "definitions", "limits", "waiting_periods"],
                 top_k=3,
             )
             if chunks:
-                uploaded = vector_store.get_policy_by_id(policy_id)
+                uploaded = await vector_store.get_policy_by_id(policy_id)
                 name = uploaded.get("user_label", "Policy") if uploaded else "Policy"
                 context_parts.append(f"[From {name}]\n{_build_context_block(chunks)}")
         except Exception:
@@ -324,11 +401,14 @@ def get_chat_reply(question: str, session_policy_ids: list[str] = []) -> dict:
     if context_parts:
         user_msg = f"CONTEXT BLOCK:\n{'---'.join(context_parts)}\n\n{user_msg}"
 
-    result = llm.chat_json(CHAT_REPLY_SYSTEM, user_msg)
-    return {
-        "answer": result.get("answer", "I'm here to help with health insurance questions. Could you tell me what you're looking for?"),
-        "suggest_policies": result.get("suggest_policies", False),
-    }
+    async for event, data in llm.stream_json_fields(CHAT_REPLY_SYSTEM, user_msg, ("answer",)):
+        if event != "result":
+            yield event, data
+            continue
+        yield "result", {
+            "answer": data.get("answer", "I'm here to help with health insurance questions. Could you tell me what you're looking for?"),
+            "suggest_policies": data.get("suggest_policies", False),
+        }
 
 
 def _not_found(term: str) -> dict:
@@ -0,0 +1,111 @@
+"""In-process BM25 keyword index over one policy's chunks.
+
+Postings are stored CSR-style in flat NumPy arrays (term → slice of doc ids and
+term frequencies) instead of dicts of dicts, so a few hundred chunks cost a few
+hundred KB. As in the keyword RPCs (any_term_tsquery), documents only need to
+match SOME query terms; beyond them, short query terms also match longer indexed
+terms by prefix ("excl" → "excl03", "exclusion"). Clause codes such as
+"Code-Excl03" are indexed both whole and split into parts.
+"""
+import re
+import bisect
+import numpy as np
+
+K1 = 1.2
+B = 0.75
+# Prefix expansions score below an exact hit and are capped per query term
+PREFIX_WEIGHT = 0.5
+MAX_PREFIX_EXPANSIONS = 32
+MIN_PREFIX_LEN = 3
+
+_WORD = re.compile(r"[a-z0-9]+(?:[-_/.][a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have if in is it its of on or our shall "
+    "such that the their this to was were which will with what does do any all my i "
+    "me we you your under than then there these those be been being not no".split()
+)
+
+
+def _stem(term: str) -> str:
+    # Light suffix stripping so "exclusions" / "exclusion" and "covered" / "cover" meet
+    for suffix in ("ing", "es", "ed", "s"):
+        if len(term) > len(suffix) + 3 and term.endswith(suffix):
+            return term[: -len(suffix)]
+    return term
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased, stemmed terms. Compound codes yield the whole code plus each part."""
+    terms = []
+    for match in _WORD.finditer(text.lower()):
+        word = match.group(0)
+        parts = re.split(r"[-_/.]", word)
+        if len(parts) > 1:
+            terms.append(word)
+        terms.extend(_stem(p) for p in parts if p not in _STOPWORDS)
+    return terms
+
+
+class BM25Index:
+    def __init__(self, documents: list[str]):
+        doc_terms = [tokenize(d) for d in documents]
+        self.n_docs = len(documents)
+        self.doc_len = np.array([len(t) for t in doc_terms], dtype=np.float32)
+        self.avg_len = float(self.doc_len.mean()) if self.n_docs else 0.0
+
+        # term → {doc: tf}, flattened into CSR arrays below and then discarded
+        postings: dict[str, dict[int, int]] = {}
+        for doc_id, terms in enumerate(doc_terms):
+            for term in terms:
+                docs = postings.setdefault(term, {})
+                docs[doc_id] = docs.get(doc_id, 0) + 1
+
+        self.vocab = sorted(postings)
+        self.term_ids = {t: i for i, t in enumerate(self.vocab)}
+        sizes = np.array([len(postings[t]) for t in self.vocab], dtype=np.int32)
+        self.offsets = np.zeros(len(self.vocab) + 1, dtype=np.int32)
+        np.cumsum(sizes, out=self.offsets[1:])
+        self.doc_ids = np.empty(int(self.offsets[-1]), dtype=np.int32)
+        self.tfs = np.empty(int(self.offsets[-1]), dtype=np.float32)
+        for i, term in enumerate(self.vocab):
+            start = self.offsets[i]
+            docs = postings[term]
+            self.doc_ids[start : start + len(docs)] = list(docs.keys())
+            self.tfs[start : start + len(docs)] = list(docs.values())
+        self.idf = np.log(1 + (self.n_docs - sizes + 0.5) / (sizes + 0.5)).astype(np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.doc_len.nbytes + self.offsets.nbytes + self.doc_ids.nbytes
+            + self.tfs.nbytes + self.idf.nbytes + sum(len(t) + 56 for t in self.vocab)
+        )
+
+    def _expand(self, term: str) -> list[tuple[int, float]]:
+        """(term id, weight) pairs for an exact match plus prefix expansions."""
+        matches = []
+        exact = self.term_ids.get(term)
+        if exact is not None:
+            matches.append((exact, 1.0))
+        if len(term) >= MIN_PREFIX_LEN:
+            start = bisect.bisect_left(self.vocab, term)
+            for i in range(start, min(start + MAX_PREFIX_EXPANSIONS + 1, len(self.vocab))):
+                if not self.vocab[i].startswith(term):
+                    break
+                if i != exact:
+                    matches.append((i, PREFIX_WEIGHT))
+        return matches
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score per document (0 for documents matching no query term)."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        if not self.n_docs:
+            return scores
+        norm = K1 * (1 - B + B * self.doc_len / (self.avg_len or 1.0))
+        for term in dict.fromkeys(tokenize(query)):
+            for term_id, weight in self._expand(term):
+                lo, hi = self.offsets[term_id], self.offsets[term_id + 1]
+                docs, tf = self.doc_ids[lo:hi], self.tfs[lo:hi]
+                # doc ids are unique within one posting list, so fancy-index += is safe
+                scores[docs] += weight * self.idf[term_id] * tf * (K1 + 1) / (tf + norm[docs])
+        return scores
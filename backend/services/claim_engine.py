@@ -10,11 +10,18 @@ Pipeline:
   6. Deterministic compute_claim_score() — LLM does NOT set the score
   7. Return structured result
 """
+import asyncio
 from services import llm, vector_store, embedder
+from services.stitch import stitch_chunks
 from services.advisor_agent import find_uploaded_for_insurer
 
 CLAIM_SECTIONS = ["exclusions", "coverage", "waiting_periods", "conditions", "limits"]
 
+# Fixed query that always pulls in the general hospitalization benefit clause (embedded once at startup)
+COVERAGE_QUERY = embedder.register_constant_query(
+    "claim_coverage", "inpatient hospitalization benefit covered illness treatment"
+)
+
 GROUNDED_CLAIM_SYSTEM = """You are an expert insurance policy clause analyzer. Your job is to determine whether a specific medical condition/treatment is covered by the policy based solely on the provided policy document excerpts.
 
 COVERAGE STATUS RULES — apply in this exact order:
@@ -46,7 +53,8 @@ Return this exact JSON schema:
 
 def _build_context_block(chunks: list[dict]) -> str:
     parts = []
-    for i, chunk in enumerate(chunks, 1):
+    # Overlapping neighbours become one passage, so shared sentences are sent once
+    for i, chunk in enumerate(stitch_chunks(chunks), 1):
         section = chunk.get("section_type", "general").upper()
         page = chunk.get("page_number", "?")
         parts.append(f"[CHUNK {i} | Section: {section} | Page: {page}]\n{chunk['content']}")
@@ -130,33 +138,67 @@ def compute_claim_score(
     return max(0, min(100, score))
 
 
-def _get_policy_metadata(policy_id: str) -> dict:
+async def _get_policy_metadata(policy_id: str) -> dict:
     """Try catalog first, then uploaded policies. Returns empty dict if not found."""
-    policy = vector_store.get_catalog_policy(policy_id)
+    policy = await vector_store.get_catalog_policy(policy_id)
     if policy:
         return policy
-    uploaded = vector_store.get_policy_by_id(policy_id)
+    uploaded = await vector_store.get_policy_by_id(policy_id)
     return uploaded or {}
 
 
-def run_claim_check(policy_id: str, condition: str, treatment_type: str) -> dict:
+def _enrich_from_catalog(uploaded: dict, all_catalog: list[dict]) -> dict:
+    """Merge catalog scoring fields into an uploaded policy (don't overwrite existing uploaded fields)."""
+    ins = (uploaded.get("insurer") or "").lower()
+    policy = uploaded  # start with uploaded fields
+    for cp in all_catalog:
+        cp_ins = (cp.get("insurer") or "").lower()
+        if ins and (ins in cp_ins or cp_ins in ins):
+            for field in [
+                "waiting_period_preexisting_years", "co_pay_percent", "room_rent_limit",
+                "waiting_period_maternity_months", "covers_maternity", "covers_opd",
+            ]:
+                if cp.get(field) is not None and policy.get(field) is None:
+                    policy[field] = cp[field]
+            break
+    return policy
+
+
+async def run_claim_check(policy_id: str, condition: str, treatment_type: str) -> dict:
     """
     Full claim check pipeline.
 
+    Retrieval runs as a dependency-aware plan rather than ~8 serial hops:
+      Stage 1 (concurrent): catalog lookup + uploaded lookup + one batched embedding
+                            request for the condition and the coverage query
+      Stage 2:              resolve which uploaded PDF to search (insurer match for catalog ids)
+      Stage 3 (concurrent): 3 vector searches + 1 keyword search + catalog enrichment
+
     Returns either:
       {"error": "..."} — if no relevant chunks found
     or:
       {structured result dict}
     """
-    # Step 1: Determine if this is a CATALOG policy or an UPLOADED policy UUID.
-    # They live in different tables and need different treatment.
-    catalog_policy = vector_store.get_catalog_policy(policy_id)
+    query_text = f"{condition} {treatment_type}"
+
+    # Stage 1: Determine if this is a CATALOG policy or an UPLOADED policy UUID while
+    # embedding both queries in a single request. They live in different tables.
+    catalog_policy, uploaded, embeddings = await asyncio.gather(
+        vector_store.get_catalog_policy(policy_id),
+        vector_store.get_policy_by_id(policy_id),
+        embedder.embed_queries([query_text, COVERAGE_QUERY]),
+        return_exceptions=True,
+    )
+    for lookup in (catalog_policy, uploaded):
+        if isinstance(lookup, Exception):
+            raise lookup
 
+    # Stage 2: Resolve the document to search
     if catalog_policy:
         # CATALOG path: metadata from catalog, but chunks live in uploaded_policies table
         policy = catalog_policy
         policy_name = policy.get("name") or "Unknown Policy"
-        uploaded_match = find_uploaded_for_insurer(policy.get("insurer", ""))
+        uploaded_match = await find_uploaded_for_insurer(policy.get("insurer", ""))
         if not uploaded_match:
             return {
                 "error": (
@@ -170,60 +212,40 @@ def run_claim_check(policy_id: str, condition: str, treatment_type: str) -> dict
         search_policy_id = uploaded_match["id"]
     else:
         # UPLOADED path: use the selected UUID directly (do NOT redirect to a different PDF)
-        uploaded = vector_store.get_policy_by_id(policy_id)
         if not uploaded:
             return {"error": "Policy not found."}
         policy_name = uploaded.get("user_label") or "Unknown Policy"
         search_policy_id = policy_id  # always use the exact policy the user selected
 
+    if isinstance(embeddings, Exception):
+        return {"error": f"Embedding failed: {str(embeddings)}"}
+    # The coverage query always pulls in the hospitalization benefit clause
+    query_embedding, coverage_embedding = embeddings
+
+    # Stage 3: All searches in one hybrid search (+ catalog enrichment for uploaded policies)
+    layers, all_catalog = await asyncio.gather(
+        vector_store.hybrid_search(query_embedding, condition, search_policy_id, [
+            # Broad semantic search for the specific condition (no section filter)
+            {"name": "semantic", "kind": "semantic", "top_k": 6},
+            # Broad semantic search for general hospitalization coverage (always include)
+            {"name": "coverage", "kind": "semantic", "top_k": 4, "embedding": coverage_embedding},
+            # Section-filtered semantic search as supplement (catches well-tagged docs)
+            {"name": "section", "kind": "semantic", "top_k": 4, "sections": CLAIM_SECTIONS},
+            # Keyword search on the condition term (no section filter)
+            {"name": "keyword", "kind": "keyword", "top_k": 10},
+        ]),
         # Enrich with catalog metadata so scoring reflects real waiting periods / co-pay / room rent
-        all_catalog = vector_store.list_catalog_policies()
-        ins = (uploaded.get("insurer") or "").lower()
-        policy = uploaded  # start with uploaded fields
-        for cp in all_catalog:
-            cp_ins = (cp.get("insurer") or "").lower()
-            if ins and (ins in cp_ins or cp_ins in ins):
-                # Merge catalog scoring fields (don't overwrite existing uploaded fields)
-                for field in [
-                    "waiting_period_preexisting_years", "co_pay_percent", "room_rent_limit",
-                    "waiting_period_maternity_months", "covers_maternity", "covers_opd",
-                ]:
-                    if cp.get(field) is not None and policy.get(field) is None:
-                        policy[field] = cp[field]
-                break
-
-    # Step 2: Embed the condition query
-    query_text = f"{condition} {treatment_type}"
-    try:
-        query_embedding = embedder.embed_text(query_text)
-    except Exception as e:
-        return {"error": f"Embedding failed: {str(e)}"}
-
-    # Also embed a general coverage query to always pull in the hospitalization benefit clause
-    try:
-        coverage_embedding = embedder.embed_text("inpatient hospitalization benefit covered illness treatment")
-    except Exception:
-        coverage_embedding = query_embedding  # fallback to same embedding
-
-    # Step 3: Broad semantic search for the specific condition (no section filter)
-    sem_chunks = vector_store.semantic_search(query_embedding, search_policy_id, top_k=6)
-
-    # Step 4: Broad semantic search for general hospitalization coverage (always include)
-    cov_chunks = vector_store.semantic_search(coverage_embedding, search_policy_id, top_k=4)
-
-    # Step 5: Section-filtered semantic search as supplement (catches well-tagged docs)
-    sec_chunks = vector_store.section_search(
-        query_embedding, search_policy_id, CLAIM_SECTIONS, top_k=4
+        vector_store.run_layer("catalog", vector_store.list_catalog_policies()) if not catalog_policy
+        else _no_results(),
     )
+    if not catalog_policy:
+        policy = _enrich_from_catalog(uploaded, all_catalog)
 
-    # Step 6: Keyword search on the condition term (no section filter)
-    kw_chunks = vector_store.keyword_search(condition, search_policy_id, top_k=10)
-
-    # Step 7: Combine all results via RRF and take top 10
-    combined_sem = _dedupe(sem_chunks + cov_chunks + sec_chunks)
-    fused = vector_store.rrf_fusion(combined_sem, kw_chunks, top_k=10)
+    # Combine all results via RRF and take top 10
+    combined_sem = _dedupe(layers["semantic"] + layers["coverage"] + layers["section"])
+    fused = vector_store.rrf_fusion(combined_sem, layers["keyword"], top_k=10)
 
-    # Step 7: Guard — no hallucination if no chunks found
+    # Guard — no hallucination if no chunks found
     if not fused:
         return {
             "error": f"No relevant policy clause found for '{condition}'. "
@@ -231,10 +253,10 @@ def run_claim_check(policy_id: str, condition: str, treatment_type: str) -> dict
                      "or the document may not be indexed correctly."
         }
 
-    # Step 8: Build context block
+    # Build context block
     context_block = _build_context_block(fused)
 
-    # Step 9: Grounded LLM analysis (returns structure, NOT the score)
+    # Grounded LLM analysis (returns structure, NOT the score)
     user_prompt = (
         f"CONTEXT BLOCK:\n{context_block}\n\n"
         f"CONDITION TO ANALYZE: {condition}\n"
@@ -243,7 +265,7 @@ def run_claim_check(policy_id: str, condition: str, treatment_type: str) -> dict
         "based ONLY on the context block above. Be decisive — use 'covered' if general "
         "hospitalization is covered and no exclusion is found for this condition."
     )
-    analysis = llm.chat_json(GROUNDED_CLAIM_SYSTEM, user_prompt, temperature=0.0)
+    analysis = await llm.chat_json(GROUNDED_CLAIM_SYSTEM, user_prompt, temperature=0.0, cache=True)
 
     # Normalize LLM output
     coverage_status = analysis.get("coverage_status", "unknown")
@@ -256,7 +278,7 @@ def run_claim_check(policy_id: str, condition: str, treatment_type: str) -> dict
     required_documents = analysis.get("required_documents") or []
     analysis_summary = analysis.get("analysis_summary") or "Analysis could not be completed from available context."
 
-    # Step 10: Deterministic score
+    # Deterministic score
     feasibility_score = compute_claim_score(
         coverage_status, exclusions_applicable, risk_flags, policy
     )
@@ -278,6 +300,10 @@ def run_claim_check(policy_id: str, condition: str, treatment_type: str) -> dict
     }
 
 
+async def _no_results() -> list[dict]:
+    return []
+
+
 def _dedupe(chunks: list[dict]) -> list[dict]:
     """Remove duplicate chunks by id, preserving order."""
     seen: set[str] = set()
@@ -1,50 +1,357 @@
 """OpenAI embedding wrapper with retry and batch support."""
-import time
+import asyncio
+import base64
 import os
-from openai import OpenAI
+import re
+import random
+import numpy as np
+from openai import AsyncOpenAI, RateLimitError
+from services import embedding_cache, tokenizer
+from services.ttl_cache import TTLCache
 
-_client: OpenAI | None = None
+_client: AsyncOpenAI | None = None
 
 
-def get_client() -> OpenAI:
+def get_client() -> AsyncOpenAI:
     global _client
     if _client is None:
-        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        _client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
     return _client
 
 EMBED_MODEL = "text-embedding-3-small"
 EMBED_DIM = 1536
 
 
-def embed_text(text: str, retries: int = 3) -> list[float]:
-    """Embed a single text string. Returns 1536-dim vector."""
-    for attempt in range(retries):
+async def _cache_get(texts: list[str]) -> list[list[float] | None]:
+    cache = embedding_cache.get_cache()
+    if cache is None:
+        return [None] * len(texts)
+    try:
+        return await asyncio.to_thread(cache.get_many, EMBED_MODEL, texts)
+    except Exception as e:
+        print(f"[EmbedCache] lookup failed: {e}")
+        return [None] * len(texts)
+
+
+async def _cache_get_into(texts: list[str], out: np.ndarray) -> np.ndarray:
+    """Fill rows of out from the disk cache. Returns the hit mask (all False if the cache is off)."""
+    cache = embedding_cache.get_cache()
+    if cache is None:
+        return np.zeros(len(texts), dtype=bool)
+    try:
+        return await asyncio.to_thread(cache.get_into, EMBED_MODEL, texts, out)
+    except Exception as e:
+        print(f"[EmbedCache] lookup failed: {e}")
+        return np.zeros(len(texts), dtype=bool)
+
+
+async def _cache_put(texts: list[str], vectors):
+    cache = embedding_cache.get_cache()
+    if cache is None or not texts:
+        return
+    try:
+        await asyncio.to_thread(cache.put_many, EMBED_MODEL, texts, vectors)
+    except Exception as e:
+        print(f"[EmbedCache] store failed: {e}")
+
+
+# ── Query-embedding layer (in-process) ───────────────────────────────────────
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "2048"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_EMBED_CACHE_TTL", "3600"))
+
+# name → query text; embedded once at startup by warm_constant_queries()
+CONSTANT_QUERIES: dict[str, str] = {}
+_constants: dict[str, list[float]] = {}  # normalized text → vector
+
+
+# Recently seen query strings → vectors
+_hot = TTLCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+_stats = {
+    "constant_hits": 0, "lru_hits": 0, "disk_hits": 0, "misses": 0,
+    "api_calls": 0, "coalesced_batches": 0, "coalesced_inputs": 0,
+}
+
+
+def register_constant_query(name: str, text: str) -> str:
+    """Declare a fixed query string used on the hot path. Returns the text for convenience."""
+    CONSTANT_QUERIES[name] = text
+    return text
+
+
+async def warm_constant_queries():
+    """Embed every registered constant query in one request (no-op for those already warm)."""
+    texts = [embedding_cache.normalize(t) for t in CONSTANT_QUERIES.values()]
+    todo = [t for t in dict.fromkeys(texts) if t not in _constants]
+    if not todo:
+        return
+    vectors = await _embed_uncached(todo)
+    _constants.update(zip(todo, vectors))
+
+
+def query_cache_stats() -> dict:
+    served = _stats["constant_hits"] + _stats["lru_hits"] + _stats["disk_hits"] + _stats["misses"]
+    in_memory = _stats["constant_hits"] + _stats["lru_hits"]
+    return {
+        **_stats,
+        "constants_warm": len(_constants),
+        "lru_size": len(_hot),
+        "lru_max": _hot.maxsize,
+        "in_memory_hit_rate": round(in_memory / served, 4) if served else 0.0,
+    }
+
+
+# ── Micro-batching coalescer ─────────────────────────────────────────────────
+
+# The embeddings endpoint accepts up to 2048 inputs per request
+COALESCE_MAX_BATCH = min(int(os.getenv("EMBED_COALESCE_MAX_BATCH", "512")), 2048)
+COALESCE_MAX_WAIT_MS = float(os.getenv("EMBED_COALESCE_MAX_WAIT_MS", "5"))
+EMBED_RETRIES = 3
+# Upper bound on any single retry wait; embed_batch also serves user queries
+EMBED_RETRY_MAX_DELAY = float(os.getenv("EMBED_RETRY_MAX_DELAY", "30"))
+
+
+def _retry_delay(exc: Exception, attempt: int) -> float:
+    """
+    Seconds to wait before retrying, at most EMBED_RETRY_MAX_DELAY: a 429 honours its
+    rate-limit headers, anything else gets exponential backoff with jitter.
+    """
+    backoff = 2 ** attempt * random.uniform(0.5, 1.0)
+    if isinstance(exc, RateLimitError):
+        backoff = _rate_limit_delay(exc.response.headers) or backoff
+    return min(backoff, EMBED_RETRY_MAX_DELAY)
+
+
+def _rate_limit_delay(headers) -> float | None:
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if headers.get("retry-after"):
         try:
-            response = get_client().embeddings.create(
-                model=EMBED_MODEL,
-                input=text.replace("\n", " "),
-            )
-            return response.data[0].embedding
+            return float(headers["retry-after"])
+        except ValueError:
+            pass
+    resets = [
+        _parse_reset(headers[h])
+        for h in ("x-ratelimit-reset-tokens", "x-ratelimit-reset-requests")
+        if headers.get(h)
+    ]
+    return max(resets) if resets else None
+
+
+def _parse_reset(value: str) -> float:
+    """Parse OpenAI reset durations like '1s', '6m0s', '250ms'."""
+    units = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(n) * units[u] for n, u in re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value))
+
+
+async def _create_embeddings(texts: list[str], **kwargs):
+    """One embeddings.create call with retry/backoff. Returns response.data in input order."""
+    for attempt in range(EMBED_RETRIES):
+        try:
+            _stats["api_calls"] += 1
+            response = await get_client().embeddings.create(model=EMBED_MODEL, input=texts, **kwargs)
+            return sorted(response.data, key=lambda x: x.index)
         except Exception as e:
-            if attempt == retries - 1:
+            if attempt == EMBED_RETRIES - 1:
                 raise
-            time.sleep(2 ** attempt)
+            await asyncio.sleep(_retry_delay(e, attempt))
     return []
 
 
-def embed_batch(texts: list[str], batch_size: int = 100) -> list[list[float]]:
-    """Embed a list of texts in batches. Returns list of 1536-dim vectors."""
-    all_embeddings = []
-    for i in range(0, len(texts), batch_size):
-        batch = [t.replace("\n", " ") for t in texts[i : i + batch_size]]
-        for attempt in range(3):
-            try:
-                response = get_client().embeddings.create(model=EMBED_MODEL, input=batch)
-                batch_embeddings = [item.embedding for item in sorted(response.data, key=lambda x: x.index)]
-                all_embeddings.extend(batch_embeddings)
-                break
-            except Exception as e:
-                if attempt == 2:
-                    raise
-                time.sleep(2 ** attempt)
-    return all_embeddings
+async def _request_embeddings(texts: list[str]) -> list[list[float]]:
+    """Vectors as lists, for the query path."""
+    return [item.embedding for item in await _create_embeddings(texts)]
+
+
+async def _request_matrix(texts: list[str]) -> np.ndarray:
+    """Vectors as a len(texts) × EMBED_DIM float32 matrix, decoded from base64 without boxing floats."""
+    data = await _create_embeddings(texts, encoding_format="base64")
+    matrix = np.empty((len(data), EMBED_DIM), dtype=np.float32)
+    for i, item in enumerate(data):
+        matrix[i] = np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32)
+    return matrix
+
+
+class _Coalescer:
+    """
+    Collects query texts from concurrent callers for up to max_wait seconds (or until
+    max_batch distinct texts are pending), sends them as one embeddings request and
+    hands each caller back its own vectors. Identical texts in flight share one slot.
+    """
+
+    def __init__(self, max_batch: int, max_wait: float):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: dict[str, asyncio.Future] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        # In-flight sends; the loop only keeps weak references to tasks
+        self._sending: set[asyncio.Task] = set()
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        loop = asyncio.get_running_loop()
+        futures = []
+        for t in texts:
+            fut = self._pending.get(t)
+            if fut is None:
+                fut = loop.create_future()
+                self._pending[t] = fut
+            futures.append(fut)
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        # shield: one caller being cancelled must not cancel a slot shared with others
+        return list(await asyncio.gather(*(asyncio.shield(f) for f in futures)))
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        texts = list(batch)
+        for i in range(0, len(texts), self.max_batch):
+            part = texts[i : i + self.max_batch]
+            task = asyncio.ensure_future(self._send({t: batch[t] for t in part}))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: dict[str, asyncio.Future]):
+        _stats["coalesced_batches"] += 1
+        _stats["coalesced_inputs"] += len(batch)
+        try:
+            vectors = await _request_embeddings(list(batch))
+        except asyncio.CancelledError:
+            for fut in batch.values():
+                fut.cancel()
+            raise
+        except Exception as e:
+            # Failures go to the waiting callers, never unretrieved on the task
+            for fut in batch.values():
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for fut, vec in zip(batch.values(), vectors):
+            if not fut.done():
+                fut.set_result(vec)
+
+
+_coalescer = _Coalescer(COALESCE_MAX_BATCH, COALESCE_MAX_WAIT_MS / 1000)
+
+
+async def _embed_uncached(texts: list[str]) -> list[list[float]]:
+    """Disk cache, then the coalescer for whatever is still missing. texts must be normalized."""
+    found = await _cache_get(texts)
+    misses = [t for t, v in zip(texts, found) if v is None]
+    _stats["disk_hits"] += len(texts) - len(misses)
+    _stats["misses"] += len(misses)
+    if misses:
+        fresh = await _coalescer.embed(misses)
+        await _cache_put(misses, fresh)
+        by_text = dict(zip(misses, fresh))
+        found = [v if v is not None else by_text[t] for t, v in zip(texts, found)]
+    return found
+
+
+async def embed_queries(texts: list[str]) -> list[list[float]]:
+    """
+    Embed query strings for retrieval: constant queries → hot LRU → disk cache →
+    coalesced OpenAI request for the remainder. Order is preserved.
+    """
+    texts = [embedding_cache.normalize(t) for t in texts]
+    out: list[list[float] | None] = []
+    for t in texts:
+        vec = _constants.get(t)
+        if vec is not None:
+            _stats["constant_hits"] += 1
+        else:
+            vec = _hot.get(t)
+            if vec is not None:
+                _stats["lru_hits"] += 1
+        out.append(vec)
+
+    pending = list(dict.fromkeys(t for t, v in zip(texts, out) if v is None))
+    if pending:
+        fetched = dict(zip(pending, await _embed_uncached(pending)))
+        for t, vec in fetched.items():
+            _hot.put(t, vec)
+        out = [v if v is not None else fetched[t] for t, v in zip(texts, out)]
+    return out
+
+
+async def embed_text(text: str) -> list[float]:
+    """Embed a single query string. Returns 1536-dim vector (see embed_queries for cache tiers)."""
+    return (await embed_queries([text]))[0]
+
+
+# ── Bulk ingestion ───────────────────────────────────────────────────────────
+
+# Per-request token budget (API hard limit is 300k) and per-input limit
+EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", "60000"))
+EMBED_MAX_INPUT_TOKENS = 8191
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+
+# Shared across uploads so concurrent ingests don't multiply in-flight requests
+_ingest_slots = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+
+def _pack_batches(texts: list[str], max_inputs: int, max_tokens: int) -> list[list[int]]:
+    """Greedily pack text indices into batches bounded by input count and real token count."""
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        n = tokenizer.count_tokens(text)
+        if current and (len(current) >= max_inputs or current_tokens + n > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def embed_batch(texts: list[str], batch_size: int = 100) -> np.ndarray:
+    """
+    Embed a list of texts for ingestion. Returns a len(texts) × EMBED_DIM float32 matrix in input order.
+
+    The whole list is looked up in the embedding cache first (hits are copied straight into
+    the matrix); distinct misses are packed into batches by tiktoken count (and at most
+    batch_size inputs), then sent concurrently under a shared semaphore of EMBED_CONCURRENCY
+    requests.
+    """
+    texts = [embedding_cache.normalize(t) for t in texts]
+    matrix = np.empty((len(texts), EMBED_DIM), dtype=np.float32)
+    hit = await _cache_get_into(texts, matrix)
+    misses = list(dict.fromkeys(t for t, h in zip(texts, hit) if not h))
+    if not misses:
+        return matrix
+
+    inputs = [
+        t if tokenizer.count_tokens(t) <= EMBED_MAX_INPUT_TOKENS
+        else tokenizer.truncate(t, EMBED_MAX_INPUT_TOKENS)
+        for t in misses
+    ]
+    batches = _pack_batches(inputs, batch_size, EMBED_BATCH_MAX_TOKENS)
+
+    async def run(batch: list[int]) -> np.ndarray:
+        async with _ingest_slots:
+            vectors = await _request_matrix([inputs[i] for i in batch])
+        await _cache_put([misses[i] for i in batch], vectors)
+        return vectors
+
+    results = await asyncio.gather(*(run(b) for b in batches))
+    fresh = np.empty((len(misses), EMBED_DIM), dtype=np.float32)
+    for batch, vectors in zip(batches, results):
+        fresh[batch] = vectors
+
+    # Scatter distinct misses back to every row that needed them (duplicates share one request)
+    miss_row = {t: i for i, t in enumerate(misses)}
+    rows = np.flatnonzero(~hit)
+    matrix[rows] = fresh[[miss_row[texts[i]] for i in rows]]
+    return matrix
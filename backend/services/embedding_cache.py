@@ -0,0 +1,159 @@
+"""Persistent content-addressed embedding cache (SQLite, float32 blobs, LRU-capped).
+
+Keyed by sha256(model + normalized text), so the same clause embedded by an
+upload, the startup seeder or a query is only ever paid for once — even after
+a Supabase wipe or when a PDF is re-uploaded under a new filename.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+import numpy as np
+
+CACHE_PATH = os.getenv(
+    "EMBED_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), "../data/embedding_cache.sqlite3"),
+)
+# ~6 KB per 1536-dim vector → 100k entries ≈ 600 MB on disk
+MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "100000"))
+
+# SQLite host-parameter limit is 999 on older builds — stay well under it
+_SQL_BATCH = 500
+
+
+def normalize(text: str) -> str:
+    """Collapse all whitespace (newlines included) so trivially different copies share a key."""
+    return " ".join(text.split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed vector cache with least-recently-used eviction above max_entries."""
+
+    def __init__(self, path: str, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vec BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings(last_used)")
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _lookup(self, keys: list[str]) -> dict[str, bytes]:
+        """Fetch blobs for keys (bumping last_used on hits) in one locked pass."""
+        found: dict[str, bytes] = {}
+        now = time.time()
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), _SQL_BATCH):
+                part = unique[i : i + _SQL_BATCH]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({marks})", part
+                ).fetchall()
+                found.update(rows)
+                if rows:
+                    hit_keys = [k for k, _ in rows]
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(hit_keys))})",
+                        [now, *hit_keys],
+                    )
+        return found
+
+    def get_many(self, model: str, texts: list[str]) -> list[list[float] | None]:
+        """Look up a whole batch in one pass. Returns vectors aligned with texts, None for misses."""
+        keys = [cache_key(model, t) for t in texts]
+        found = self._lookup(keys)
+        out: list[list[float] | None] = []
+        for k in keys:
+            blob = found.get(k)
+            if blob is None:
+                out.append(None)
+                self.misses += 1
+            else:
+                out.append(array("f", blob).tolist())
+                self.hits += 1
+        return out
+
+    def get_into(self, model: str, texts: list[str], out: np.ndarray) -> np.ndarray:
+        """Copy cached vectors straight into rows of a float32 matrix. Returns the boolean hit mask."""
+        keys = [cache_key(model, t) for t in texts]
+        found = self._lookup(keys)
+        hit = np.zeros(len(keys), dtype=bool)
+        for i, k in enumerate(keys):
+            blob = found.get(k)
+            if blob is not None:
+                out[i] = np.frombuffer(blob, dtype=np.float32)
+                hit[i] = True
+        hits = int(hit.sum())
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return hit
+
+    def put_many(self, model: str, texts: list[str], vectors):
+        """Store vectors (lists or float32 matrix rows) for texts, then evict LRU rows above max_entries."""
+        now = time.time()
+        rows = [
+            (cache_key(model, t), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, vec, last_used) VALUES (?, ?, ?)", rows
+                )
+                self._count += self._conn.total_changes - before
+                if self._count > self.max_entries:
+                    # Evict down to 90% so we don't pay an eviction on every insert at the cap
+                    excess = self._count - int(self.max_entries * 0.9)
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE key IN ("
+                        " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                        (excess,),
+                    )
+                    self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_cache: EmbeddingCache | None = None
+_disabled = not CACHE_PATH
+
+
+def get_cache() -> EmbeddingCache | None:
+    """Process-wide cache, or None when disabled with EMBED_CACHE_PATH=''."""
+    global _cache, _disabled
+    if _cache is None and not _disabled:
+        try:
+            _cache = EmbeddingCache(CACHE_PATH, MAX_ENTRIES)
+        except (sqlite3.Error, OSError) as e:
+            print(f"[EmbedCache] disabled — could not open {CACHE_PATH}: {e}")
+            _disabled = True
+    return _cache
@@ -0,0 +1,246 @@
+"""Pipelined PDF ingestion: parse → embed → insert as concurrent stages.
+
+Stages are joined by bounded queues, so a fast parser waits for embedding
+(backpressure) instead of buffering the whole document, and page parsing,
+embedding requests and DB insert batches overlap. Wall-clock time approaches
+the slowest stage rather than the sum of all three. The PDF is opened once, on
+a dedicated thread that owns the document for its whole life.
+
+Files are fingerprinted: identical bytes are never ingested twice, and a new
+version of a stored wording (same filename, different bytes) is diffed chunk by
+chunk against the stored chunks, so only new or changed chunks are embedded and
+inserted, vanished ones are deleted, and the switch happens in one transaction.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from services import pdf_parser, embedder, vector_store
+from services.vector_store import ChunkColumns
+
+# Chunks per embedding request / rows per insert batch
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "64"))
+INGEST_INSERT_BATCH = int(os.getenv("INGEST_INSERT_BATCH", "256"))
+# Batches buffered between two stages before the upstream stage blocks
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+
+
+class _Stage:
+    """Items processed and time spent working (not waiting on a queue) by one stage."""
+
+    def __init__(self, workers: int = 1):
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+
+    def stats(self) -> dict:
+        # Busy time is summed over workers, so divide it back out for the stage's throughput
+        active = self.busy / self.workers
+        return {
+            "items": self.items,
+            "workers": self.workers,
+            "busy_seconds": round(self.busy, 3),
+            "per_sec": round(self.items / active, 1) if active > 0 else 0.0,
+        }
+
+
+def _take(chunks, n: int) -> list:
+    return list(itertools.islice(chunks, n))
+
+
+def file_hash(file_path: str) -> str:
+    with open(file_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _diff(chunks: list[pdf_parser.Chunk], stored: list[dict]) -> tuple[list[pdf_parser.Chunk], list[dict]]:
+    """
+    Split a new version's chunks into those to embed (text not stored yet) and stored rows
+    to keep, matched by content hash; each stored row is reused at most once.
+    """
+    ids_by_hash: dict[str, list[str]] = {}
+    for row in stored:
+        ids_by_hash.setdefault(row["content_hash"], []).append(row["id"])
+    changed, kept = [], []
+    for chunk in chunks:
+        ids = ids_by_hash.get(vector_store.content_hash(chunk.content))
+        if not ids:
+            changed.append(chunk)
+            continue
+        kept.append({
+            "id": ids.pop(),
+            "chunk_index": chunk.chunk_index,
+            "page_number": chunk.page_number,
+            "section_type": chunk.section_type,
+            "char_start": chunk.char_start,
+            "char_end": chunk.char_end,
+        })
+    return changed, kept
+
+
+async def ingest_pdf(file_path: str, filename: str, insurer: str = "", policy_id: str | None = None) -> dict:
+    """
+    Parse, embed and store one policy PDF — or update a stored policy to this version,
+    embedding only chunks whose text is new. The policy updated is policy_id when given,
+    else one stored under the same filename and insurer; with neither, a new policy is created.
+    Returns {policy_id, policy_name, action, chunk_count, reused, removed, embedded_tokens,
+    method, seconds, rows_per_sec, stages}; action is "created", "revised" or "unchanged"
+    (same bytes already stored, under any filename). policy_id is None (and nothing is
+    written) when no text could be extracted.
+    """
+    start = time.perf_counter()
+    digest = await asyncio.to_thread(file_hash, file_path)
+    if policy_id:
+        previous = await vector_store.get_policy_by_id(policy_id)
+        if previous is None or previous.get("revision_of"):
+            raise LookupError(f"Policy {policy_id} not found")
+    else:
+        previous = await vector_store.find_uploaded_policy(filename, digest, insurer)
+    if previous is not None and previous.get("content_hash") == digest:
+        print(f"[Ingest] {filename}: unchanged (same content as stored {previous['filename']})")
+        return {
+            "policy_id": previous["id"],
+            "policy_name": previous["user_label"],
+            "action": "unchanged",
+            "chunk_count": previous["chunk_count"],
+            "reused": previous["chunk_count"],
+            "removed": 0,
+            "embedded_tokens": 0,
+            "method": None,
+            "seconds": round(time.perf_counter() - start, 3),
+            "rows_per_sec": 0.0,
+            "stages": {},
+        }
+
+    loop = asyncio.get_running_loop()
+    # PyMuPDF documents are not thread-safe: one thread opens, reads and closes it
+    parser = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-parse")
+    pdf = None
+    try:
+        pdf = await loop.run_in_executor(parser, pdf_parser.PolicyPdf, file_path)
+        policy_name = await loop.run_in_executor(parser, lambda: pdf.policy_name)
+        stages = {
+            "parse": _Stage(),
+            "embed": _Stage(embedder.EMBED_CONCURRENCY),
+            "insert": _Stage(),
+        }
+        revision = None
+        kept_count = removed = 0
+        if previous is None:
+            chunks = pdf.chunks()
+        else:
+            # A diff needs every chunk up front; parsing is cheap next to embedding them
+            diff = stages["diff"] = _Stage()
+            t0 = time.perf_counter()
+            new_chunks = await loop.run_in_executor(parser, lambda: list(pdf.chunks()))
+            stored = await vector_store.policy_chunk_hashes(previous["id"])
+            changed, kept = _diff(new_chunks, stored)
+            diff.busy = time.perf_counter() - t0
+            diff.items = len(new_chunks)
+            kept_count, removed = len(kept), len(stored) - len(kept)
+            revision = vector_store.PolicyRevision(previous["id"], previous.get("version") or 1, kept)
+            chunks = iter(changed)
+            print(
+                f"[Ingest] {filename}: revising {previous['id']} — {len(changed)} new/changed, "
+                f"{kept_count} unchanged, {removed} removed"
+            )
+        parsed: asyncio.Queue = asyncio.Queue(INGEST_QUEUE_SIZE)
+        embedded: asyncio.Queue = asyncio.Queue(INGEST_QUEUE_SIZE)
+        writer = vector_store.policy_writer(revision)
+        total = 0
+        tokens = 0
+
+        async def parse():
+            stage = stages["parse"]
+            while True:
+                t0 = time.perf_counter()
+                batch = await loop.run_in_executor(parser, _take, chunks, INGEST_EMBED_BATCH)
+                stage.busy += time.perf_counter() - t0
+                if not batch:
+                    break
+                stage.items += len(batch)
+                await parsed.put(batch)
+            for _ in range(stages["embed"].workers):
+                await parsed.put(None)
+
+        async def embed_worker():
+            nonlocal tokens
+            stage = stages["embed"]
+            while (batch := await parsed.get()) is not None:
+                tokens += sum(c.token_count for c in batch)
+                t0 = time.perf_counter()
+                matrix = await embedder.embed_batch([c.content for c in batch])
+                stage.busy += time.perf_counter() - t0
+                stage.items += len(batch)
+                await embedded.put(ChunkColumns.from_chunks(batch, matrix))
+
+        async def embed():
+            await asyncio.gather(*(embed_worker() for _ in range(stages["embed"].workers)))
+            await embedded.put(None)
+
+        async def flush(pending: list[ChunkColumns]):
+            nonlocal total
+            stage = stages["insert"]
+            t0 = time.perf_counter()
+            if writer.policy_id is None:
+                await writer.open(policy_name, filename, insurer, digest)
+            rows = ChunkColumns.concat(pending)
+            await writer.write(rows)
+            stage.busy += time.perf_counter() - t0
+            stage.items += len(rows)
+            total += len(rows)
+
+        async def insert():
+            pending: list[ChunkColumns] = []
+            while (columns := await embedded.get()) is not None:
+                pending.append(columns)
+                if sum(len(p) for p in pending) >= INGEST_INSERT_BATCH:
+                    await flush(pending)
+                    pending = []
+            if pending:
+                await flush(pending)
+
+        tasks = [asyncio.ensure_future(t) for t in (parse(), embed(), insert())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+            # A revision commits even when nothing new was written (chunks only removed or moved);
+            # a version with no text at all is rejected like a new upload, never applied
+            if writer.policy_id is None and kept_count:
+                await writer.open(policy_name, filename, insurer, digest)
+            if writer.policy_id is not None:
+                await writer.commit(kept_count + total)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await writer.rollback()
+            raise
+    finally:
+        if pdf is not None:
+            await loop.run_in_executor(parser, pdf.close)
+        parser.shutdown(wait=False)
+
+    seconds = time.perf_counter() - start
+    rate = total / seconds if seconds > 0 else 0.0
+    stage_stats = {name: stage.stats() for name, stage in stages.items()}
+    print(
+        f"[Ingest] {filename}: {total} chunks written ({tokens} tokens embedded) via {writer.method} in {seconds:.2f}s ({rate:.0f} rows/s) — "
+        + ", ".join(f"{name} {s['per_sec']:.0f}/s" for name, s in stage_stats.items())
+    )
+    return {
+        "policy_id": writer.policy_id,
+        "policy_name": policy_name,
+        "action": "revised" if revision is not None else "created",
+        "chunk_count": kept_count + total,
+        "reused": kept_count,
+        "removed": removed,
+        "embedded_tokens": tokens,
+        "method": writer.method,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rate, 1),
+        "stages": stage_stats,
+    }
@@ -1,22 +1,112 @@
 """GPT-4o-mini structured response helpers."""
 import os
+import re
 import json
-from openai import OpenAI
+import asyncio
+import hashlib
+from openai import AsyncOpenAI
+from services.ttl_cache import TTLCache, SQLiteTTLStore
 
-_client: OpenAI | None = None
+_client: AsyncOpenAI | None = None
 MODEL = "gpt-4o-mini"
 
 
-def get_client() -> OpenAI:
+def get_client() -> AsyncOpenAI:
     global _client
     if _client is None:
-        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        _client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
     return _client
 
 
-def chat_json(system: str, user: str, temperature: float = 0.1) -> dict:
-    """Call GPT-4o-mini and parse JSON response. Returns empty dict on failure."""
-    response = get_client().chat.completions.create(
+# ── Response cache (opt-in per call site via cache=True) ─────────────────────
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+# Optional on-disk tier; empty (default) keeps the cache in memory only
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+
+_memory = TTLCache(LLM_CACHE_SIZE, LLM_CACHE_TTL)
+_disk: SQLiteTTLStore | None = None
+_disk_stats = {"hits": 0, "misses": 0}
+
+
+def _get_disk() -> SQLiteTTLStore | None:
+    global _disk, LLM_CACHE_PATH
+    if _disk is None and LLM_CACHE_PATH:
+        try:
+            _disk = SQLiteTTLStore(LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES)
+        except Exception as e:
+            print(f"[LLMCache] disk tier disabled — could not open {LLM_CACHE_PATH}: {e}")
+            LLM_CACHE_PATH = ""
+    return _disk
+
+
+def _cache_key(kind: str, system: str, user: str, temperature: float) -> str:
+    payload = json.dumps(
+        {"kind": kind, "model": MODEL, "temperature": temperature, "system": system, "user": user},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def _cache_get(key: str) -> str | None:
+    """Cached raw response text. Callers parse it fresh, so mutating a result never leaks into the cache."""
+    value = _memory.get(key)
+    if value is not None:
+        return value
+    disk = _get_disk()
+    if disk is None:
+        return None
+    try:
+        value = await asyncio.to_thread(disk.get, key)
+    except Exception as e:
+        print(f"[LLMCache] lookup failed: {e}")
+        return None
+    if value is None:
+        _disk_stats["misses"] += 1
+        return None
+    _disk_stats["hits"] += 1
+    _memory.put(key, value)
+    return value
+
+
+async def _cache_put(key: str, value: str):
+    _memory.put(key, value)
+    disk = _get_disk()
+    if disk is not None:
+        try:
+            await asyncio.to_thread(disk.put, key, value)
+        except Exception as e:
+            print(f"[LLMCache] store failed: {e}")
+
+
+def cache_stats() -> dict:
+    total = _memory.hits + _memory.misses
+    return {
+        "memory_hits": _memory.hits,
+        "memory_misses": _memory.misses,
+        "memory_size": len(_memory),
+        "memory_max": _memory.maxsize,
+        "disk_enabled": bool(LLM_CACHE_PATH),
+        "disk_hits": _disk_stats["hits"],
+        "disk_misses": _disk_stats["misses"],
+        "hit_rate": round((_memory.hits + _disk_stats["hits"]) / total, 4) if total else 0.0,
+    }
+
+
+async def chat_json(system: str, user: str, temperature: float = 0.1, cache: bool = False) -> dict:
+    """
+    Call GPT-4o-mini and parse JSON response. Returns empty dict on failure.
+    cache=True serves identical (system, user, model, temperature) calls from the response cache.
+    """
+    key = _cache_key("json", system, user, temperature) if cache else None
+    if key:
+        cached = await _cache_get(key)
+        if cached is not None:
+            return json.loads(cached)
+
+    response = await get_client().chat.completions.create(
         model=MODEL,
         messages=[
             {"role": "system", "content": system},
@@ -27,14 +117,23 @@ def chat_json(system: str, user: str, temperature: float = 0.1) -> dict:
     )
     content = response.choices[0].message.content or "{}"
     try:
-        return json.loads(content)
+        result = json.loads(content)
     except json.JSONDecodeError:
         return {}
+    if key and result:
+        await _cache_put(key, content)
+    return result
+
 
+async def chat_text(system: str, user: str, temperature: float = 0.3, cache: bool = False) -> str:
+    """Call GPT-4o-mini and return plain text response. cache=True as in chat_json."""
+    key = _cache_key("text", system, user, temperature) if cache else None
+    if key:
+        cached = await _cache_get(key)
+        if cached is not None:
+            return cached
 
-def chat_text(system: str, user: str, temperature: float = 0.3) -> str:
-    """Call GPT-4o-mini and return plain text response."""
-    response = get_client().chat.completions.create(
+    response = await get_client().chat.completions.create(
         model=MODEL,
         messages=[
             {"role": "system", "content": system},
@@ -42,4 +141,69 @@ def chat_text(system: str, user: str, temperature: float = 0.3) -> str:
         ],
         temperature=temperature,
     )
-    return response.choices[0].message.content or ""
+    content = response.choices[0].message.content or ""
+    if key and content:
+        await _cache_put(key, content)
+    return content
+
+
+async def stream_json(system: str, user: str, temperature: float = 0.1):
+    """
+    Stream a JSON-mode GPT-4o-mini response, yielding raw content deltas as they arrive.
+    The caller accumulates and parses the full document once the stream ends.
+    """
+    stream = await get_client().chat.completions.create(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ],
+        temperature=temperature,
+        response_format={"type": "json_object"},
+        stream=True,
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def _string_field(name: str) -> re.Pattern:
+    return re.compile(rf'"{name}"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+async def stream_json_fields(system: str, user: str, fields: tuple[str, ...], temperature: float = 0.1,
+                             cache: bool = False):
+    """
+    stream_json with the parsing done: yields ("token", delta) as content arrives,
+    ("field", {name: value}) once a listed top-level string field has fully arrived,
+    then ("result", parsed dict) — {} on invalid JSON, as in chat_json.
+    cache=True shares chat_json's cache entries; a hit replays the fields without tokens.
+    """
+    key = _cache_key("json", system, user, temperature) if cache else None
+    if key:
+        cached = await _cache_get(key)
+        if cached is not None:
+            result = json.loads(cached)
+            for name in fields:
+                if isinstance(result.get(name), str):
+                    yield "field", {name: result[name]}
+            yield "result", result
+            return
+
+    pending = {name: _string_field(name) for name in fields}
+    content = ""
+    async for delta in stream_json(system, user, temperature):
+        content += delta
+        yield "token", delta
+        for name, pattern in list(pending.items()):
+            m = pattern.search(content)
+            if m:
+                del pending[name]
+                yield "field", {name: json.loads(f'"{m.group(1)}"')}
+    try:
+        result = json.loads(content or "{}")
+    except json.JSONDecodeError:
+        result = {}
+    if key and result:
+        await _cache_put(key, content)
+    yield "result", result
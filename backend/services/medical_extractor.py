@@ -1,4 +1,5 @@
 """MedicalExtractorAgent — extract conditions from text or uploaded PDF."""
+import asyncio
 import io
 from services import llm
 
@@ -30,31 +31,37 @@ Return ONLY valid JSON:
 If no medical content is found, return {"conditions": [], "summary": "No medical conditions identified."}"""
 
 
-def extract_from_text(text: str) -> dict:
+async def extract_from_text(text: str) -> dict:
     """Extract medical conditions from plain text."""
-    result = llm.chat_json(EXTRACT_SYSTEM, text)
+    result = await llm.chat_json(EXTRACT_SYSTEM, text)
     result.setdefault("conditions", [])
     result.setdefault("summary", "")
     return result
 
 
-def extract_from_pdf_bytes(file_bytes: bytes) -> dict:
-    """Extract medical conditions from uploaded PDF file bytes."""
-    if not PYMUPDF_AVAILABLE:
-        return {"conditions": [], "summary": "PDF parsing unavailable", "error": "pymupdf not installed"}
-
+def _pdf_text(file_bytes: bytes) -> str:
     doc = fitz.open(stream=file_bytes, filetype="pdf")
     all_text = ""
     for page in doc:
         all_text += page.get_text() + "\n"
     doc.close()
+    return all_text
+
+
+async def extract_from_pdf_bytes(file_bytes: bytes) -> dict:
+    """Extract medical conditions from uploaded PDF file bytes."""
+    if not PYMUPDF_AVAILABLE:
+        return {"conditions": [], "summary": "PDF parsing unavailable", "error": "pymupdf not installed"}
+
+    # PyMuPDF is CPU-bound — keep it off the event loop
+    all_text = await asyncio.to_thread(_pdf_text, file_bytes)
 
     if not all_text.strip():
         return {"conditions": [], "summary": "No readable text found in PDF"}
 
     # Truncate to avoid token limits (~4000 chars ≈ 1000 tokens)
     truncated = all_text[:8000]
-    return extract_from_text(truncated)
+    return await extract_from_text(truncated)
 
 
 def match_conditions_to_exclusions(conditions: list[dict], policies: list[dict]) -> list[dict]:
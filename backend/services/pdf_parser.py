@@ -10,13 +10,64 @@ confirmed from real Tata AIG Medicare Premier policy document structure:
   Section 5 – Claims Procedure     (pages 48-52)
   Section 6 – Dispute Resolution   (pages 53-60)
 """
+import os
 import re
+import bisect
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from typing import Iterator
 import fitz  # PyMuPDF
+from services import tokenizer
 
 
-CHUNK_SIZE = 400      # tokens approximate (chars / 4)
-CHUNK_OVERLAP = 80    # token overlap
+CHUNK_SIZE = 400      # max tokens per chunk (tiktoken, text-embedding-3-small encoding)
+CHUNK_OVERLAP = 48    # overlap: whole sentences/clauses from the last CHUNK_OVERLAP tokens
+
+# Memory one spawned parse worker needs: its own interpreter, PyMuPDF and an open document
+PDF_WORKER_MEMORY_MB = int(os.getenv("PDF_WORKER_MEMORY_MB", "256"))
+
+
+def _available_memory() -> int | None:
+    """Bytes this process can still allocate: the cgroup headroom when containerised, else free RAM."""
+    available: list[int] = []
+    try:
+        available.append(os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE"))
+    except (AttributeError, ValueError, OSError):
+        pass
+    for limit_path, usage_path in (
+        ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),                       # cgroup v2
+        ("/sys/fs/cgroup/memory/memory.limit_in_bytes", "/sys/fs/cgroup/memory/memory.usage_in_bytes"),  # v1
+    ):
+        try:
+            with open(limit_path) as f:
+                limit = f.read().strip()
+            if limit == "max":
+                break
+            with open(usage_path) as f:
+                available.append(int(limit) - int(f.read()))
+            break
+        except (OSError, ValueError):
+            continue
+    return min(available) if available else None
+
+
+def _default_parse_workers() -> int:
+    """One process per CPU, but no more than free memory holds beside the API process."""
+    workers = os.cpu_count() or 1
+    memory = _available_memory()
+    if memory is not None:
+        workers = min(workers, memory // (PDF_WORKER_MEMORY_MB * 1024 * 1024))
+    return max(1, workers)
+
+
+# Page-parallel parsing: documents with at least PDF_PARALLEL_MIN_PAGES pages are split into
+# page ranges parsed by a pool of PDF_PARSE_WORKERS processes (each opens the file itself).
+# 1 parses in-process. The pool lives for the whole process and is warmed at startup.
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", "0")) or _default_parse_workers()
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "24"))
+# Pages per task; small enough to balance uneven pages, large enough to amortise reopening the PDF
+PDF_SHARD_PAGES = int(os.getenv("PDF_SHARD_PAGES", "8"))
 
 # Section heading detection patterns (confirmed from real policy PDFs)
 SECTION_PATTERNS: dict[str, list[str]] = {
@@ -75,11 +126,56 @@ SECTION_PATTERNS: dict[str, list[str]] = {
     ],
 }
 
-# Compiled patterns for efficiency
-_COMPILED: dict[str, list[re.Pattern]] = {
-    section: [re.compile(p, re.IGNORECASE | re.MULTILINE) for p in patterns]
-    for section, patterns in SECTION_PATTERNS.items()
-}
+# All patterns in one regex: a zero-width lookahead over one named group per section, in
+# priority order. Matched at a position, it reports the highest-priority section whose
+# patterns match there, so scanning every position reproduces the per-pattern loop exactly.
+_SECTIONS = list(SECTION_PATTERNS)
+_RANK = {section: rank for rank, section in enumerate(_SECTIONS)}
+_SECTION_RE = re.compile(
+    "(?=" + "|".join(
+        f"(?P<{section}>{'|'.join(patterns)})" for section, patterns in SECTION_PATTERNS.items()
+    ) + ")",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def _literal_prefix(pattern: str) -> str:
+    """Lowercased literal every match of pattern starts with ("" if it has none)."""
+    m = re.match(r"(?:\\b|\^)*([A-Za-z0-9-]*)", pattern)
+    literal = m.group(1)
+    if m.end() < len(pattern) and pattern[m.end()] in "?*{":
+        literal = literal[:-1]  # "Claims?" — the last character is optional
+    return literal.lower()
+
+
+# Prefilter: the regex only needs to be tried where some pattern can start. Literal
+# prefixes are found with str.find on the lowercased page (far cheaper than an
+# IGNORECASE scan); patterns without one are located with their own regex.
+_PREFIXES = sorted({_literal_prefix(p) for ps in SECTION_PATTERNS.values() for p in ps} - {""})
+# "co" already finds every "code-excl" / "condition" / "covered"
+_PREFIXES = [p for p in _PREFIXES if not any(p != q and p.startswith(q) for q in _PREFIXES)]
+_UNANCHORED = [
+    re.compile(f"(?={p})", re.IGNORECASE | re.MULTILINE)
+    for ps in SECTION_PATTERNS.values() for p in ps if not _literal_prefix(p)
+]
+# Characters IGNORECASE matches against ASCII letters that str.lower() does not map to them
+_FOLD_SPECIAL = re.compile("[\u0130\u0131\u017f\u212a]")
+
+
+def _candidates(text: str) -> list[int] | None:
+    """Sorted positions where a section pattern may start, or None to scan every position."""
+    low = text.lower()
+    if len(low) != len(text) or _FOLD_SPECIAL.search(text):
+        return None
+    found = set()
+    for prefix in _PREFIXES:
+        i = low.find(prefix)
+        while i != -1:
+            found.add(i)
+            i = low.find(prefix, i + 1)
+    for pattern in _UNANCHORED:
+        found.update(m.start() for m in pattern.finditer(text))
+    return sorted(found)
 
 
 @dataclass
@@ -88,74 +184,121 @@ class Chunk:
     page_number: int
     chunk_index: int
     section_type: str
+    # content == document text[char_start:char_end], where the document text is every
+    # page's get_text() concatenated in order; adjacent chunks are stitched back by span
+    char_start: int
+    char_end: int
+    token_count: int
 
 
-def _detect_section(text: str, current_section: str) -> str:
-    """Return section_type for a block of text, defaulting to current_section."""
-    for section, patterns in _COMPILED.items():
-        for pattern in patterns:
-            if pattern.search(text):
-                return section
-    return current_section
-
-
-def _chunk_text(text: str, chunk_size: int, overlap: int) -> list[str]:
-    """Split text into overlapping chunks by approximate token count (chars/4)."""
-    char_size = chunk_size * 4
-    char_overlap = overlap * 4
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + char_size
-        chunk = text[start:end]
-        if chunk.strip():
-            chunks.append(chunk.strip())
-        if end >= len(text):
-            break
-        start = end - char_overlap
-    return chunks
+class _SectionHits:
+    """
+    Heading-pattern hits for one page (start, end, section rank), found in one pass, so the
+    page and each of its chunks are classified by offset lookup instead of re-running every
+    pattern over every chunk. Results equal searching each chunk with each pattern in
+    SECTION_PATTERNS order and taking the first section that matches.
+    """
 
+    def __init__(self, text: str):
+        self.text = text
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+        self.ranks: list[int] = []
+        positions = _candidates(text)
+        matches = (
+            _SECTION_RE.finditer(text) if positions is None
+            else (m for m in map(lambda i: _SECTION_RE.match(text, i), positions) if m)
+        )
+        for m in matches:
+            self.starts.append(m.start())
+            self.ends.append(m.end(m.lastgroup))
+            self.ranks.append(_RANK[m.lastgroup])
 
-def parse_pdf(file_path: str) -> list[Chunk]:
-    """Parse PDF and return section-aware chunks."""
-    doc = fitz.open(file_path)
-    all_chunks: list[Chunk] = []
-    current_section = "general"
-    chunk_index = 0
-
-    for page_num in range(doc.page_count):
-        page = doc[page_num]
-        page_text = page.get_text()
-        if not page_text.strip():
-            continue
+    def page_section(self) -> str | None:
+        return _SECTIONS[min(self.ranks)] if self.ranks else None
 
-        # Update current section based on page content
-        current_section = _detect_section(page_text, current_section)
+    def span_section(self, start: int, end: int) -> str | None:
+        """Section for text[start:end], as if that substring were searched on its own."""
+        sub = self.text[start:end]
+        # The substring's first position sees different context (^ and \b at string start)
+        m = _SECTION_RE.match(sub)
+        best = _RANK[m.lastgroup] if m else len(_SECTIONS)
+        for i in range(bisect.bisect_right(self.starts, start), bisect.bisect_left(self.starts, end)):
+            rank = self.ranks[i]
+            if rank >= best:
+                continue
+            if self.ends[i] <= end:
+                best = rank
+            else:
+                # Page match runs past the chunk: re-test that one position inside the chunk
+                m = _SECTION_RE.match(sub, self.starts[i] - start)
+                if m:
+                    best = min(best, _RANK[m.lastgroup])
+            if best == 0:
+                break
+        return _SECTIONS[best] if best < len(_SECTIONS) else None
 
-        # Split page text into sub-chunks
-        sub_chunks = _chunk_text(page_text, CHUNK_SIZE, CHUNK_OVERLAP)
-        for sub in sub_chunks:
-            # Refine section detection per sub-chunk
-            section = _detect_section(sub, current_section)
-            all_chunks.append(
-                Chunk(
-                    content=sub,
-                    page_number=page_num + 1,
-                    chunk_index=chunk_index,
-                    section_type=section,
-                )
-            )
-            chunk_index += 1
 
-    doc.close()
-    return all_chunks
+# Chunk boundaries, best first: sentence end or blank line, then clause end or line break,
+# then any whitespace. Each match ends where the next piece of text starts.
+_BOUNDARIES = [
+    re.compile(r"[.!?][\"')\]]*\s+|\n[ \t]*\n\s*"),
+    re.compile(r"[;:][\"')\]]*\s+|\n\s*"),
+    re.compile(r"\s+"),
+]
 
 
-def extract_policy_name(file_path: str) -> str:
-    """Extract policy name from PDF first page text."""
-    doc = fitz.open(file_path)
-    first_page = doc[0].get_text() if doc.page_count > 0 else ""
-    doc.close()
+def _snap_end(text: str, lo: int, hi: int) -> int:
+    """Last boundary in text[lo:hi] of the best kind present (hi if there is none)."""
+    for boundary in _BOUNDARIES:
+        end = None
+        for m in boundary.finditer(text, lo, hi):
+            end = m.end()
+        if end is not None:
+            return end
+    return hi
+
+
+def _snap_start(text: str, lo: int, hi: int) -> int:
+    """First boundary in text[lo:hi] of the best kind present (hi if there is none)."""
+    for boundary in _BOUNDARIES:
+        m = boundary.search(text, lo, hi)
+        if m and m.end() < hi:
+            return m.end()
+    return hi
+
+
+def _chunk_spans(text: str, chunk_size: int, overlap: int) -> list[tuple[int, int]]:
+    """
+    (start, end) of whitespace-stripped chunks of at most chunk_size tokens, each ending at
+    a sentence or clause boundary in its second half where there is one. The next chunk
+    starts at the first boundary within the last `overlap` tokens, so overlaps are whole
+    sentences or clauses (or nothing) rather than cut words.
+    """
+    offsets = tokenizer.token_offsets(text)
+    n = len(offsets)
+    spans = []
+    start, tok = 0, 0
+    while tok < n:
+        end_tok = tok + chunk_size
+        if end_tok >= n:
+            end = len(text)
+        else:
+            end = _snap_end(text, max(start, offsets[tok + chunk_size // 2]), offsets[end_tok])
+        lead = len(text[start:end]) - len(text[start:end].lstrip())
+        stripped = text[start + lead:end].rstrip()
+        if stripped:
+            spans.append((start + lead, start + lead + len(stripped)))
+        if end >= len(text):
+            break
+        overlap_tok = max(tok + 1, bisect.bisect_left(offsets, end) - overlap)
+        start = _snap_start(text, max(start + 1, offsets[min(overlap_tok, n - 1)]), end)
+        # The token containing `start` counts against the next chunk's budget
+        tok = bisect.bisect_right(offsets, start) - 1
+    return spans
+
+
+def _policy_name(first_page: str) -> str:
     # Look for UIN line or title line
     lines = [l.strip() for l in first_page.split("\n") if len(l.strip()) > 10]
     for line in lines[:15]:
@@ -163,3 +306,157 @@ def extract_policy_name(file_path: str) -> str:
             if len(line) < 100:
                 return line
     return lines[0] if lines else "Unknown Policy"
+
+
+# A parsed page: (page number, page text length, section its text matches or None,
+# [(sub-chunk, start, end, tokens, section or None)]) with offsets relative to the page.
+# Section matching is independent per page, so pages can be parsed anywhere; only carrying the
+# current section forward, numbering chunks and document offsets happen in page order, in _Assembler.
+ParsedPage = tuple[int, int, str | None, list[tuple[str, int, int, int, str | None]]]
+
+
+def _parse_page(page_num: int, page_text: str) -> ParsedPage:
+    if not page_text.strip():
+        return page_num + 1, len(page_text), None, []
+    hits = _SectionHits(page_text)
+    subs = [
+        (page_text[s:e], s, e, tokenizer.count_tokens(page_text[s:e]), hits.span_section(s, e))
+        for s, e in _chunk_spans(page_text, CHUNK_SIZE, CHUNK_OVERLAP)
+    ]
+    return page_num + 1, len(page_text), hits.page_section(), subs
+
+
+def _parse_range(file_path: str, start: int, stop: int) -> list[ParsedPage]:
+    """Process-pool task: open the PDF and parse pages [start, stop)."""
+    doc = fitz.open(file_path)
+    try:
+        return [_parse_page(n, doc[n].get_text()) for n in range(start, stop)]
+    finally:
+        doc.close()
+
+
+class _Assembler:
+    """Turns parsed pages, fed in page order, into Chunks with running section and chunk_index."""
+
+    def __init__(self):
+        self.current_section = "general"
+        self.chunk_index = 0
+        self.offset = 0
+
+    def feed(self, page: ParsedPage) -> Iterator[Chunk]:
+        page_number, page_len, page_section, subs = page
+        # Update current section based on page content
+        self.current_section = page_section or self.current_section
+        for sub, start, end, tokens, sub_section in subs:
+            # Refine section detection per sub-chunk
+            yield Chunk(
+                content=sub,
+                page_number=page_number,
+                chunk_index=self.chunk_index,
+                section_type=sub_section or self.current_section,
+                char_start=self.offset + start,
+                char_end=self.offset + end,
+                token_count=tokens,
+            )
+            self.chunk_index += 1
+        self.offset += page_len
+
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Process-wide parsing pool (spawned, so workers never inherit the server's threads or sockets)."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=PDF_PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def _warm_worker(_: int) -> int:
+    # Unpickling this task imports pdf_parser (and PyMuPDF) in the worker; then load the encoding
+    tokenizer.get_encoding()
+    return os.getpid()
+
+
+def warm_pool():
+    """Spawn the parsing pool and import the parser in its workers, so the first upload does not pay for it."""
+    if PDF_PARSE_WORKERS > 1:
+        list(get_pool().map(_warm_worker, range(PDF_PARSE_WORKERS)))
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+class PolicyPdf:
+    """
+    One open PDF: the policy name from page 1 plus a lazy, page-ordered chunk stream,
+    so ingestion never holds every chunk at the same time.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.doc = fitz.open(file_path)
+        self._name: str | None = None
+
+    @property
+    def page_count(self) -> int:
+        return self.doc.page_count
+
+    @property
+    def policy_name(self) -> str:
+        if self._name is None:
+            self._name = _policy_name(self.doc[0].get_text() if self.doc.page_count > 0 else "")
+        return self._name
+
+    def chunks(self, workers: int | None = None) -> Iterator[Chunk]:
+        """
+        Yield section-aware chunks in page order. Long documents are parsed page-parallel
+        across `workers` processes (default PDF_PARSE_WORKERS); the output is identical.
+        """
+        workers = PDF_PARSE_WORKERS if workers is None else workers
+        assembler = _Assembler()
+        if workers > 1 and self.doc.page_count >= PDF_PARALLEL_MIN_PAGES:
+            pages = self._parallel_pages(workers)
+        else:
+            pages = (_parse_page(n, self.doc[n].get_text()) for n in range(self.doc.page_count))
+        for page in pages:
+            yield from assembler.feed(page)
+
+    def _parallel_pages(self, workers: int) -> Iterator[ParsedPage]:
+        count = self.doc.page_count
+        shard = max(1, min(PDF_SHARD_PAGES, -(-count // workers)))
+        starts = range(0, count, shard)
+        pool = get_pool() if workers == PDF_PARSE_WORKERS else ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+        )
+        try:
+            # map() yields shards in submission (page) order while later shards are still parsing
+            for pages in pool.map(
+                _parse_range, [self.file_path] * len(starts), starts, [min(s + shard, count) for s in starts],
+            ):
+                yield from pages
+        finally:
+            if pool is not _pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        self.doc.close()
+
+    def __enter__(self) -> "PolicyPdf":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_pdf(file_path: str, workers: int | None = None) -> Iterator[Chunk]:
+    """Parse PDF and yield section-aware chunks (list(parse_pdf(path)) for all of them)."""
+    with PolicyPdf(file_path) as pdf:
+        yield from pdf.chunks(workers)
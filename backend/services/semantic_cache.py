@@ -0,0 +1,128 @@
+"""Semantic answer cache for /api/ask.
+
+Per policy, keeps (question embedding, verdict JSON) pairs. A new question whose
+cosine similarity to a cached one is at least SEMANTIC_CACHE_THRESHOLD returns the
+cached verdict, skipping retrieval and GPT entirely ("is knee replacement covered"
+vs "knee replacement surgery coverage?"). Entries for a policy are dropped whenever
+its chunks are (re-)ingested: here via on_chunks_changed, and by another worker or
+process when the policy's stored version no longer matches the one they were cached at.
+"""
+import os
+import copy
+import time
+import numpy as np
+from services import vector_store
+
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_PER_POLICY = int(os.getenv("SEMANTIC_CACHE_MAX_PER_POLICY", "256"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+
+
+class _PolicyEntries:
+    def __init__(self, dim: int, version: str | None):
+        self.version = version  # vector_store.policy_version() the verdicts were computed at
+        self.matrix = np.empty((0, dim), dtype=np.float32)  # unit-normalized question embeddings
+        self.questions: list[str] = []
+        self.verdicts: list[dict] = []
+        self.stored_at: list[float] = []
+        self.last_hit: list[float] = []
+
+
+class SemanticAnswerCache:
+    def __init__(self, threshold: float, max_per_policy: int, ttl: float):
+        self.threshold = threshold
+        self.max_per_policy = max_per_policy
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_stores = 0
+        self._policies: dict[str, _PolicyEntries] = {}
+        # Bumped by invalidate(); a verdict computed across a bump is not stored
+        self._generations: dict[str, int] = {}
+
+    @staticmethod
+    def _unit(embedding: list[float]) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else vec
+
+    def generation(self, policy_id: str) -> int:
+        """Capture before computing a verdict and pass to store()."""
+        return self._generations.get(policy_id, 0)
+
+    def lookup(self, policy_id: str, embedding: list[float], version: str | None = None) -> dict | None:
+        """
+        Return a copy of the cached verdict for the most similar question above threshold, else None.
+        Entries cached at a different stored version of the policy are dropped.
+        """
+        entries = self._policies.get(policy_id)
+        if entries is not None and entries.version != version:
+            self.invalidate(policy_id)
+            entries = None
+        if entries is None or not entries.questions:
+            self.misses += 1
+            return None
+        sims = entries.matrix @ self._unit(embedding)
+        best = int(np.argmax(sims))
+        now = time.time()
+        if sims[best] < self.threshold or now - entries.stored_at[best] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entries.last_hit[best] = now
+        return copy.deepcopy(entries.verdicts[best])
+
+    def store(
+        self,
+        policy_id: str,
+        question: str,
+        embedding: list[float],
+        verdict: dict,
+        version: str | None = None,
+        generation: int | None = None,
+    ):
+        """Cache a verdict computed at `version`; skipped if the policy was invalidated since `generation`."""
+        if generation is not None and generation != self.generation(policy_id):
+            self.stale_stores += 1
+            return
+        vec = self._unit(embedding)
+        entries = self._policies.get(policy_id)
+        if entries is None or entries.version != version:
+            entries = self._policies[policy_id] = _PolicyEntries(vec.shape[0], version)
+        now = time.time()
+        entries.matrix = np.vstack([entries.matrix, vec[None, :]])
+        entries.questions.append(question)
+        entries.verdicts.append(copy.deepcopy(verdict))
+        entries.stored_at.append(now)
+        entries.last_hit.append(now)
+        if len(entries.questions) > self.max_per_policy:
+            # Evict the least recently hit entry
+            drop = int(np.argmin(entries.last_hit))
+            entries.matrix = np.delete(entries.matrix, drop, axis=0)
+            for column in (entries.questions, entries.verdicts, entries.stored_at, entries.last_hit):
+                del column[drop]
+
+    def invalidate(self, policy_id: str):
+        self._generations[policy_id] = self.generation(policy_id) + 1
+        if self._policies.pop(policy_id, None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+            "stale_stores": self.stale_stores,
+            "policies": len(self._policies),
+            "entries": sum(len(e.questions) for e in self._policies.values()),
+        }
+
+
+answer_cache = SemanticAnswerCache(
+    SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_PER_POLICY, SEMANTIC_CACHE_TTL
+)
+vector_store.on_chunks_changed(answer_cache.invalidate)
@@ -5,7 +5,12 @@ Specialized reusable AI skills:
 - PolicyRanker: Score and rank catalog policies for a user profile
 """
 from __future__ import annotations
+import re
+import json
+import asyncio
 from services import embedder, vector_store, llm
+from services.semantic_cache import answer_cache
+from services.stitch import stitch_chunks
 
 
 # ── Hidden Conditions Detector ───────────────────────────────────────────────
@@ -54,34 +59,94 @@ CRITICAL RULES:
 - RED = not covered or likely to be denied"""
 
 
+# Top-level scalar fields surfaced to streaming clients as soon as their value is complete
+_STREAM_FIELDS = {
+    "verdict": re.compile(r'"verdict"\s*:\s*"((?:[^"\\]|\\.)*)"'),
+    "practical_claimability": re.compile(r'"practical_claimability"\s*:\s*"((?:[^"\\]|\\.)*)"'),
+    "confidence": re.compile(r'"confidence"\s*:\s*(\d+)\s*[,}\n]'),
+    "plain_answer": re.compile(r'"plain_answer"\s*:\s*"((?:[^"\\]|\\.)*)"'),
+}
+
+
+def _completed_fields(partial: str, sent: set[str]) -> list[tuple[str, object]]:
+    """Fields of a partial JSON verdict whose values have fully arrived and were not yet sent."""
+    out = []
+    for field, pattern in _STREAM_FIELDS.items():
+        if field in sent:
+            continue
+        m = pattern.search(partial)
+        if m:
+            sent.add(field)
+            value = int(m.group(1)) if field == "confidence" else json.loads(f'"{m.group(1)}"')
+            out.append((field, value))
+    return out
+
+
+DETECT_LAYERS = [
+    # Layer 1a + 1b: semantic and keyword, fused with RRF
+    {"name": "semantic", "kind": "semantic", "top_k": 8, "fuse": True},
+    {"name": "keyword", "kind": "keyword", "top_k": 8, "fuse": True},
+    # Layer 2: Definitions section
+    {"name": "definitions", "kind": "semantic", "top_k": 3, "sections": ["definitions"]},
+    # Layer 3: Exclusions + Conditions + Limits sections
+    {"name": "exclusions", "kind": "semantic", "top_k": 3,
+     "sections": ["exclusions", "conditions", "limits", "waiting_periods"]},
+]
+
+
 class HiddenConditionsDetector:
     """Performs 3-layer hybrid RAG and returns structured verdict with hidden conditions."""
 
-    def detect(self, question: str, policy_id: str) -> dict:
-        # Embed the question once
-        query_emb = embedder.embed_text(question)
-
-        # Layer 1: Hybrid search — semantic + keyword → RRF fusion
-        semantic = vector_store.semantic_search(query_emb, policy_id, top_k=8)
-        keyword = vector_store.keyword_search(question, policy_id, top_k=8)
-        fused = vector_store.rrf_fusion(semantic, keyword, top_k=5)
+    async def detect(self, question: str, policy_id: str) -> dict:
+        result: dict = {}
+        async for event, data in self.stream(question, policy_id):
+            if event == "result":
+                result = data
+        return result
 
-        # Layer 2: Definitions section
-        definitions = vector_store.section_search(
-            query_emb, policy_id, ["definitions"], top_k=3
+    async def stream(self, question: str, policy_id: str):
+        """
+        Same pipeline as detect(), as (event, data) pairs for SSE:
+        citations once retrieval returns, then verdict fields / tokens while GPT
+        generates, then the normalized verdict as a final `result` event.
+        """
+        # Embed the question once; the policy's stored version tags cached verdicts
+        generation = answer_cache.generation(policy_id)
+        query_emb, version = await asyncio.gather(
+            embedder.embed_text(question), vector_store.policy_version(policy_id)
         )
 
-        # Layer 3: Exclusions + Conditions + Limits sections
-        exclusions = vector_store.section_search(
-            query_emb, policy_id, ["exclusions", "conditions", "limits", "waiting_periods"], top_k=3
+        # Semantic answer cache: a near-identical question already answered for this policy
+        cached = answer_cache.lookup(policy_id, query_emb, version)
+        if cached is not None:
+            yield "result", cached
+            return
+
+        # All layers in one hybrid search; each degrades to [] on failure/timeout
+        layers = await vector_store.hybrid_search(
+            query_emb, question, policy_id, DETECT_LAYERS, fused_top_k=5
         )
+        # Layer 1: Hybrid search — semantic + keyword → RRF fusion
+        fused = layers["fused"]
+        definitions = layers["definitions"]
+        exclusions = layers["exclusions"]
+
+        yield "citations", [
+            {"page": c.get("page_number"), "section": c.get("section_type", "general")}
+            for c in fused + definitions + exclusions
+        ]
+
+        # Build context for LLM: overlapping neighbours are stitched into one passage, and a
+        # chunk already shown under an earlier label is not repeated under a later one
+        shown: set = set()
 
-        # Build context for LLM
         def format_chunks(chunks: list[dict], label: str) -> str:
+            chunks = [c for c in chunks if c["id"] not in shown]
+            shown.update(c["id"] for c in chunks)
             if not chunks:
                 return ""
             parts = [f"[{label}]"]
-            for c in chunks:
+            for c in stitch_chunks(chunks):
                 parts.append(
                     f"[Page {c.get('page_number', '?')} | {c.get('section_type', 'general')}]\n{c['content']}"
                 )
@@ -100,7 +165,18 @@ POLICY CLAUSES:
 
 Analyze the above policy clauses and return the JSON verdict."""
 
-        result = llm.chat_json(HIDDEN_CONDITIONS_SYSTEM, user_prompt)
+        content = ""
+        sent: set[str] = set()
+        async for delta in llm.stream_json(HIDDEN_CONDITIONS_SYSTEM, user_prompt):
+            content += delta
+            yield "token", delta
+            for field, value in _completed_fields(content, sent):
+                yield "field", {field: value}
+        try:
+            result = json.loads(content or "{}")
+        except json.JSONDecodeError:
+            result = {}
+        answerable = bool(result)
 
         # Fallback defaults
         result.setdefault("verdict", "AMBIGUOUS")
@@ -112,7 +188,9 @@ Analyze the above policy clauses and return the JSON verdict."""
         result.setdefault("citations", [])
         result.setdefault("recommendation", "Contact your insurer directly for clarification.")
 
-        return result
+        if answerable:
+            answer_cache.store(policy_id, question, query_emb, result, version, generation)
+        yield "result", result
 
 
 # ── Coverage Gap Scanner ─────────────────────────────────────────────────────
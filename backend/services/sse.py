@@ -0,0 +1,31 @@
+"""Server-sent-event helpers for the streaming endpoints.
+
+Handlers build an async generator of (event, data) pairs; stream_events wraps
+it in a text/event-stream response and turns an exception mid-stream into a
+final `error` event instead of a silently truncated body.
+"""
+import json
+from typing import AsyncIterator
+from fastapi.responses import StreamingResponse
+
+
+def format_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _encode(events: AsyncIterator[tuple[str, object]]):
+    try:
+        async for event, data in events:
+            yield format_event(event, data)
+    except Exception as e:
+        print(f"[SSE] stream failed: {e}")
+        yield format_event("error", {"detail": str(e)})
+
+
+def stream_events(events: AsyncIterator[tuple[str, object]]) -> StreamingResponse:
+    return StreamingResponse(
+        _encode(events),
+        media_type="text/event-stream",
+        # Disable proxy buffering (nginx/Render) so each event is flushed immediately
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,44 @@
+"""Stitch retrieved chunks that overlap in the source document back into one passage.
+
+Neighbouring chunks share their boundary sentences (pdf_parser.CHUNK_OVERLAP), so
+sending both verbatim repeats that text in the prompt. Chunks carry their document
+character span (char_start, char_end), which is enough to merge overlapping
+neighbours into one passage holding every character once. Chunks without spans
+(stored before spans existed) pass through unchanged.
+"""
+
+
+def _span(chunk: dict) -> tuple[int, int] | None:
+    start, end = chunk.get("char_start"), chunk.get("char_end")
+    return (start, end) if start is not None and end is not None else None
+
+
+def stitch_chunks(chunks: list[dict]) -> list[dict]:
+    """
+    Merge chunks whose spans overlap into single passages. A passage keeps the metadata
+    and list position of its best-ranked chunk, so retrieval order is preserved;
+    "stitched" counts the chunks it replaces.
+    """
+    spanned = sorted((i for i, c in enumerate(chunks) if _span(c)), key=lambda i: _span(chunks[i]))
+    runs: list[dict] = []
+    for i in spanned:
+        start, end = _span(chunks[i])
+        run = runs[-1] if runs else None
+        if run is None or start >= run["end"]:
+            runs.append({"first": i, "start": start, "end": end, "content": chunks[i]["content"], "count": 1})
+            continue
+        if end > run["end"]:
+            run["content"] += chunks[i]["content"][run["end"] - start:]
+            run["end"] = end
+        run["first"] = min(run["first"], i)
+        run["count"] += 1
+
+    placed: list[tuple[int, dict]] = [(i, c) for i, c in enumerate(chunks) if not _span(c)]
+    for run in runs:
+        passage = dict(chunks[run["first"]])
+        if run["count"] > 1:
+            passage.update(
+                content=run["content"], char_start=run["start"], char_end=run["end"], stitched=run["count"],
+            )
+        placed.append((run["first"], passage))
+    return [c for _, c in sorted(placed, key=lambda p: p[0])]
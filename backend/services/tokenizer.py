@@ -0,0 +1,50 @@
+"""tiktoken helpers shared by the embedder and the PDF chunker.
+
+text-embedding-3-small and gpt-4o-mini budgets are counted with the model's
+own encoding. If the BPE file cannot be loaded (e.g. no network on first
+use), counts fall back to the chars/4 approximation.
+"""
+import tiktoken
+
+ENCODING_MODEL = "text-embedding-3-small"
+
+_encoding: tiktoken.Encoding | None = None
+_unavailable = False
+
+
+def get_encoding() -> tiktoken.Encoding | None:
+    global _encoding, _unavailable
+    if _encoding is None and not _unavailable:
+        try:
+            _encoding = tiktoken.encoding_for_model(ENCODING_MODEL)
+        except Exception as e:
+            print(f"[Tokenizer] tiktoken unavailable, approximating tokens as chars/4: {e}")
+            _unavailable = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    enc = get_encoding()
+    if enc is None:
+        return max(1, len(text) // 4)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens tokens."""
+    enc = get_encoding()
+    if enc is None:
+        return text[: max_tokens * 4]
+    tokens = enc.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max_tokens])
+
+
+def token_offsets(text: str) -> list[int]:
+    """Character offset at which each token of text starts (every 4th char without tiktoken)."""
+    enc = get_encoding()
+    if enc is None:
+        return list(range(0, len(text), 4))
+    _, offsets = enc.decode_with_offsets(enc.encode(text, disallowed_special=()))
+    return offsets
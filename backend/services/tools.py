@@ -29,13 +29,18 @@ TOOL_SCHEMAS = [
         "type": "function",
         "function": {
             "name": "keyword_search",
-            "description": "Find policy chunks by exact keyword match using PostgreSQL full-text search. Best for legal terms, clause codes, procedure names.",
+            "description": "Find policy chunks by keyword match (BM25, partial terms allowed). Best for legal terms, clause codes, procedure names.",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "query": {"type": "string", "description": "Keywords to search for"},
                     "policy_id": {"type": "string", "description": "UUID of the uploaded policy document"},
                     "top_k": {"type": "integer", "description": "Number of results to return", "default": 8},
+                    "section_types": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": ["definitions", "exclusions", "conditions", "waiting_periods", "limits", "coverage", "claims", "general"]},
+                        "description": "Optional section types to restrict search to",
+                    },
                 },
                 "required": ["query", "policy_id"],
             },
@@ -144,32 +149,34 @@ TOOL_SCHEMAS = [
 
 # ── Tool implementations ─────────────────────────────────────────────────────
 
-def run_tool(name: str, args: dict) -> dict:
+async def run_tool(name: str, args: dict) -> dict:
     """Dispatch tool call by name and return result as dict."""
     if name == "semantic_search":
-        emb = embedder.embed_text(args["query"])
-        results = vector_store.semantic_search(emb, args["policy_id"], args.get("top_k", 8))
+        emb = await embedder.embed_text(args["query"])
+        results = await vector_store.semantic_search(emb, args["policy_id"], args.get("top_k", 8))
         return {"chunks": results}
 
     if name == "keyword_search":
-        results = vector_store.keyword_search(args["query"], args["policy_id"], args.get("top_k", 8))
+        results = await vector_store.keyword_search(
+            args["query"], args["policy_id"], args.get("top_k", 8), args.get("section_types")
+        )
         return {"chunks": results}
 
     if name == "section_search":
-        emb = embedder.embed_text(args["query"])
-        results = vector_store.section_search(emb, args["policy_id"], args["section_types"], args.get("top_k", 3))
+        emb = await embedder.embed_text(args["query"])
+        results = await vector_store.section_search(emb, args["policy_id"], args["section_types"], args.get("top_k", 3))
         return {"chunks": results}
 
     if name == "filter_catalog":
-        policies = vector_store.list_catalog_policies(filters=args)
+        policies = await vector_store.list_catalog_policies(filters=args)
         return {"policies": policies}
 
     if name == "get_policy_metadata":
-        policy = vector_store.get_catalog_policy(args["policy_id"])
+        policy = await vector_store.get_catalog_policy(args["policy_id"])
         return {"policy": policy}
 
     if name == "extract_conditions":
-        result = llm.chat_json(
+        result = await llm.chat_json(
             system=(
                 "You are a medical coding specialist. Extract all diagnosed medical conditions, "
                 "pre-existing diseases, and chronic conditions from the text. "
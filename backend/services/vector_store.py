@@ -1,8 +1,18 @@
 """Supabase pgvector + tsvector hybrid search operations."""
 import os
-from supabase import create_client, Client
+import json
+import struct
+import asyncio
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+from services.bm25 import BM25Index
+from services.ttl_cache import TTLCache
+from supabase import create_client, acreate_client, Client, AClient
 
 _client: Client | None = None
+_async_client: AClient | None = None
 
 
 def get_client() -> Client:
@@ -15,42 +25,229 @@ def get_client() -> Client:
     return _client
 
 
+async def get_async_client() -> AClient:
+    """Async PostgREST client used by request handlers so DB calls never block the event loop."""
+    global _async_client
+    if _async_client is None:
+        _async_client = await acreate_client(
+            os.getenv("SUPABASE_URL", ""),
+            os.getenv("SUPABASE_SERVICE_KEY", ""),
+        )
+    return _async_client
+
+
+# ── Direct Postgres backend (optional) ─────────────────────────────────────
+
+# "postgrest" (default) sends hot vector queries through Supabase's HTTPS API;
+# "asyncpg" talks to Postgres directly over a pooled connection, reusing
+# server-side prepared statements and sending vectors in pgvector's binary format.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "postgrest").lower()
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+PG_POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN_SIZE", "1"))
+PG_POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", "10"))
+# Set to 0 behind a transaction-mode pooler (PgBouncer / Supavisor :6543), which cannot hold prepared statements
+PG_STATEMENT_CACHE_SIZE = int(os.getenv("PG_STATEMENT_CACHE_SIZE", "100"))
+# Ingestion: "postgrest" (default) posts JSON batches; "copy" (opt-in) streams chunks with
+# binary COPY inside one transaction and needs a reachable DATABASE_URL.
+INGEST_BACKEND = os.getenv("INGEST_BACKEND", "postgrest").lower()
+
+_pool = None
+_pool_lock: asyncio.Lock | None = None
+
+_SQL_MATCH_DIRECT = "SELECT * FROM match_chunks_direct($1, $2, $3)"
+_SQL_MATCH_BY_SECTION = "SELECT * FROM match_chunks_by_section($1, $2, $3, $4)"
+_SQL_KEYWORD = "SELECT * FROM keyword_search_chunks($1, $2, $3)"
+_SQL_HYBRID = "SELECT * FROM hybrid_search($1, $2, $3, $4::jsonb)"
+_SQL_POLICY_CHUNKS = (
+    "SELECT id, content, page_number, section_type, char_start, char_end, embedding FROM policy_chunks"
+    " WHERE uploaded_policy_id = $1 ORDER BY chunk_index"
+)
+
+
+def use_postgres() -> bool:
+    return VECTOR_BACKEND == "asyncpg"
+
+
+def use_copy() -> bool:
+    return INGEST_BACKEND == "copy" and bool(DATABASE_URL)
+
+
+def _encode_vector(value) -> bytes:
+    # pgvector binary wire format: uint16 dim, uint16 unused, dim × big-endian float32
+    vec = np.asarray(value, dtype=">f4")
+    return struct.pack(">HH", vec.shape[0], 0) + vec.tobytes()
+
+
+def _decode_vector(data: bytes) -> np.ndarray:
+    dim, _ = struct.unpack_from(">HH", data)
+    return np.frombuffer(data, dtype=">f4", count=dim, offset=4).astype(np.float32)
+
+
+async def _init_connection(conn):
+    # The extension may live outside public (Supabase installs it in "extensions")
+    schema = await conn.fetchval(
+        "SELECT n.nspname FROM pg_type t JOIN pg_namespace n ON n.oid = t.typnamespace"
+        " WHERE t.typname = 'vector'"
+    )
+    await conn.set_type_codec(
+        "vector", schema=schema or "public",
+        encoder=_encode_vector, decoder=_decode_vector, format="binary",
+    )
+
+
+async def get_pool():
+    """Process-wide asyncpg pool for VECTOR_BACKEND=asyncpg (DATABASE_URL = Postgres connection string)."""
+    global _pool, _pool_lock
+    if _pool is None:
+        if _pool_lock is None:
+            _pool_lock = asyncio.Lock()
+        async with _pool_lock:
+            if _pool is None:
+                import asyncpg
+                _pool = await asyncpg.create_pool(
+                    DATABASE_URL,
+                    min_size=PG_POOL_MIN_SIZE,
+                    max_size=PG_POOL_MAX_SIZE,
+                    statement_cache_size=PG_STATEMENT_CACHE_SIZE,
+                    init=_init_connection,
+                )
+                print(f"[VectorStore] asyncpg pool ready ({PG_POOL_MIN_SIZE}-{PG_POOL_MAX_SIZE} connections)")
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+async def _pg_fetch(sql: str, *args) -> list[dict]:
+    # conn.fetch prepares each statement once per connection and reuses it from the statement cache
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(sql, *args)
+    return [{**row, "id": str(row["id"])} for row in rows]
+
+
+def _wire_vector(embedding) -> str:
+    """
+    pgvector text literal with 9 significant digits — lossless for float32 (what the column stores),
+    and far shorter than json-encoding float32 values widened to float64 ("0.012345678918063641").
+    """
+    return "[" + ",".join(["%.9g" % x for x in embedding]) + "]"
+
+
 # ── Policy metadata CRUD ────────────────────────────────────────────────────
 
-def create_uploaded_policy(name: str, filename: str, insurer: str = "") -> str:
+async def create_uploaded_policy(
+    name: str, filename: str, insurer: str = "", content_hash: str | None = None, revision_of: str | None = None,
+) -> str:
     """Insert a record into uploaded_policies and return its UUID."""
-    client = get_client()
-    result = client.table("uploaded_policies").insert({
+    client = await get_async_client()
+    result = await client.table("uploaded_policies").insert({
         "user_label": name,
         "filename": filename,
         "insurer": insurer,
         "chunk_count": 0,
+        "content_hash": content_hash,
+        "revision_of": revision_of,
     }).execute()
     return result.data[0]["id"]
 
 
-def update_chunk_count(policy_id: str, count: int):
-    get_client().table("uploaded_policies").update(
+async def update_chunk_count(policy_id: str, count: int):
+    client = await get_async_client()
+    await client.table("uploaded_policies").update(
         {"chunk_count": count}
     ).eq("id", policy_id).execute()
 
 
-def list_uploaded_policies() -> list[dict]:
-    result = get_client().table("uploaded_policies").select(
-        "id, user_label, filename, insurer, chunk_count, uploaded_at"
-    ).order("uploaded_at", desc=True).execute()
+async def list_uploaded_policies() -> list[dict]:
+    client = await get_async_client()
+    result = await client.table("uploaded_policies").select(
+        "id, user_label, filename, insurer, chunk_count, version, uploaded_at"
+    ).is_("revision_of", "null").order("uploaded_at", desc=True).execute()
     return result.data
 
 
-def policy_already_embedded(filename: str) -> bool:
-    result = get_client().table("uploaded_policies").select("id").eq(
-        "filename", filename
-    ).execute()
-    return len(result.data) > 0
+async def find_uploaded_policy(filename: str, content_hash: str, insurer: str = "") -> dict | None:
+    """
+    The stored policy a file corresponds to: one with identical bytes (under any filename)
+    if there is one, else the latest one with the same filename and insurer (a revised
+    wording), else None. Without an insurer only identical bytes match — a filename such
+    as "policy.pdf" alone does not identify a policy.
+    """
+    client = await get_async_client()
+
+    def latest(**match: str):
+        query = client.table("uploaded_policies").select(
+            "id, user_label, filename, insurer, chunk_count, content_hash, version"
+        )
+        for column, value in match.items():
+            query = query.eq(column, value)
+        return query.is_("revision_of", "null").order("uploaded_at", desc=True).limit(1).execute()
+
+    if not insurer:
+        rows = (await latest(content_hash=content_hash)).data
+    else:
+        same_bytes, same_name = await asyncio.gather(
+            latest(content_hash=content_hash), latest(filename=filename, insurer=insurer),
+        )
+        rows = same_bytes.data or same_name.data
+    return rows[0] if rows else None
+
+
+def _in_list(values) -> str:
+    # PostgREST in.(...) list with every value double-quoted, so commas and parentheses are literal
+    return "(" + ",".join('"' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"' for v in values) + ")"
+
+
+async def embedded_fingerprints(filenames: list[str], content_hashes: list[str]) -> list[dict]:
+    """[{id, filename, insurer, content_hash}] for stored policies matching any filename or hash, in one query."""
+    if not filenames and not content_hashes:
+        return []
+    client = await get_async_client()
+    result = await (
+        client.table("uploaded_policies")
+        .select("id, filename, insurer, content_hash")
+        .or_(f"filename.in.{_in_list(filenames)},content_hash.in.{_in_list(content_hashes)}")
+        .is_("revision_of", "null")
+        .execute()
+    )
+    return result.data or []
 
 
-def get_policy_by_id(policy_id: str) -> dict | None:
-    result = get_client().table("uploaded_policies").select("*").eq(
+# Stored version of each policy, re-read at most every POLICY_VERSION_TTL seconds. In-process
+# caches (policy index, semantic answers) are tagged with it, so chunks changed by another
+# worker or process are noticed within that window instead of never.
+POLICY_VERSION_TTL = float(os.getenv("POLICY_VERSION_TTL", "5"))
+_versions = TTLCache(4096, POLICY_VERSION_TTL)
+
+
+async def policy_version(policy_id: str) -> str | None:
+    """Token that changes whenever the policy's stored chunks do (None if it cannot be read)."""
+    token = _versions.get(policy_id)
+    if token is not None:
+        return token
+    try:
+        client = await get_async_client()
+        result = await client.table("uploaded_policies").select(
+            "version, content_hash, chunk_count"
+        ).eq("id", policy_id).execute()
+    except Exception as e:
+        print(f"[VectorStore] version lookup failed for {policy_id}: {e}")
+        return None
+    row = result.data[0] if result.data else {}
+    # chunk_count is set when an ingest commits; version / content_hash change on revision
+    token = f"{row.get('version')}:{row.get('content_hash')}:{row.get('chunk_count')}"
+    _versions.put(policy_id, token)
+    return token
+
+
+async def get_policy_by_id(policy_id: str) -> dict | None:
+    client = await get_async_client()
+    result = await client.table("uploaded_policies").select("*").eq(
         "id", policy_id
     ).execute()
     return result.data[0] if result.data else None
@@ -58,32 +255,485 @@ def get_policy_by_id(policy_id: str) -> dict | None:
 
 # ── Chunk insertion ──────────────────────────────────────────────────────────
 
-def insert_chunks(policy_id: str, chunks: list[dict]):
-    """Bulk insert chunks. Each dict: {content, embedding, page_number, chunk_index, section_type}"""
-    client = get_client()
-    rows = [
-        {
-            "uploaded_policy_id": policy_id,
-            "content": c["content"],
-            "embedding": c["embedding"],
-            "page_number": c["page_number"],
-            "chunk_index": c["chunk_index"],
-            "section_type": c["section_type"],
-        }
-        for c in chunks
-    ]
-    # Insert in batches of 500 to stay under Supabase payload limits
+# Callbacks run with the policy_id whenever that policy's chunks change (cache invalidation)
+_chunk_listeners: list = []
+
+
+def on_chunks_changed(callback):
+    """Register callback(policy_id) to run after chunks are inserted for a policy."""
+    _chunk_listeners.append(callback)
+    return callback
+
+
+def _notify_chunks_changed(policy_id: str):
+    _versions.pop(policy_id)
+    for callback in _chunk_listeners:
+        try:
+            callback(policy_id)
+        except Exception as e:
+            print(f"[VectorStore] chunk listener failed for {policy_id}: {e}")
+
+
+def content_hash(data: str | bytes) -> str:
+    """sha256 fingerprint of a chunk's text or a PDF's bytes."""
+    return hashlib.sha256(data.encode("utf-8") if isinstance(data, str) else data).hexdigest()
+
+
+@dataclass
+class ChunkColumns:
+    """
+    A policy's chunks as parallel columns: one float32 embedding matrix (n × 1536) instead
+    of n Python float lists, so an upload holds ~6 KB per chunk rather than ~50 KB.
+    """
+    contents: list[str]
+    page_numbers: list[int]
+    chunk_indexes: list[int]
+    section_types: list[str]
+    char_starts: list[int]
+    char_ends: list[int]
+    content_hashes: list[str]
+    embeddings: np.ndarray
+
+    @classmethod
+    def from_chunks(cls, chunks, embeddings: np.ndarray) -> "ChunkColumns":
+        """Build from pdf_parser.Chunk objects and the matching embed_batch matrix."""
+        return cls(
+            contents=[c.content for c in chunks],
+            page_numbers=[c.page_number for c in chunks],
+            chunk_indexes=[c.chunk_index for c in chunks],
+            section_types=[c.section_type for c in chunks],
+            char_starts=[c.char_start for c in chunks],
+            char_ends=[c.char_end for c in chunks],
+            content_hashes=[content_hash(c.content) for c in chunks],
+            embeddings=np.asarray(embeddings, dtype=np.float32),
+        )
+
+    @classmethod
+    def concat(cls, parts: list["ChunkColumns"]) -> "ChunkColumns":
+        return cls(
+            contents=[c for p in parts for c in p.contents],
+            page_numbers=[n for p in parts for n in p.page_numbers],
+            chunk_indexes=[n for p in parts for n in p.chunk_indexes],
+            section_types=[t for p in parts for t in p.section_types],
+            char_starts=[n for p in parts for n in p.char_starts],
+            char_ends=[n for p in parts for n in p.char_ends],
+            content_hashes=[h for p in parts for h in p.content_hashes],
+            embeddings=np.concatenate([p.embeddings for p in parts]) if parts else np.empty((0, 1536), np.float32),
+        )
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def records(self, policy_id, start: int = 0, stop: int | None = None):
+        """Row tuples in _CHUNK_COLUMNS order; embeddings stay float32 matrix rows."""
+        for i in range(start, len(self) if stop is None else min(stop, len(self))):
+            yield (
+                policy_id, self.contents[i], self.embeddings[i],
+                self.page_numbers[i], self.chunk_indexes[i], self.section_types[i],
+                self.char_starts[i], self.char_ends[i], self.content_hashes[i],
+            )
+
+
+_CHUNK_COLUMNS = (
+    "uploaded_policy_id", "content", "embedding", "page_number", "chunk_index", "section_type",
+    "char_start", "char_end", "content_hash",
+)
+
+
+async def _post_chunks(policy_id: str, chunks: ChunkColumns):
+    client = await get_async_client()
+    # Insert in batches of 500 to stay under Supabase payload limits; JSON rows are
+    # built one batch at a time so only 500 text-encoded vectors exist at once
     batch_size = 500
-    for i in range(0, len(rows), batch_size):
-        client.table("policy_chunks").insert(rows[i : i + batch_size]).execute()
+    for i in range(0, len(chunks), batch_size):
+        rows = [
+            dict(zip(_CHUNK_COLUMNS, (*record[:2], _wire_vector(record[2]), *record[3:])))
+            for record in chunks.records(policy_id, i, i + batch_size)
+        ]
+        await client.table("policy_chunks").insert(rows).execute()
+
+
+# ── Revisions: re-ingesting an updated wording under an existing policy ─────
+
+_SQL_CHUNK_HASHES = "SELECT id, content_hash, content FROM policy_chunks WHERE uploaded_policy_id = $1"
+_SQL_APPLY_REVISION = "SELECT apply_policy_revision($1, $2, $3::jsonb, $4, $5, $6, $7)"
+
+
+async def policy_chunk_hashes(policy_id: str) -> list[dict]:
+    """[{id, content_hash}] for a stored policy's chunks (hashed here for rows stored before hashing)."""
+    if use_postgres():
+        rows = await _pg_fetch(_SQL_CHUNK_HASHES, policy_id)
+    else:
+        client = await get_async_client()
+        rows = []
+        while True:
+            result = await (
+                client.table("policy_chunks")
+                .select("id, content_hash, content")
+                .eq("uploaded_policy_id", policy_id)
+                .order("chunk_index")
+                .range(len(rows), len(rows) + _INDEX_PAGE - 1)
+                .execute()
+            )
+            rows.extend(result.data or [])
+            if len(result.data or []) < _INDEX_PAGE:
+                break
+    return [{"id": r["id"], "content_hash": r["content_hash"] or content_hash(r["content"])} for r in rows]
+
+
+@dataclass
+class PolicyRevision:
+    """
+    An update of stored policy `target`: `kept` are its existing chunk rows reused as-is
+    ({id, chunk_index, page_number, section_type, char_start, char_end} — same text, new
+    position); every other stored chunk is deleted when the revision is applied.
+    """
+    target: str
+    base_version: int
+    kept: list[dict]
+
+
+class _CopyWriter:
+    """Policy row + binary COPY chunk batches + chunk_count, all in one transaction on one connection."""
+
+    method = "copy"
+
+    def __init__(self, revision: PolicyRevision | None = None):
+        self.revision = revision
+        self.policy_id: str | None = None
+        self._name = ""
+        self._hash: str | None = None
+        self._conn = None
+        self._tx = None
+
+    async def open(self, name: str, filename: str, insurer: str, content_hash: str | None = None) -> str:
+        """Start the load; a revision's chunks are staged under a hidden row until commit."""
+        self._name, self._hash = name, content_hash
+        pool = await get_pool()
+        self._conn = await pool.acquire()
+        self._tx = self._conn.transaction()
+        await self._tx.start()
+        policy_id = await self._conn.fetchval(
+            "INSERT INTO uploaded_policies (user_label, filename, insurer, chunk_count, content_hash, revision_of)"
+            " VALUES ($1, $2, $3, 0, $4, $5) RETURNING id",
+            name, filename, insurer, content_hash, self.revision.target if self.revision else None,
+        )
+        self.policy_id = str(policy_id)
+        return self.policy_id
+
+    async def write(self, chunks: ChunkColumns):
+        # Binary COPY: embeddings go through the vector codec as 6 KB of float32, no text formatting
+        await self._conn.copy_records_to_table(
+            "policy_chunks", columns=_CHUNK_COLUMNS, records=chunks.records(self.policy_id),
+        )
+
+    async def commit(self, chunk_count: int):
+        if self.revision:
+            r = self.revision
+            await self._conn.fetchval(
+                _SQL_APPLY_REVISION, r.target, self.policy_id, json.dumps(r.kept), r.base_version,
+                self._hash, self._name, chunk_count,
+            )
+            self.policy_id = r.target
+        else:
+            await self._conn.execute(
+                "UPDATE uploaded_policies SET chunk_count = $2 WHERE id = $1", self.policy_id, chunk_count,
+            )
+        await self._tx.commit()
+        await self._release()
+        _notify_chunks_changed(self.policy_id)
+
+    async def rollback(self):
+        if self._tx is not None:
+            try:
+                await self._tx.rollback()
+            finally:
+                await self._release()
+
+    async def _release(self):
+        self._tx = None
+        if self._conn is not None:
+            await (await get_pool()).release(self._conn)
+            self._conn = None
+
+
+class _PostgrestWriter:
+    """
+    Same interface over PostgREST, which has no multi-request transactions: rollback deletes the
+    policy (or staging) row, and a revision is switched in by one apply_policy_revision RPC.
+    """
+
+    method = "postgrest"
+
+    def __init__(self, revision: PolicyRevision | None = None):
+        self.revision = revision
+        self.policy_id: str | None = None
+        self._name = ""
+        self._hash: str | None = None
+
+    async def open(self, name: str, filename: str, insurer: str, content_hash: str | None = None) -> str:
+        self._name, self._hash = name, content_hash
+        self.policy_id = await create_uploaded_policy(
+            name=name, filename=filename, insurer=insurer, content_hash=content_hash,
+            revision_of=self.revision.target if self.revision else None,
+        )
+        return self.policy_id
+
+    async def write(self, chunks: ChunkColumns):
+        await _post_chunks(self.policy_id, chunks)
+
+    async def commit(self, chunk_count: int):
+        if self.revision:
+            r = self.revision
+            client = await get_async_client()
+            await client.rpc("apply_policy_revision", {
+                "target": r.target,
+                "staging": self.policy_id,
+                "kept": r.kept,
+                "base_version": r.base_version,
+                "new_hash": self._hash,
+                "new_name": self._name,
+                "new_chunk_count": chunk_count,
+            }).execute()
+            self.policy_id = r.target
+        else:
+            await update_chunk_count(self.policy_id, chunk_count)
+        _notify_chunks_changed(self.policy_id)
+
+    async def rollback(self):
+        if self.policy_id is not None:
+            client = await get_async_client()
+            # ON DELETE CASCADE removes any chunks already written
+            await client.table("uploaded_policies").delete().eq("id", self.policy_id).execute()
+
+
+def policy_writer(revision: PolicyRevision | None = None) -> _CopyWriter | _PostgrestWriter:
+    """
+    Incremental loader for one policy: open(name, filename, insurer, content_hash) →
+    write(ChunkColumns)… → commit(chunk_count), or rollback() on failure. Uses COPY when
+    INGEST_BACKEND=copy. With a revision, commit switches the target policy to the kept
+    plus written chunks atomically; until then readers see the previous version.
+    """
+    return _CopyWriter(revision) if use_copy() else _PostgrestWriter(revision)
+
+
+# ── In-process vector index (per policy, read-through, LRU by memory) ───────
+
+# A policy has a few hundred chunks, so exact brute-force cosine over a float32
+# matrix beats a PostgREST round trip by orders of magnitude once it is loaded.
+VECTOR_INDEX_ENABLED = os.getenv("VECTOR_INDEX_ENABLED", "true").lower() not in ("0", "false", "no")
+VECTOR_INDEX_MAX_BYTES = int(float(os.getenv("VECTOR_INDEX_MAX_MB", "256")) * 1024 * 1024)
+# PostgREST caps a single select at 1000 rows by default
+_INDEX_PAGE = 1000
+
+
+class _PolicyIndex:
+    """Contiguous unit-normalized embeddings plus the columns a search result needs."""
+
+    def __init__(self, rows: list[dict], version: str | None = None):
+        # policy_version() read before the rows; a different stored version means the index is stale
+        self.version = version
+        self.ids = [r["id"] for r in rows]
+        self.contents = [r["content"] for r in rows]
+        self.pages = np.array([r.get("page_number") or 0 for r in rows], dtype=np.int32)
+        self.sections = np.array([r.get("section_type") or "general" for r in rows], dtype=object)
+        # Document character spans for stitching; NULL for chunks stored before spans existed
+        self.spans = [(r.get("char_start"), r.get("char_end")) for r in rows]
+        if rows:
+            matrix = np.array([_parse_vector(r["embedding"]) for r in rows], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1, norms)
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        self.matrix = matrix
+        self.keywords = BM25Index(self.contents)
+        self.nbytes = (
+            self.matrix.nbytes + self.pages.nbytes + self.keywords.nbytes
+            + sum(len(c) for c in self.contents) + 64 * len(rows)
+        )
+
+    def search(self, query_embedding: list[float], top_k: int, section_types: list[str] | None = None) -> list[dict]:
+        if not self.ids:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        sims = self.matrix @ (query / norm if norm else query)
+        return self._top(sims, top_k, section_types, "similarity")
+
+    def keyword_search(self, query_text: str, top_k: int, section_types: list[str] | None = None) -> list[dict]:
+        """BM25 over chunk content; only chunks matching at least one query term are returned."""
+        scores = self.keywords.scores(query_text)
+        return self._top(scores, top_k, section_types, "rank", positive_only=True)
+
+    def _top(
+        self,
+        scores: np.ndarray,
+        top_k: int,
+        section_types: list[str] | None,
+        score_field: str,
+        positive_only: bool = False,
+    ) -> list[dict]:
+        candidates = np.arange(len(self.ids))
+        if section_types is not None:
+            candidates = candidates[np.isin(self.sections, section_types)]
+        if positive_only:
+            candidates = candidates[scores[candidates] > 0]
+        if top_k <= 0 or not len(candidates):
+            return []
+        scores = scores[candidates]
+        k = min(top_k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        results = []
+        for j in top:
+            i = int(candidates[j])
+            results.append({
+                "id": self.ids[i],
+                "content": self.contents[i],
+                "page_number": int(self.pages[i]),
+                "section_type": self.sections[i],
+                "char_start": self.spans[i][0],
+                "char_end": self.spans[i][1],
+                score_field: float(scores[j]),
+            })
+        return results
+
+
+def _parse_vector(value) -> list[float]:
+    # PostgREST serializes pgvector columns as "[0.1,0.2,...]"
+    return json.loads(value) if isinstance(value, str) else value
+
+
+_indexes: OrderedDict[str, _PolicyIndex] = OrderedDict()
+_index_bytes = 0
+_index_loading: dict[str, asyncio.Future] = {}
+# Bumped on invalidation so a load that raced an insert is not cached
+_index_generation: dict[str, int] = {}
+_index_stats = {"hits": 0, "loads": 0, "evictions": 0, "invalidations": 0, "stale": 0, "fallbacks": 0}
+
+
+async def _load_index(policy_id: str) -> _PolicyIndex:
+    version = await policy_version(policy_id)
+    if use_postgres():
+        rows = await _pg_fetch(_SQL_POLICY_CHUNKS, policy_id)
+        return await asyncio.to_thread(_PolicyIndex, rows, version)
+
+    client = await get_async_client()
+    rows: list[dict] = []
+    while True:
+        result = await (
+            client.table("policy_chunks")
+            .select("id, content, page_number, section_type, char_start, char_end, embedding")
+            .eq("uploaded_policy_id", policy_id)
+            .order("chunk_index")
+            .range(len(rows), len(rows) + _INDEX_PAGE - 1)
+            .execute()
+        )
+        rows.extend(result.data or [])
+        if len(result.data or []) < _INDEX_PAGE:
+            break
+    return await asyncio.to_thread(_PolicyIndex, rows, version)
+
+
+def _store_index(policy_id: str, index: _PolicyIndex):
+    global _index_bytes
+    _drop_index(policy_id)
+    _indexes[policy_id] = index
+    _index_bytes += index.nbytes
+    while _index_bytes > VECTOR_INDEX_MAX_BYTES and len(_indexes) > 1:
+        _, old = _indexes.popitem(last=False)
+        _index_bytes -= old.nbytes
+        _index_stats["evictions"] += 1
+
+
+def _drop_index(policy_id: str) -> bool:
+    global _index_bytes
+    old = _indexes.pop(policy_id, None)
+    if old is None:
+        return False
+    _index_bytes -= old.nbytes
+    return True
+
+
+async def _load_and_store(policy_id: str, generation: int) -> _PolicyIndex | None:
+    # Runs as its own task so a caller timing out (run_layer) does not abort the load
+    try:
+        index = await _load_index(policy_id)
+    except Exception as e:
+        print(f"[VectorIndex] load failed for {policy_id}, using RPC search: {e}")
+        _index_stats["fallbacks"] += 1
+        return None
+    finally:
+        _index_loading.pop(policy_id, None)
+    _index_stats["loads"] += 1
+    if _index_generation.get(policy_id, 0) == generation:
+        _store_index(policy_id, index)
+    return index
+
+
+async def get_policy_index(policy_id: str) -> _PolicyIndex | None:
+    """
+    Loaded index for a policy (loading it on first access), or None when disabled or the load fails.
+    A cached index is checked against the policy's stored version (TTL-cached, so at most one
+    lookup per POLICY_VERSION_TTL) and reloaded when chunks were changed by another process.
+    """
+    if not VECTOR_INDEX_ENABLED:
+        return None
+    index = _indexes.get(policy_id)
+    if index is not None:
+        version = await policy_version(policy_id)
+        if version is None or version == index.version:
+            if policy_id in _indexes:
+                _indexes.move_to_end(policy_id)
+            _index_stats["hits"] += 1
+            return index
+        _index_stats["stale"] += 1
+        if _indexes.get(policy_id) is index:
+            _drop_index(policy_id)
+
+    return await asyncio.shield(_index_load_task(policy_id))
+
+
+def _index_load_task(policy_id: str) -> asyncio.Future:
+    # Concurrent first accesses (semantic + section layers) share one load
+    pending = _index_loading.get(policy_id)
+    if pending is None:
+        generation = _index_generation.get(policy_id, 0)
+        pending = _index_loading[policy_id] = asyncio.ensure_future(_load_and_store(policy_id, generation))
+    return pending
+
+
+def invalidate_policy_index(policy_id: str):
+    _index_generation[policy_id] = _index_generation.get(policy_id, 0) + 1
+    if _drop_index(policy_id):
+        _index_stats["invalidations"] += 1
+
+
+on_chunks_changed(invalidate_policy_index)
+
+
+def vector_index_stats() -> dict:
+    return {
+        "enabled": VECTOR_INDEX_ENABLED,
+        "policies": len(_indexes),
+        "bytes": _index_bytes,
+        "max_bytes": VECTOR_INDEX_MAX_BYTES,
+        **_index_stats,
+    }
 
 
 # ── Semantic search (pgvector cosine similarity) ─────────────────────────────
 
-def semantic_search(query_embedding: list[float], policy_id: str, top_k: int = 8) -> list[dict]:
-    """Call Supabase RPC for cosine similarity search."""
-    result = get_client().rpc("match_chunks_direct", {
-        "query_embedding": query_embedding,
+async def semantic_search(query_embedding: list[float], policy_id: str, top_k: int = 8) -> list[dict]:
+    """Cosine similarity search — in-process index when loaded, else Supabase RPC."""
+    index = await get_policy_index(policy_id)
+    if index is not None:
+        return index.search(query_embedding, top_k)
+    if use_postgres():
+        return await _pg_fetch(_SQL_MATCH_DIRECT, query_embedding, policy_id, top_k)
+    client = await get_async_client()
+    result = await client.rpc("match_chunks_direct", {
+        "query_embedding": _wire_vector(query_embedding),
         "policy_id_filter": policy_id,
         "match_count": top_k,
     }).execute()
@@ -92,32 +742,56 @@ def semantic_search(query_embedding: list[float], policy_id: str, top_k: int = 8
 
 # ── Keyword search (PostgreSQL tsvector / BM25-style) ───────────────────────
 
-def keyword_search(query_text: str, policy_id: str, top_k: int = 8) -> list[dict]:
-    """Call Supabase RPC for full-text keyword search (plainto_tsquery — handles plain English)."""
+async def keyword_search(
+    query_text: str,
+    policy_id: str,
+    top_k: int = 8,
+    section_types: list[str] | None = None,
+) -> list[dict]:
+    """
+    BM25 keyword search over the in-process index (partial-term matching, any-term recall),
+    else the keyword_search_chunks RPC. Errors propagate — wrap in run_layer to degrade to [].
+    """
     if not query_text.strip():
         return []
-    try:
-        result = get_client().rpc("keyword_search_chunks", {
+    index = await get_policy_index(policy_id)
+    if index is not None:
+        return index.keyword_search(query_text, top_k, section_types)
+
+    # keyword_search_chunks has no section filter — over-fetch, then filter here
+    match_count = top_k if section_types is None else top_k * 3
+    if use_postgres():
+        rows = await _pg_fetch(_SQL_KEYWORD, query_text, policy_id, match_count)
+    else:
+        client = await get_async_client()
+        result = await client.rpc("keyword_search_chunks", {
             "search_query": query_text,
             "policy_id_filter": policy_id,
-            "match_count": top_k,
+            "match_count": match_count,
         }).execute()
-        return result.data or []
-    except Exception:
-        return []
+        rows = result.data or []
+    if section_types is not None:
+        rows = [r for r in rows if r.get("section_type") in section_types]
+    return rows[:top_k]
 
 
 # ── Section-filtered search ──────────────────────────────────────────────────
 
-def section_search(
+async def section_search(
     query_embedding: list[float],
     policy_id: str,
     section_types: list[str],
     top_k: int = 3,
 ) -> list[dict]:
     """Semantic search restricted to specific section types."""
-    result = get_client().rpc("match_chunks_by_section", {
-        "query_embedding": query_embedding,
+    index = await get_policy_index(policy_id)
+    if index is not None:
+        return index.search(query_embedding, top_k, section_types)
+    if use_postgres():
+        return await _pg_fetch(_SQL_MATCH_BY_SECTION, query_embedding, policy_id, section_types, top_k)
+    client = await get_async_client()
+    result = await client.rpc("match_chunks_by_section", {
+        "query_embedding": _wire_vector(query_embedding),
         "policy_id_filter": policy_id,
         "section_filter": section_types,
         "match_count": top_k,
@@ -125,6 +799,23 @@ def section_search(
     return result.data or []
 
 
+# ── Concurrent retrieval layers ──────────────────────────────────────────────
+
+# Per-layer budget for a single retrieval RPC; a slow layer must not stall the whole answer
+LAYER_TIMEOUT = float(os.getenv("RAG_LAYER_TIMEOUT", "5.0"))
+
+
+async def run_layer(label: str, coro, timeout: float | None = None) -> list[dict]:
+    """Await one retrieval layer. Failure or timeout degrades to [] instead of raising."""
+    try:
+        return await asyncio.wait_for(coro, timeout or LAYER_TIMEOUT)
+    except asyncio.TimeoutError:
+        print(f"[RAG] {label} layer timed out after {timeout or LAYER_TIMEOUT:.1f}s")
+    except Exception as e:
+        print(f"[RAG] {label} layer failed: {e}")
+    return []
+
+
 # ── Reciprocal Rank Fusion ───────────────────────────────────────────────────
 
 def rrf_fusion(
@@ -134,27 +825,121 @@ def rrf_fusion(
     k: int = 60,
 ) -> list[dict]:
     """Merge semantic and keyword results using Reciprocal Rank Fusion."""
+    return _rrf([semantic_results, keyword_results], top_k, k)
+
+
+def _rrf(result_lists: list[list[dict]], top_k: int, k: int = 60) -> list[dict]:
     scores: dict[str, float] = {}
     chunks: dict[str, dict] = {}
 
-    for rank, chunk in enumerate(semantic_results):
-        cid = chunk["id"]
-        scores[cid] = scores.get(cid, 0.0) + 1.0 / (k + rank + 1)
-        chunks[cid] = chunk
-
-    for rank, chunk in enumerate(keyword_results):
-        cid = chunk["id"]
-        scores[cid] = scores.get(cid, 0.0) + 1.0 / (k + rank + 1)
-        chunks[cid] = chunk
+    for results in result_lists:
+        for rank, chunk in enumerate(results):
+            cid = chunk["id"]
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (k + rank + 1)
+            chunks[cid] = chunk
 
     ranked_ids = sorted(scores, key=lambda x: scores[x], reverse=True)
     return [chunks[cid] for cid in ranked_ids[:top_k]]
 
 
+# ── Hybrid search (all layers + fusion in one call) ──────────────────────────
+
+async def hybrid_search(
+    query_embedding: list[float],
+    query_text: str,
+    policy_id: str,
+    layers: list[dict],
+    fused_top_k: int = 5,
+) -> dict[str, list[dict]]:
+    """
+    Run every retrieval layer for one question and fuse them.
+
+    layers: [{"name", "kind": "semantic" | "keyword", "top_k",
+              "sections": [...] (optional), "fuse": bool (optional),
+              "embedding" / "query": per-layer override (optional)}]
+    Returns {layer name: rows, ..., "fused": RRF over the fuse=True layers}.
+
+    Cold policies go through the hybrid_search RPC (one round trip, RRF in SQL)
+    while their in-process index loads in the background; loaded policies, or a
+    database without the RPC, run the layers individually via run_layer.
+    """
+    if VECTOR_INDEX_ENABLED and policy_id not in _indexes:
+        _index_load_task(policy_id)
+    if policy_id not in _indexes:
+        try:
+            return await asyncio.wait_for(
+                _hybrid_rpc(query_embedding, query_text, policy_id, layers, fused_top_k), LAYER_TIMEOUT
+            )
+        except Exception as e:
+            print(f"[RAG] hybrid_search RPC failed, running layers separately: {e!r}")
+    return await _hybrid_layers(query_embedding, query_text, policy_id, layers, fused_top_k)
+
+
+def _score_field(layer: dict) -> str:
+    return "rank" if layer["kind"] == "keyword" else "similarity"
+
+
+async def _hybrid_rpc(query_embedding, query_text, policy_id, layers, fused_top_k) -> dict[str, list[dict]]:
+    if use_postgres():
+        rows = await _pg_fetch(_SQL_HYBRID, query_embedding, query_text, policy_id, json.dumps(layers))
+    else:
+        client = await get_async_client()
+        result = await client.rpc("hybrid_search", {
+            "query_embedding": _wire_vector(query_embedding),
+            "search_query": query_text,
+            "policy_id_filter": policy_id,
+            "layers": layers,
+        }).execute()
+        rows = result.data or []
+
+    out: dict[str, list[dict]] = {layer["name"]: [] for layer in layers}
+    fields = {layer["name"]: _score_field(layer) for layer in layers}
+    rrf_scores: dict[str, float] = {}
+    for row in sorted(rows, key=lambda r: r["layer_rank"]):
+        out[row["layer"]].append({
+            "id": row["id"],
+            "content": row["content"],
+            "page_number": row["page_number"],
+            "section_type": row["section_type"],
+            "char_start": row.get("char_start"),
+            "char_end": row.get("char_end"),
+            fields[row["layer"]]: row["score"],
+        })
+        if row.get("rrf_score") is not None:
+            rrf_scores[row["id"]] = row["rrf_score"]
+
+    # Order by the database's RRF score; ties keep layer order, as rrf_fusion does
+    fused: dict[str, dict] = {}
+    for layer in layers:
+        if layer.get("fuse"):
+            for chunk in out[layer["name"]]:
+                fused.setdefault(chunk["id"], chunk)
+    ranked = sorted(fused.values(), key=lambda c: rrf_scores.get(c["id"], 0.0), reverse=True)
+    out["fused"] = ranked[:fused_top_k]
+    return out
+
+
+async def _hybrid_layers(query_embedding, query_text, policy_id, layers, fused_top_k) -> dict[str, list[dict]]:
+    def search(layer: dict):
+        top_k = layer["top_k"]
+        sections = layer.get("sections")
+        if layer["kind"] == "keyword":
+            return keyword_search(layer.get("query") or query_text, policy_id, top_k, sections)
+        embedding = layer.get("embedding") or query_embedding
+        if sections:
+            return section_search(embedding, policy_id, sections, top_k)
+        return semantic_search(embedding, policy_id, top_k)
+
+    results = await asyncio.gather(*(run_layer(layer["name"], search(layer)) for layer in layers))
+    out = {layer["name"]: rows for layer, rows in zip(layers, results)}
+    out["fused"] = _rrf([out[layer["name"]] for layer in layers if layer.get("fuse")], fused_top_k)
+    return out
+
+
 # ── Catalog (structured policy metadata) ────────────────────────────────────
 
-def list_catalog_policies(filters: dict | None = None) -> list[dict]:
-    client = get_client()
+async def list_catalog_policies(filters: dict | None = None) -> list[dict]:
+    client = await get_async_client()
     query = client.table("insurance_policies").select("*")
     if filters:
         if filters.get("covers_maternity"):
@@ -167,17 +952,19 @@ def list_catalog_policies(filters: dict | None = None) -> list[dict]:
             query = query.lte("premium_max", filters["max_premium"])
         if filters.get("policy_type"):
             query = query.eq("type", filters["policy_type"])
-    result = query.execute()
+    result = await query.execute()
     return result.data or []
 
 
-def get_catalog_policy(policy_id: str) -> dict | None:
-    result = get_client().table("insurance_policies").select("*").eq(
+async def get_catalog_policy(policy_id: str) -> dict | None:
+    client = await get_async_client()
+    result = await client.table("insurance_policies").select("*").eq(
         "id", policy_id
     ).execute()
     return result.data[0] if result.data else None
 
 
-def insert_catalog_policy(policy: dict) -> str:
-    result = get_client().table("insurance_policies").insert(policy).execute()
+async def insert_catalog_policy(policy: dict) -> str:
+    client = await get_async_client()
+    result = await client.table("insurance_policies").insert(policy).execute()
     return result.data[0]["id"]